@@ -0,0 +1,98 @@
+import logging
+import random
+import time
+from typing import Optional
+from fastapi import WebSocket
+from metrics import chat_connects_rejected, chat_handshakes_in_flight
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 연결 거절/종료 코드 (reason에 "retry_after=<초>" 형식으로 재연결 시점을 담음)
+CLOSE_OVERLOADED = 4429       # 핸드셰이크 과부하 (잠시 후 재시도)
+CLOSE_SERVICE_RESTART = 1012  # 서버 재시작 (흩어진 시점에 재연결)
+
+def retry_after_reason(seconds: float) -> str:
+    """close 프레임의 reason에 담을 재연결 대기 시간 문자열을 만드는 함수"""
+    return f"retry_after={seconds:.1f}"
+
+async def reject(websocket: WebSocket, code: int, retry_after: float):
+    """재연결 대기 시간을 담아 웹소켓 연결을 거절하는 함수
+
+    수락 전에 닫으면 브라우저는 close 코드와 reason을 받을 수 없으므로 수락한 뒤 바로 닫는다.
+    """
+    try:
+        await websocket.accept()
+        await websocket.close(code=code, reason=retry_after_reason(retry_after))
+    except Exception:
+        pass
+
+class AdmissionController:
+    """웹소켓 핸드셰이크 동시 처리 수와 연결 속도를 제한하는 워커별 입장 제어
+
+    노드가 재시작되면 모든 클라이언트가 한꺼번에 재연결하므로, 동시에 진행 중인 핸드셰이크 수와
+    초당 연결 수(토큰 버킷)를 넘는 연결은 재연결 대기 시간을 담아 거절한다.
+    거절한 연결에는 제한 속도에 맞춰 차례로 뒤쪽 시점을 배정하므로 재연결이 고르게 퍼진다.
+    """
+
+    def __init__(self, max_handshakes: int, rate: float, burst: int, jitter: float, max_retry_after: float):
+        self.max_handshakes = max_handshakes
+        # 초당 허용 연결 수 (0이면 속도 제한 없음)
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.max_retry_after = max_retry_after
+        self.in_flight = 0
+        # 종료 중에는 새 연결을 받지 않음
+        self.draining = False
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # 다음에 거절한 연결에 배정할 재연결 시각
+        self._next_slot = 0.0
+        chat_handshakes_in_flight.set_function(lambda: self.in_flight)
+
+    def acquire(self) -> Optional[float]:
+        """핸드셰이크를 시작할 수 있으면 None, 아니면 재연결 대기 시간(초)을 반환하는 메서드
+
+        None을 받은 경우 핸드셰이크가 끝나면 반드시 release를 호출해야 한다.
+        """
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+        if self.draining:
+            reason = "draining"
+        elif self.in_flight >= self.max_handshakes:
+            reason = "concurrency"
+        elif self.rate > 0 and self._tokens < 1:
+            reason = "rate"
+        else:
+            if self.rate > 0:
+                self._tokens -= 1
+            self.in_flight += 1
+            return None
+        chat_connects_rejected.labels(reason).inc()
+        if self.draining:
+            return random.uniform(0, config.DRAIN_RECONNECT_JITTER)
+        return self._retry_after(now)
+
+    def release(self):
+        """핸드셰이크가 끝났음을 알리는 메서드"""
+        self.in_flight -= 1
+
+    def _retry_after(self, now: float) -> float:
+        """거절한 연결에 제한 속도에 맞춘 다음 재연결 시점을 배정하는 메서드"""
+        interval = 1 / self.rate if self.rate > 0 else 0.0
+        slot = max(self._next_slot, now + max(1.0, 1 - self._tokens) * interval)
+        self._next_slot = min(slot + interval, now + self.max_retry_after)
+        return min(slot - now + random.uniform(0, self.jitter), self.max_retry_after)
+
+# AdmissionController 인스턴스 생성
+admission = AdmissionController(
+    max_handshakes=config.ADMISSION_MAX_HANDSHAKES,
+    rate=config.ADMISSION_CONNECT_RATE,
+    burst=config.ADMISSION_CONNECT_BURST,
+    jitter=config.ADMISSION_RETRY_JITTER,
+    max_retry_after=config.ADMISSION_MAX_RETRY_AFTER
+)
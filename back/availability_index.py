@@ -0,0 +1,102 @@
+import logging
+from typing import Dict, Optional
+from redis_manager import redis_manager
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 중복 체크 대상 필드
+FIELDS = ("username", "email", "nickname")
+# 워밍이 끝났음을 나타내는 키와 워밍 중복 실행을 막는 잠금 키
+READY_KEY = "taken:ready"
+WARMING_KEY = "taken:warming"
+
+class AvailabilityIndex:
+    """사용 중인 사용자 이름/이메일/닉네임을 Redis 집합(taken:{field})으로 관리하는 클래스
+
+    users 테이블에서 한 번 워밍한 뒤 회원가입마다 갱신한다. 사용자는 삭제되지 않으므로
+    집합에 있으면 사용 중이고 없으면 사용 가능하며, 워밍이 끝나기 전이나 Redis 오류 시에는
+    None을 반환해 호출자가 PostgreSQL로 확인하도록 한다.
+    갱신에 실패하면 워밍 완료 표시를 지워 다시 워밍할 때까지 PostgreSQL로 확인하게 한다.
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        # 갱신에 실패했지만 워밍 완료 표시를 아직 지우지 못한 상태 (Redis 장애 중)
+        self._stale = False
+
+    async def _invalidate(self) -> bool:
+        """워밍 완료 표시를 지우는 메서드 (실패하면 다음 조회나 워밍 때 다시 시도)"""
+        try:
+            await redis_manager.redis.delete(READY_KEY)
+        except Exception as e:
+            logger.warning(f"Failed to invalidate availability index: {e}")
+            self._stale = True
+            return False
+        self._stale = False
+        return True
+
+    async def is_taken(self, field: str, value: str) -> Optional[bool]:
+        """값이 이미 사용 중인지 확인하는 메서드 (판단할 수 없으면 None)"""
+        if self._stale:
+            await self._invalidate()
+            return None
+        try:
+            async with redis_manager.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(READY_KEY)
+                pipe.sismember(f"taken:{field}", value)
+                ready, taken = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Availability index lookup failed, falling back to database: {e}")
+            return None
+        if not ready:
+            return None
+        return bool(taken)
+
+    async def add(self, username: str, email: str, nickname: str):
+        """새로 등록된 사용자의 값을 인덱스에 추가하는 메서드"""
+        await self.add_values({"username": username, "email": email, "nickname": nickname})
+
+    async def add_values(self, values: Dict[str, str]):
+        """사용 중인 값을 필드별로 인덱스에 추가하는 메서드 (실패하면 인덱스를 무효화)"""
+        if not values:
+            return
+        try:
+            async with redis_manager.redis.pipeline(transaction=False) as pipe:
+                for field, value in values.items():
+                    pipe.sadd(f"taken:{field}", value)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to update availability index with {values}: {e}")
+            await self._invalidate()
+
+    async def warm(self, pool):
+        """users 테이블의 값을 Redis 집합에 적재하는 메서드 (이미 워밍된 경우 생략)"""
+        if self._stale and not await self._invalidate():
+            return
+        if await redis_manager.redis.exists(READY_KEY):
+            return
+        # 여러 워커가 동시에 워밍하지 않도록 잠금 획득
+        if not await redis_manager.redis.set(WARMING_KEY, 1, nx=True, ex=300):
+            return
+        try:
+            count = 0
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    cursor = await conn.cursor('SELECT username, email, nickname FROM users')
+                    while True:
+                        rows = await cursor.fetch(self.batch_size)
+                        if not rows:
+                            break
+                        async with redis_manager.redis.pipeline(transaction=False) as pipe:
+                            for field in FIELDS:
+                                pipe.sadd(f"taken:{field}", *[row[field] for row in rows])
+                            await pipe.execute()
+                        count += len(rows)
+            await redis_manager.redis.set(READY_KEY, 1)
+            logger.info(f"Availability index warmed with {count} users")
+        finally:
+            await redis_manager.redis.delete(WARMING_KEY)
+
+# AvailabilityIndex 인스턴스 생성
+availability_index = AvailabilityIndex()
@@ -2,65 +2,158 @@ import asyncio
 import logging
 from redis_manager import redis_manager
 from postgresql_manager import postgres_manager
+from db_schema import partition_manager
+from availability_index import availability_index
+from presence import presence
+from wal import wal
+from content_filter import content_filter
+from session_audit import session_audit
+from metrics import sync_lag_seconds, sync_backlog, sync_messages, sync_outbox_saturated
+import config
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
 
-async def periodic_user_count_update(manager):
+# 영속화 지연 지표
+# lag_seconds: 아직 PostgreSQL에 저장되지 않은 가장 오래된 메시지의 나이 (초)
+# backlog: 아웃박스에 남아 있는 메시지 수, synced_total: 이 노드가 저장한 메시지 수
+# outbox_saturated: 대기 중인 메시지가 경보 기준을 넘었는지 여부 (최대 길이에 닿으면 오래된 메시지가 잘림)
+sync_stats = {"lag_seconds": 0.0, "backlog": 0, "synced_total": 0, "outbox_saturated": False}
+sync_lag_seconds.set_function(lambda: sync_stats["lag_seconds"])
+sync_backlog.set_function(lambda: sync_stats["backlog"])
+sync_outbox_saturated.set_function(lambda: 1 if sync_stats["outbox_saturated"] else 0)
+
+def check_outbox_capacity(backlog: int):
+    """아웃박스 대기 메시지 수가 최대 길이에 가까워지면 경보를 남기는 함수"""
+    if config.OUTBOX_MAX_LEN <= 0:
+        return
+    saturated = backlog >= config.OUTBOX_MAX_LEN * config.OUTBOX_ALERT_RATIO
+    if backlog >= config.OUTBOX_MAX_LEN:
+        # 가장 오래된 미영속화 메시지가 MAXLEN으로 잘리고 있으므로 확인할 때마다 기록
+        logger.error(f"Outbox is at capacity ({backlog}/{config.OUTBOX_MAX_LEN}), "
+                     f"oldest unpersisted messages are being trimmed")
+    elif saturated and not sync_stats["outbox_saturated"]:
+        logger.error(f"Outbox backlog {backlog} exceeded {config.OUTBOX_ALERT_RATIO:.0%} of "
+                     f"OUTBOX_MAX_LEN ({config.OUTBOX_MAX_LEN}), PostgreSQL persistence is falling behind")
+    elif not saturated and sync_stats["outbox_saturated"]:
+        logger.info(f"Outbox backlog back to {backlog}")
+    sync_stats["outbox_saturated"] = saturated
+
+async def sync_redis_to_postgres():
     """
-    주기적으로 활성 사용자 수를 업데이트하고 모든 연결에 전송하는 함수
+    Redis 아웃박스 스트림의 메시지를 컨슈머 그룹으로 읽어 PostgreSQL에 영속화하는 함수
+
+    PostgreSQL 커밋이 성공한 뒤에만 확인(ACK) 처리하며,
+    중단된 컨슈머가 처리하지 못한 메시지는 일정 시간이 지나면 회수해서 다시 저장한다.
     """
+    consumer = config.NODE_ID
+    # 이전 실행에서 이 컨슈머에 전달됐지만 확인되지 않은 메시지부터 처리
+    start_id = "0"
+    group_ready = False
+    last_claim_time = 0.0
+    last_lag_time = 0.0
     while True:
         try:
-            # Redis에서 활성 연결 수 가져오기
-            count = await redis_manager.get_active_connections_count()
-            # 모든 활성 연결에 사용자 수 업데이트 메시지 전송
-            for connection in manager.active_connections.values():
-                await connection.send_json({"type": "user_count", "count": count})
-            # 1초 대기 후 다음 업데이트 실행
-            await asyncio.sleep(1)
+            if not group_ready:
+                await redis_manager.ensure_outbox_group()
+                group_ready = True
+            current_time = asyncio.get_event_loop().time()
+            # 중단된 컨슈머의 미확인 메시지 회수
+            if current_time - last_claim_time >= config.OUTBOX_CLAIM_IDLE_MS / 1000:
+                last_claim_time = current_time
+                claimed = await redis_manager.claim_stale_outbox(consumer, config.OUTBOX_CLAIM_IDLE_MS, config.SYNC_BATCH_SIZE)
+                if claimed:
+                    logger.info(f"Reclaimed {len(claimed)} pending messages from the outbox")
+                    await persist_outbox_entries(claimed)
+
+            # 새 메시지가 올 때까지 블로킹 읽기
+            entries = await redis_manager.read_outbox(consumer, start_id, config.SYNC_BATCH_SIZE, config.SYNC_BLOCK_MS)
+            if start_id == "0" and not entries:
+                start_id = ">"
+            if entries and not await persist_outbox_entries(entries):
+                # 저장 실패 시 미확인 메시지를 처음부터 다시 읽음
+                start_id = "0"
+                await asyncio.sleep(1)
+
+            # 영속화 지연 지표 갱신 (최대 1초에 한 번)
+            if current_time - last_lag_time >= 1:
+                last_lag_time = current_time
+                sync_stats["lag_seconds"], sync_stats["backlog"] = await redis_manager.get_outbox_lag()
+                check_outbox_capacity(sync_stats["backlog"])
         except Exception as e:
             # 오류 발생 시 로그 기록 및 5초 대기 후 재시도
-            logger.error(f"Error in periodic user count update: {e}", exc_info=True)
+            logger.error(f"Error in sync_redis_to_postgres: {e}", exc_info=True)
+            start_id = "0"
             await asyncio.sleep(5)
 
-async def sync_redis_to_postgres():
+async def persist_outbox_entries(entries):
+    """아웃박스 항목을 PostgreSQL에 저장하고 커밋된 항목만 확인 처리하는 함수"""
+    messages = [message for _, message in entries if message is not None]
+    if messages:
+        success = await postgres_manager.save_messages_from_redis(messages)
+        if not success:
+            logger.error("Failed to sync messages to PostgreSQL")
+            return False
+    await redis_manager.ack_outbox([entry_id for entry_id, _ in entries])
+    sync_stats["synced_total"] += len(messages)
+    sync_messages.inc(len(messages))
+    logger.info(f"Synced {len(messages)} messages to PostgreSQL")
+    return True
+
+# 파티션 유지보수를 한 주기 동안 한 워커만 수행하도록 하는 Redis 잠금 키
+PARTITION_MAINTENANCE_LOCK = "partition_maintenance:lock"
+
+async def partition_maintenance():
     """
-    Redis의 메시지를 주기적으로 PostgreSQL에 동기화하는 함수
+    일별 파티션을 미리 생성하고 보존 기간이 지난 파티션을 정리하는 함수
     """
-    # 마지막 동기화 시간 초기화
-    last_sync_time = asyncio.get_event_loop().time()
     while True:
         try:
-            # 현재 시간 가져오기
-            current_time = asyncio.get_event_loop().time()
-            # Redis에서 최근 메시지 50개 가져오기
-            messages = await redis_manager.get_recent_messages(50)
-            # 50개 이상 메시지가 있거나 마지막 동기화 후 10초 이상 지났을 때 동기화
-            if len(messages) >= 50 or current_time - last_sync_time >= 10:
-                # PostgreSQL에 메시지 저장
-                success = await postgres_manager.save_messages_from_redis(messages)
-                if success and messages:  # 메시지가 있고 성공적으로 저장된 경우에만 처리
-                    # 동기화 성공 시 Redis에서 해당 메시지 삭제
-                    await redis_manager.clear_synced_messages(len(messages))
-                    last_sync_time = current_time
-                    logger.info(f"Synced {len(messages)} messages to PostgreSQL")
-                elif not success:
-                    logger.error("Failed to sync messages to PostgreSQL")
-            # 1초 대기 후 다음 동기화 확인
-            await asyncio.sleep(1)
+            # 모든 워커가 같은 주기로 실행하므로 주기마다 잠금을 얻은 한 워커만 수행 (동시 DETACH 충돌 방지)
+            if await redis_manager.redis.set(PARTITION_MAINTENANCE_LOCK, config.NODE_ID, nx=True,
+                                             ex=config.PARTITION_MAINTENANCE_INTERVAL):
+                try:
+                    await partition_manager.create_ahead(postgres_manager.pool, config.PARTITION_DAYS_AHEAD)
+                    await partition_manager.enforce_retention(postgres_manager.pool, config.PARTITION_RETENTION_ACTION)
+                except Exception:
+                    # 실패하면 잠금을 풀어 60초 뒤 어느 워커든 다시 시도할 수 있게 함
+                    await redis_manager.redis.delete(PARTITION_MAINTENANCE_LOCK)
+                    raise
+            # 설정된 주기마다 실행
+            await asyncio.sleep(config.PARTITION_MAINTENANCE_INTERVAL)
         except Exception as e:
-            # 오류 발생 시 로그 기록 및 5초 대기 후 재시도
-            logger.error(f"Error in sync_redis_to_postgres: {e}", exc_info=True)
-            await asyncio.sleep(5)
+            # 오류 발생 시 로그 기록 및 60초 대기 후 재시도
+            logger.error(f"Error in partition maintenance: {e}", exc_info=True)
+            await asyncio.sleep(60)
+
+async def availability_index_maintenance():
+    """
+    중복 체크 인덱스가 워밍되지 않았으면(시작 직후, Redis 재시작 등) 다시 적재하는 함수
+    """
+    while True:
+        try:
+            await availability_index.warm(postgres_manager.pool)
+            # 1분마다 확인
+            await asyncio.sleep(60)
+        except Exception as e:
+            # 오류 발생 시 로그 기록 및 60초 대기 후 재시도
+            logger.error(f"Error in availability index maintenance: {e}", exc_info=True)
+            await asyncio.sleep(60)
 
 def start_background_tasks(manager):
     """
     백그라운드 태스크들을 시작하는 함수
     """
     # 각 백그라운드 태스크를 생성하고 manager의 background_tasks 세트에 추가
-    manager.background_tasks.add(asyncio.create_task(periodic_user_count_update(manager)))
+    manager.background_tasks.add(asyncio.create_task(presence.run(manager)))
+    manager.background_tasks.add(asyncio.create_task(wal.run()))
+    if content_filter.enabled:
+        manager.background_tasks.add(asyncio.create_task(content_filter.run()))
+    if session_audit.enabled:
+        manager.background_tasks.add(asyncio.create_task(session_audit.run()))
     manager.background_tasks.add(asyncio.create_task(sync_redis_to_postgres()))
+    manager.background_tasks.add(asyncio.create_task(partition_maintenance()))
+    manager.background_tasks.add(asyncio.create_task(availability_index_maintenance()))
     # ConnectionManager 클래스의 메서드를 직접 호출
     manager.start_background_tasks()
 
@@ -68,8 +161,6 @@ def stop_background_tasks(manager):
     """
     실행 중인 모든 백그라운드 태스크를 중지하는 함수
     """
-    # 모든 백그라운드 태스크 취소
-    for task in manager.background_tasks:
-        task.cancel()
-    # background_tasks 세트 초기화
-    manager.background_tasks.clear()
\ No newline at end of file
+    # 모든 백그라운드 태스크 취소 및 background_tasks 세트 초기화
+    # ConnectionManager 클래스의 메서드를 직접 호출 (백플레인 구독 태스크 포함)
+    manager.stop_background_tasks()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from codec import Frame
+from redis_manager import redis_manager
+from response_cache import recent_messages_cache
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 백플레인 메시지 종류 (첫 글자로 구분)
+FRAME = "F"  # 모든 노드에서 채팅방의 로컬 멤버에게 전달할 인코딩된 프레임 ("F{room}|{text}")
+KICK = "K"   # 다른 노드에 남아 있는 같은 사용자의 이전 세션 종료 요청
+
+class Backplane:
+    """Redis pub/sub으로 여러 워커/호스트의 ConnectionManager를 연결하는 클래스
+
+    CHAT_BACKPLANE=1 uvicorn main:app --workers N 처럼 실행하면
+    각 워커는 브로드캐스트를 Redis 채널에 발행하고, 채널을 구독해 받은 프레임을
+    자신에게 연결된 소켓에만 전달한다.
+    """
+
+    def __init__(self, manager, channel: str = config.BACKPLANE_CHANNEL):
+        self.manager = manager
+        self.channel = channel
+        self.node_id = config.NODE_ID
+        self._task = None
+
+    def start(self):
+        """구독 태스크를 시작하는 메서드"""
+        self._task = asyncio.create_task(self._listen())
+
+    def stop(self):
+        """구독 태스크를 중지하는 메서드"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def publish_frame(self, room: str, text: str):
+        """채팅방의 인코딩된 프레임을 모든 노드에 발행하는 메서드"""
+        await redis_manager.redis.publish(self.channel, f"{FRAME}{room}|{text}")
+
+    async def publish_kick(self, sender_id: str):
+        """다른 노드에 있는 사용자의 이전 세션을 종료하도록 요청하는 메서드"""
+        await redis_manager.redis.publish(self.channel, f"{KICK}{sender_id}|{self.node_id}")
+
+    async def _listen(self):
+        """백플레인 채널을 구독하고 받은 메시지를 처리하는 태스크"""
+        while True:
+            pubsub = redis_manager.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                logger.info(f"Node {self.node_id} subscribed to backplane channel {self.channel}")
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8")
+                    await self._handle(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Redis 연결이 끊긴 경우 잠시 후 다시 구독
+                logger.error(f"Error in backplane listener: {e}", exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    async def _handle(self, data: str):
+        """백플레인 메시지 하나를 처리하는 메서드"""
+        kind, payload = data[0], data[1:]
+        if kind == FRAME:
+            room, text = payload.split("|", 1)
+            # 백플레인으로는 채팅 메시지만 발행되므로 최근 메시지 응답 캐시 무효화
+            recent_messages_cache.invalidate(room)
+            self.manager.deliver_to_room(room, Frame(text=text))
+        elif kind == KICK:
+            sender_id, origin = payload.rsplit("|", 1)
+            if origin != self.node_id:
+                await self.manager.disconnect_previous_session(sender_id)
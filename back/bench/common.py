@@ -0,0 +1,68 @@
+"""벤치마크 스크립트가 함께 쓰는 도구 (백분위 계산, 실행 환경 기록, 결과 저장)"""
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+def percentile(values: List[float], pct: float) -> float:
+    """정렬된 값 목록에서 백분위 값을 구하는 함수"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def summarize(values: List[float], digits: int = 3) -> Dict:
+    """값 목록의 p50/p90/p99/최대/평균을 구하는 함수"""
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), digits),
+        "p90": round(percentile(values, 90), digits),
+        "p99": round(percentile(values, 99), digits),
+        "max": round(values[-1], digits) if values else 0.0,
+        "mean": round(sum(values) / len(values), digits) if values else 0.0,
+    }
+
+def git_commit() -> Optional[str]:
+    """현재 작업 트리의 커밋 해시를 반환하는 함수 (변경 사항이 있으면 -dirty 추가)"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=root, text=True).strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=root).returncode != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """프로세스의 상주 메모리(RSS) 크기를 반환하는 함수 (Linux /proc 사용)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+def write_results(benchmark: str, params: Dict, results, output: Optional[str]):
+    """결과를 커밋, 실행 환경과 함께 출력하고 JSON 파일로 저장하는 함수
+
+    같은 형식의 파일을 bench/compare.py로 비교하면 커밋 간 성능 변화를 확인할 수 있다.
+    """
+    report = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
@@ -0,0 +1,62 @@
+"""두 벤치마크 결과 파일(JSON)의 수치를 비교해 성능 변화를 보여주는 스크립트
+
+같은 벤치마크를 두 커밋에서 실행한 결과를 비교하며, 처리량(*_per_sec)이 줄거나
+지연 시간(*_ms, *_seconds, *_bytes)이 늘어난 비율이 --threshold를 넘으면 회귀로 표시하고 종료 코드 1을 반환한다.
+
+    python bench/compare.py results/base.json results/head.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+def flatten(data, prefix=""):
+    """중첩된 결과를 (경로, 숫자 값) 목록으로 펼치는 함수"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            label = value.get("mode", index) if isinstance(value, dict) else index
+            yield from flatten(value, f"{prefix}[{label}]")
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, data
+
+def higher_is_better(path: str) -> bool:
+    return "per_sec" in path
+
+def lower_is_better(path: str) -> bool:
+    return any(unit in path for unit in ("_ms", "_seconds", "_bytes", "rejected", "dropped"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="회귀로 판단할 변화율 (%%)")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    if base.get("benchmark") != head.get("benchmark"):
+        sys.exit(f"Cannot compare {base.get('benchmark')} with {head.get('benchmark')}")
+
+    print(f"{base['benchmark']}: {base.get('commit')} -> {head.get('commit')}")
+    base_values = dict(flatten(base["results"]))
+    regressions = 0
+    for path, value in flatten(head["results"]):
+        if path not in base_values or path.endswith(".count"):
+            continue
+        old = base_values[path]
+        change = (value - old) / old * 100 if old else 0.0
+        regressed = (
+            (higher_is_better(path) and change < -args.threshold)
+            or (lower_is_better(path) and change > args.threshold)
+        )
+        regressions += regressed
+        mark = "REGRESSION" if regressed else ""
+        print(f"{path:60} {old:>14} {value:>14} {change:+8.1f}% {mark}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""웹소켓 채팅 경로 전체(회원가입/로그인 → /ws/{user_id} → 채팅 → PostgreSQL 영속화)를 측정하는 부하 테스트
+
+가상 클라이언트가 각자 계정을 만들어 로그인하고 웹소켓에 연결한 뒤 일정한 속도로 채팅을 보낸다.
+메시지 본문에 전송 시각을 담아 두고, 다른 클라이언트가 받은 시각과의 차이로 종단 간 전달 지연을 구한다.
+측정 항목: 연결 속도, 처리량(전송/수신 메시지 수), 전달 지연 백분위,
+연결당 서버 메모리(서버를 직접 띄우거나 --server-pid를 준 경우), Redis → PostgreSQL 영속화 지연.
+
+이미 실행 중인 서버에 부하를 줄 때:
+    python bench/load_test.py --url http://localhost:8000 --clients 200 --duration 30
+로컬 Redis/PostgreSQL을 쓰는 서버를 직접 띄워서 측정할 때:
+    python bench/load_test.py --spawn --clients 200 --duration 30 --output results/load.json
+
+전송 속도는 서버의 RATE_LIMIT_* 설정보다 낮아야 하며, 그렇지 않으면 rate_limited 응답이 집계된다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+from bench.common import rss_bytes, summarize, write_results
+
+# 부하 테스트 메시지 표시 (다른 사용자의 채팅과 구분)
+MARKER = "bench"
+
+def http_post(url: str, payload: dict) -> dict:
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+def http_get(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+async def create_user(base_url: str, run_id: str, index: int) -> str:
+    """테스트 계정을 만들고 로그인해 사용자 ID를 반환하는 함수"""
+    name = f"b{run_id}{index}"
+    password = "bench-password"
+    await asyncio.to_thread(http_post, f"{base_url}/register", {
+        "username": name, "password": password, "email": f"{name}@bench.local", "nickname": name
+    })
+    result = await asyncio.to_thread(http_post, f"{base_url}/login", {"username": name, "password": password})
+    return result["user_id"]
+
+class Client:
+    """가상 채팅 클라이언트 하나"""
+
+    def __init__(self, index: int, user_id: str):
+        self.index = index
+        self.user_id = user_id
+        self.websocket = None
+        self.sent = 0
+        self.received = 0
+        self.rejected = 0
+        self.latencies = []
+
+    async def connect(self, ws_url: str, query: str):
+        self.websocket = await websockets.connect(f"{ws_url}/ws/{self.user_id}{query}", max_queue=None)
+
+    async def receive(self):
+        """받은 프레임에서 부하 테스트 메시지의 전달 지연을 기록하는 태스크"""
+        async for raw in self.websocket:
+            now = time.time()
+            data = json.loads(raw)
+            for frame in data["frames"] if data.get("type") == "batch" else [data]:
+                kind = frame.get("type")
+                if kind == "ping":
+                    await self.websocket.send(json.dumps({"type": "pong", "t": frame.get("t")}))
+                elif kind in ("rate_limited", "chat_banned"):
+                    self.rejected += 1
+                elif kind == "chat" and frame.get("message", "").startswith(MARKER):
+                    _, sender, sent_at = frame["message"].split(":", 2)
+                    self.received += 1
+                    if sender != str(self.index):
+                        self.latencies.append((now - float(sent_at)) * 1000)
+
+    async def send(self, rate: float, until: float):
+        """종료 시각까지 일정한 속도로 채팅을 보내는 태스크"""
+        interval = 1 / rate
+        # 클라이언트마다 전송 시점을 흩어 동시에 몰리지 않게 함
+        await asyncio.sleep(interval * (self.index % 100) / 100)
+        while time.time() < until:
+            await self.websocket.send(json.dumps({"message": f"{MARKER}:{self.index}:{time.time()}"}))
+            self.sent += 1
+            await asyncio.sleep(interval)
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """로컬 Redis/PostgreSQL 설정으로 uvicorn 서버를 띄우는 함수"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=backend_dir
+    )
+
+async def wait_for_server(base_url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            await asyncio.to_thread(http_get, f"{base_url}/sync_status")
+            return
+        except (urllib.error.URLError, OSError):
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s")
+
+async def poll_sync(base_url: str, samples: list, stop: asyncio.Event):
+    """영속화 지연 지표를 1초마다 기록하는 태스크"""
+    while not stop.is_set():
+        try:
+            samples.append(await asyncio.to_thread(http_get, f"{base_url}/sync_status"))
+        except (urllib.error.URLError, OSError):
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), 1.0)
+        except asyncio.TimeoutError:
+            pass
+
+async def wait_for_drain(base_url: str, timeout: float) -> float:
+    """아웃박스가 모두 PostgreSQL에 저장될 때까지 걸린 시간(초)을 반환하는 함수 (시간 초과 시 -1)"""
+    started = time.time()
+    while time.time() - started < timeout:
+        stats = await asyncio.to_thread(http_get, f"{base_url}/sync_status")
+        if stats["backlog"] == 0:
+            return round(time.time() - started, 2)
+        await asyncio.sleep(0.5)
+    return -1.0
+
+async def run(args) -> dict:
+    base_url = args.url.rstrip("/")
+    ws_url = "ws" + base_url[4:]
+    run_id = uuid.uuid4().hex[:6]
+    query = "?batch=1" if args.batch else ""
+
+    # 1. 계정 생성과 로그인
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(args.setup_concurrency)
+
+    async def setup(index):
+        async with semaphore:
+            return Client(index, await create_user(base_url, run_id, index))
+
+    clients = await asyncio.gather(*(setup(i) for i in range(args.clients)))
+    setup_seconds = time.perf_counter() - started
+
+    # 2. 웹소켓 연결
+    rss_before = rss_bytes(args.server_pid) if args.server_pid else None
+    started = time.perf_counter()
+    connect_times = []
+
+    async def connect(client):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await client.connect(ws_url, query)
+            connect_times.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(connect(c) for c in clients))
+    connect_seconds = time.perf_counter() - started
+    rss_after = rss_bytes(args.server_pid) if args.server_pid else None
+
+    # 3. 채팅 부하
+    receivers = [asyncio.create_task(c.receive()) for c in clients]
+    sync_samples = []
+    stop = asyncio.Event()
+    poller = asyncio.create_task(poll_sync(base_url, sync_samples, stop))
+    until = time.time() + args.duration
+    started = time.perf_counter()
+    await asyncio.gather(*(c.send(args.rate, until) for c in clients))
+    # 마지막 메시지가 전달될 시간을 줌
+    await asyncio.sleep(args.settle)
+    chat_seconds = time.perf_counter() - started
+    drain_seconds = await wait_for_drain(base_url, args.drain_timeout)
+    stop.set()
+    await poller
+
+    for client in clients:
+        await client.websocket.close()
+    for task in receivers:
+        task.cancel()
+    await asyncio.gather(*receivers, return_exceptions=True)
+
+    latencies = [latency for c in clients for latency in c.latencies]
+    sent = sum(c.sent for c in clients)
+    received = sum(c.received for c in clients)
+    return {
+        "setup_seconds": round(setup_seconds, 2),
+        "connects_per_sec": round(args.clients / connect_seconds, 1),
+        "connect_ms": summarize(connect_times, 2),
+        "messages_sent": sent,
+        "messages_sent_per_sec": round(sent / chat_seconds, 1),
+        "deliveries": received,
+        "deliveries_per_sec": round(received / chat_seconds, 1),
+        "rejected": sum(c.rejected for c in clients),
+        "delivery_latency_ms": summarize(latencies, 2),
+        "memory_per_connection_bytes": (
+            round((rss_after - rss_before) / args.clients) if rss_before and rss_after else None
+        ),
+        "sync_lag_seconds_max": round(max((s["lag_seconds"] for s in sync_samples), default=0.0), 3),
+        "sync_backlog_max": max((s["backlog"] for s in sync_samples), default=0),
+        "sync_drain_seconds": drain_seconds,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="서버를 직접 띄워서 측정 (--url의 포트 사용)")
+    parser.add_argument("--server-pid", type=int, help="연결당 메모리를 잴 서버 프로세스 PID")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=1.0, help="클라이언트당 초당 전송 메시지 수")
+    parser.add_argument("--duration", type=float, default=20.0, help="채팅 부하를 주는 시간 (초)")
+    parser.add_argument("--settle", type=float, default=2.0, help="전송이 끝난 뒤 수신을 기다리는 시간 (초)")
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    parser.add_argument("--setup-concurrency", type=int, default=20)
+    parser.add_argument("--batch", action="store_true", help="?batch=1로 묶음 전송을 협상")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = spawn_server(int(args.url.rsplit(":", 1)[1].split("/")[0]))
+        args.server_pid = server.pid
+    try:
+        await wait_for_server(args.url.rstrip("/"))
+        results = await run(args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "server_pid")}
+    write_results("load_test", params, results, args.output)
+
+if __name__ == "__main__":
+    asyncio.run(main())
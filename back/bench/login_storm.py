@@ -0,0 +1,90 @@
+"""로그인 폭주 중 이벤트 루프 지연(채팅 지연)을 측정하는 벤치마크
+
+bcrypt를 핸들러 안에서 직접 실행하는 경우(inline)와 PasswordHasher 워커 풀에서
+실행하는 경우(pool)를 비교한다. 10ms마다 깨어나는 티커가 채팅 메시지 처리를 대신하며,
+티커가 예정보다 늦게 깨어난 시간이 곧 그동안 모든 웹소켓이 겪는 추가 지연이다.
+
+    python bench/login_storm.py --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+from password_hasher import PasswordHasher, PasswordHasherBusy
+from bench.common import percentile, write_results
+
+TICK_INTERVAL = 0.01
+
+async def ticker(lags, stop):
+    """일정 간격으로 깨어나며 예정 시각 대비 지연을 기록하는 태스크"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_INTERVAL
+        await asyncio.sleep(TICK_INTERVAL)
+        lags.append((loop.time() - expected) * 1000)
+
+async def run_storm(mode, logins, concurrency, hasher, hashed):
+    """지정한 방식으로 로그인 검증을 동시에 실행하는 함수"""
+    semaphore = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            if mode == "inline":
+                bcrypt.checkpw(b"password", hashed)
+                # 실제 핸들러처럼 다른 코루틴에 실행 기회를 줌
+                await asyncio.sleep(0)
+            else:
+                try:
+                    await hasher.verify("password", hashed.decode("utf-8"))
+                except PasswordHasherBusy:
+                    rejected += 1
+
+    lags = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick_task
+    lags.sort()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "rejected": rejected,
+        "logins_per_sec": round(logins / elapsed, 1),
+        "loop_lag_ms_p50": round(percentile(lags, 50), 2),
+        "loop_lag_ms_p99": round(percentile(lags, 99), 2),
+        "loop_lag_ms_max": round(lags[-1] if lags else 0.0, 2),
+        "loop_lag_ms_mean": round(statistics.mean(lags) if lags else 0.0, 2),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-pending", type=int, default=1000)
+    parser.add_argument("--processes", action="store_true", help="스레드 대신 프로세스 풀 사용")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b"password", bcrypt.gensalt())
+    hasher = PasswordHasher(args.workers, args.max_pending, args.processes)
+    results = []
+    for mode in ("inline", "pool"):
+        results.append(await run_storm(mode, args.logins, args.concurrency, hasher, hashed))
+    hasher.shutdown()
+
+    write_results("login_storm", vars(args), results, args.output)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""연결 수에 따른 ConnectionManager의 연결당 메모리 사용량을 재는 벤치마크
+
+가짜 웹소켓으로 연결 N개를 등록하고(연결 레코드, 송신 큐와 writer 태스크, 채팅방 인덱스,
+생존 확인 등록 포함, Redis 왕복 제외) tracemalloc과 RSS 증가량을 연결 수로 나눈다.
+모든 연결을 해제한 뒤 남은 메모리도 함께 기록해 연결 상태가 남지 않는지 확인한다.
+해제 후 남는 메모리는 줄어들지 않는 dict/set 해시 테이블(연결 인덱스, 타이머 휠, asyncio 태스크 집합)의 용량이다.
+
+    python bench/memory.py --connections 10000 100000 --output results/memory.json
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.common import rss_bytes, write_results
+from bench.micro import NullWebSocket
+
+async def measure(connections: int) -> dict:
+    """연결 connections개를 등록하고 해제하면서 메모리 사용량을 재는 함수"""
+    from connection_manager import ConnectionManager
+
+    manager = ConnectionManager()
+    gc.collect()
+    rss_before = rss_bytes(os.getpid())
+    tracemalloc.start()
+    traced_before = tracemalloc.get_traced_memory()[0]
+
+    registered = []
+    for i in range(connections):
+        sender_id = f"bench-{i}"
+        registered.append(manager._register(NullWebSocket(), sender_id, f"user{i}", f"nick{i}", "127.0.0.1"))
+    # writer 태스크가 첫 대기 상태에 들어갈 때까지 진행
+    await asyncio.sleep(0)
+    # 연결 레코드 자체의 크기 (__slots__ 객체, 참조하는 객체 제외)
+    record_bytes = sys.getsizeof(registered[0])
+    gc.collect()
+    traced_connected = tracemalloc.get_traced_memory()[0]
+    rss_connected = rss_bytes(os.getpid())
+
+    # disconnect와 같은 순서로 정리 (접속자 집합 갱신은 Redis 왕복이라 제외)
+    for connection in registered:
+        manager._unregister(connection)
+        connection.outbound.abort()
+    registered.clear()
+    # 취소된 writer 태스크가 종료될 때까지 진행
+    for _ in range(3):
+        await asyncio.sleep(0)
+    gc.collect()
+    traced_released = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {
+        "connections": connections,
+        "bytes_per_connection": round((traced_connected - traced_before) / connections),
+        "record_bytes": record_bytes,
+        "rss_bytes_per_connection": round((rss_connected - rss_before) / connections) if rss_before else None,
+        "bytes_left_after_disconnect": traced_released - traced_before,
+        "rooms_left": len(manager.rooms),
+        "tracked_left": manager.liveness.stats()["connections"],
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    results = {}
+    for connections in args.connections:
+        results[str(connections)] = await measure(connections)
+
+    write_results("memory", vars(args), results, args.output)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,228 @@
+"""채팅 hot path 함수별 마이크로 벤치마크
+
+- broadcast: 연결 N개가 참여한 채팅방에 ConnectionManager.broadcast로 메시지를 보내고
+  모든 송신 큐가 비워질 때까지의 시간 (웹소켓은 전송만 세는 가짜 객체, Redis 쓰기 포함)
+- add_message: RedisManager.add_message 한 건씩 / add_messages 묶음 쓰기
+- save_messages_from_redis: PostgresManager.save_messages_from_redis 묶음 저장
+- content_filter: 금칙어 N개로 만든 Aho-Corasick 오토마톤의 생성 시간과 메시지 길이별 검사 시간
+  (같은 규칙을 부분 문자열 반복으로 검사하는 경우와 비교, Redis 불필요)
+
+Redis는 REDIS_URL을 사용하며, --fake-redis를 주면 fakeredis(별도 설치)로 대신한다.
+save_messages_from_redis는 --postgres를 준 경우에만 로컬 PostgreSQL에 대해 실행한다.
+
+    python bench/micro.py --connections 1000 --messages 200 --output results/micro.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.common import summarize, write_results
+from redis_manager import redis_manager
+import config
+
+class NullWebSocket:
+    """전송한 프레임 수만 세는 웹소켓 대역"""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.frames += 1
+
+    async def send_bytes(self, data):
+        self.frames += 1
+
+    async def close(self, code=1000):
+        pass
+
+async def bench_broadcast(connections: int, messages: int) -> dict:
+    """메시지 하나를 채팅방 멤버 전체의 송신 큐에 넣고 모두 전송될 때까지의 시간을 재는 함수"""
+    from connection_manager import ConnectionManager
+
+    manager = ConnectionManager()
+    sockets = []
+    for i in range(connections):
+        websocket = NullWebSocket()
+        sockets.append(websocket)
+        await manager.connect(websocket, f"bench-{i}", f"user{i}", f"nick{i}")
+    # 전송 속도 제한에 걸리지 않도록 발신자를 돌아가며 사용
+    senders = [f"bench-{i}" for i in range(connections)]
+    timings = []
+    started = time.perf_counter()
+    for n in range(messages):
+        sender = senders[n % len(senders)]
+        expected = sum(s.frames for s in sockets) + connections
+        t0 = time.perf_counter()
+        await manager.broadcast(f"message {n}", sender, sender, sender)
+        # writer 태스크가 모든 큐를 비울 때까지 대기
+        while sum(s.frames for s in sockets) < expected:
+            await asyncio.sleep(0)
+        timings.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    for i in range(connections):
+        await manager.disconnect(f"bench-{i}")
+    return {
+        "connections": connections,
+        "messages": messages,
+        "messages_per_sec": round(messages / elapsed, 1),
+        "deliveries_per_sec": round(messages * connections / elapsed, 1),
+        "latency_ms": summarize(timings),
+    }
+
+async def bench_add_message(messages: int, batch: int) -> dict:
+    """Redis 쓰기를 한 건씩 보낼 때와 묶어서 보낼 때의 처리량을 재는 함수"""
+    sender = str(uuid.uuid4())
+    rows = [(sender, f"message {n}", "bench", "bench", config.DEFAULT_ROOM) for n in range(messages)]
+
+    timings = []
+    started = time.perf_counter()
+    for row in rows:
+        t0 = time.perf_counter()
+        await redis_manager.add_message(*row)
+        timings.append((time.perf_counter() - t0) * 1000)
+    single_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(0, messages, batch):
+        await redis_manager.add_messages(rows[i:i + batch])
+    batch_elapsed = time.perf_counter() - started
+
+    await redis_manager.redis.delete(f"user:{sender}:messages")
+    return {
+        "messages": messages,
+        "single_per_sec": round(messages / single_elapsed, 1),
+        "single_latency_ms": summarize(timings),
+        "batch_size": batch,
+        "batch_per_sec": round(messages / batch_elapsed, 1),
+    }
+
+async def bench_save_messages(messages: int, batch: int) -> dict:
+    """아웃박스 묶음을 PostgreSQL에 저장하는 처리량을 재는 함수"""
+    from postgresql_manager import postgres_manager
+
+    await postgres_manager.start()
+    try:
+        name = f"bench{uuid.uuid4().hex[:8]}"
+        success, user_id = await postgres_manager.register_user(name, "bench-password", f"{name}@bench.local", name)
+        if not success:
+            raise RuntimeError(f"Could not create benchmark user: {user_id}")
+        now = time.time()
+        payloads = [{
+            "message_id": uuid.uuid4().hex,
+            "room": config.DEFAULT_ROOM,
+            "content": f"message {n}",
+            "sender_id": user_id,
+            "username": name,
+            "nickname": name,
+            "timestamp": now + n / 1000,
+        } for n in range(messages)]
+        timings = []
+        started = time.perf_counter()
+        for i in range(0, messages, batch):
+            t0 = time.perf_counter()
+            if not await postgres_manager.save_messages_from_redis(payloads[i:i + batch]):
+                raise RuntimeError("save_messages_from_redis failed")
+            timings.append((time.perf_counter() - t0) * 1000)
+        elapsed = time.perf_counter() - started
+        # 재전달된 묶음(이미 저장된 메시지)을 걸러내는 비용
+        t0 = time.perf_counter()
+        await postgres_manager.save_messages_from_redis(payloads[:batch])
+        redelivery_ms = (time.perf_counter() - t0) * 1000
+        return {
+            "messages": messages,
+            "batch_size": batch,
+            "messages_per_sec": round(messages / elapsed, 1),
+            "batch_latency_ms": summarize(timings),
+            "redelivered_batch_ms": round(redelivery_ms, 3),
+        }
+    finally:
+        await postgres_manager.stop()
+
+def bench_content_filter(patterns: int, messages: int) -> dict:
+    """금칙어 수와 메시지 길이에 따른 내용 필터 검사 시간을 재는 함수"""
+    from content_filter import ContentFilter, MASK
+
+    rng = random.Random(42)
+    alphabet = string.ascii_lowercase + "가나다라마바사아자차카타파하"
+    words = {"".join(rng.choices(alphabet, k=rng.randint(3, 10))) for _ in range(patterns)}
+    rules = [(word, MASK, False) for word in words]
+    content_filter = ContentFilter("", "", MASK, "", "*", False, 10.0)
+
+    t0 = time.perf_counter()
+    content_filter.load_rules(rules)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    results = {"patterns": len(rules), "build_ms": round(build_ms, 1), "by_length": {}}
+    for length in (50, 200, 1000):
+        samples = ["".join(rng.choices(alphabet + " ", k=length)) for _ in range(messages)]
+        timings = []
+        for text in samples:
+            t0 = time.perf_counter()
+            content_filter.check(text)
+            timings.append((time.perf_counter() - t0) * 1_000_000)
+        # 비교용: 규칙마다 부분 문자열 검사해 맞은 규칙을 모두 찾음 (규칙 수에 비례)
+        t0 = time.perf_counter()
+        for text in samples[:20]:
+            [word for word in words if word in text]
+        naive_us = (time.perf_counter() - t0) * 1_000_000 / min(20, len(samples))
+        results["by_length"][str(length)] = {
+            "check_us": summarize(timings),
+            "naive_substring_us": round(naive_us, 1),
+        }
+    return results
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--redis-messages", type=int, default=2000)
+    parser.add_argument("--db-messages", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--fake-redis", action="store_true", help="fakeredis로 Redis를 대신함")
+    parser.add_argument("--postgres", action="store_true", help="로컬 PostgreSQL로 save_messages_from_redis 측정")
+    parser.add_argument("--patterns", type=int, default=10000, help="content_filter 벤치마크의 금칙어 수")
+    parser.add_argument("--only", choices=["broadcast", "add_message", "save_messages_from_redis", "content_filter"])
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    results = {}
+    if args.only in (None, "content_filter"):
+        results["content_filter"] = bench_content_filter(args.patterns, args.messages)
+    if args.only == "content_filter":
+        write_results("micro", vars(args), results, args.output)
+        return
+
+    if args.fake_redis:
+        import fakeredis.aioredis
+        redis_manager.redis = fakeredis.aioredis.FakeRedis()
+    else:
+        await redis_manager.connect()
+    # 벤치마크 발신자는 속도 제한 대상에서 제외
+    config.RATE_LIMIT_CAPACITY = config.RATE_LIMIT_CAPACITY * 1_000_000
+    config.SPAM_THRESHOLD = sys.maxsize
+
+    if args.only in (None, "broadcast"):
+        results["broadcast"] = await bench_broadcast(args.connections, args.messages)
+    if args.only in (None, "add_message"):
+        results["add_message"] = await bench_add_message(args.redis_messages, args.batch)
+    if args.only in (None, "save_messages_from_redis"):
+        if args.postgres:
+            results["save_messages_from_redis"] = await bench_save_messages(args.db_messages, args.batch)
+        else:
+            results["save_messages_from_redis"] = {"skipped": "pass --postgres to run against a local PostgreSQL"}
+    await redis_manager.disconnect()
+
+    write_results("micro", vars(args), results, args.output)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+import json
+from typing import Dict, List, Optional, Union
+import msgpack
+from fastapi import WebSocket, WebSocketDisconnect
+
+# 프로토콜 버전별 코덱
+JSON = "json"        # 프로토콜 1: JSON 텍스트 프레임 (기본값)
+MSGPACK = "msgpack"  # 프로토콜 2: 짧은 정수 태그를 키로 쓰는 MessagePack 바이너리 프레임
+PROTOCOLS = {"1": JSON, "2": MSGPACK}
+
+# 프로토콜 2에서 자주 쓰는 필드 이름을 대신하는 정수 태그
+# 클라이언트(front/src/protocol.js)의 FIELD_NAMES와 순서가 같아야 하며, 새 필드는 끝에만 추가
+FIELD_NAMES = (
+    "type", "message", "sender_id", "username", "nickname", "timestamp", "room",
+    "count", "time_left", "retry_after", "t", "frames", "message_id", "reason", "seq",
+)
+FIELD_TAGS = {name: tag for tag, name in enumerate(FIELD_NAMES)}
+
+def encode_frame(data: Dict) -> str:
+    """프레임을 JSON 텍스트로 한 번만 인코딩하는 함수 (Starlette send_json과 동일한 형식)"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def _tag(data: Dict) -> Dict:
+    """필드 이름을 정수 태그로 바꾸는 함수 (태그가 없는 필드는 이름 그대로 유지)"""
+    return {FIELD_TAGS.get(key, key): value for key, value in data.items()}
+
+def _untag(data: Dict) -> Dict:
+    """정수 태그를 필드 이름으로 되돌리는 함수"""
+    return {
+        FIELD_NAMES[key] if isinstance(key, int) and 0 <= key < len(FIELD_NAMES) else key: value
+        for key, value in data.items()
+    }
+
+def pack_frame(data: Dict) -> bytes:
+    """프레임을 태그가 붙은 MessagePack 바이너리로 인코딩하는 함수"""
+    return msgpack.packb(_tag(data), use_bin_type=True)
+
+def unpack_frame(raw: bytes) -> Dict:
+    """태그가 붙은 MessagePack 바이너리 프레임을 디코딩하는 함수"""
+    data = msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    if not isinstance(data, dict):
+        raise ValueError("Frame must be a map")
+    return _untag(data)
+
+# batch 프레임 머리 부분: {0("type"): "batch", 11("frames"): [...]}
+_BATCH_PREFIX = b"\x82" + msgpack.packb(FIELD_TAGS["type"]) + msgpack.packb("batch") + msgpack.packb(FIELD_TAGS["frames"])
+
+def encode_batch(items: List[Union[str, bytes]], codec: str = JSON) -> Union[str, bytes]:
+    """인코딩된 프레임들을 다시 인코딩하지 않고 하나의 batch 프레임으로 합치는 함수"""
+    if codec == MSGPACK:
+        return _BATCH_PREFIX + msgpack.Packer().pack_array_header(len(items)) + b"".join(items)
+    return '{"type":"batch","frames":[' + ",".join(items) + "]}"
+
+class Frame:
+    """송신 프레임 하나와 코덱별 인코딩 결과를 담는 클래스
+
+    코덱별 인코딩은 해당 코덱을 쓰는 연결에 처음 전달될 때 한 번만 수행된다.
+    백플레인에서 받은 프레임처럼 JSON 텍스트만 있는 경우에도 필요할 때만 디코딩한다.
+    """
+
+    __slots__ = ("_payload", "_text", "_binary")
+
+    def __init__(self, payload: Optional[Dict] = None, text: Optional[str] = None):
+        self._payload = payload
+        self._text = text
+        self._binary = None
+
+    @property
+    def payload(self) -> Dict:
+        if self._payload is None:
+            self._payload = json.loads(self._text)
+        return self._payload
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = encode_frame(self._payload)
+        return self._text
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = pack_frame(self.payload)
+        return self._binary
+
+    def encode(self, codec: str) -> Union[str, bytes]:
+        """연결의 코덱에 맞게 인코딩된 프레임을 반환하는 메서드"""
+        return self.binary if codec == MSGPACK else self.text
+
+async def receive_frame(websocket: WebSocket) -> Dict:
+    """텍스트(JSON) 또는 바이너리(MessagePack) 프레임을 받아 디코딩하는 함수"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        return unpack_frame(message["bytes"])
+    return json.loads(message["text"])
@@ -0,0 +1,183 @@
+import os
+import socket
+
+# 환경 변수에서 설정 값을 읽어오는 헬퍼 함수들
+def _env_str(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+# 브로드캐스트 팬아웃 설정
+# 연결별 송신 큐의 최대 프레임 수
+OUTBOUND_QUEUE_SIZE = _env_int("OUTBOUND_QUEUE_SIZE", 256)
+# 큐가 가득 찬 느린 소비자 처리 정책 (drop | coalesce | evict)
+SLOW_CONSUMER_POLICY = _env_str("SLOW_CONSUMER_POLICY", "coalesce")
+# 프레임 하나를 전송할 때 허용하는 최대 시간 (초), 초과 시 연결 퇴출
+SEND_TIMEOUT = _env_float("SEND_TIMEOUT", 5.0)
+
+# Redis 연결 설정
+REDIS_URL = _env_str("REDIS_URL", "redis://localhost")
+
+# 멀티 워커/멀티 호스트 백플레인 설정
+# 활성화하면 브로드캐스트가 Redis pub/sub을 거쳐 모든 워커의 로컬 소켓에 전달됨
+BACKPLANE_ENABLED = _env_bool("CHAT_BACKPLANE", False)
+BACKPLANE_CHANNEL = _env_str("BACKPLANE_CHANNEL", "chat:backplane")
+# 노드(워커 프로세스) 식별자: 호스트 이름(또는 NODE_NAME)과 PID로 생성
+NODE_ID = f"{_env_str('NODE_NAME', '') or socket.gethostname()}:{os.getpid()}"
+# uvicorn 워커 프로세스 수 (main.py를 직접 실행할 때 사용)
+WORKERS = _env_int("WORKERS", 1)
+
+# Redis → PostgreSQL 영속화 아웃박스 (Redis Streams) 설정
+OUTBOX_STREAM = _env_str("OUTBOX_STREAM", "messages:outbox")
+OUTBOX_GROUP = _env_str("OUTBOX_GROUP", "postgres_sync")
+# 한 번에 읽어서 저장할 최대 메시지 수
+SYNC_BATCH_SIZE = _env_int("SYNC_BATCH_SIZE", 500)
+# 새 메시지를 기다리는 최대 블로킹 시간 (밀리초)
+SYNC_BLOCK_MS = _env_int("SYNC_BLOCK_MS", 1000)
+# 이 시간 이상 확인되지 않은 메시지는 중단된 컨슈머의 것으로 보고 회수 (밀리초)
+OUTBOX_CLAIM_IDLE_MS = _env_int("OUTBOX_CLAIM_IDLE_MS", 30000)
+# 아웃박스 스트림의 최대 길이 (PostgreSQL 장애가 길어져도 Redis 메모리가 바닥나지 않도록 대략적으로 자름, 0이면 제한 없음)
+OUTBOX_MAX_LEN = _env_int("OUTBOX_MAX_LEN", 1000000)
+# 대기 중인 메시지가 최대 길이의 이 비율을 넘으면 경보 (최대 길이에 닿으면 가장 오래된 미영속화 메시지부터 잘림)
+OUTBOX_ALERT_RATIO = _env_float("OUTBOX_ALERT_RATIO", 0.8)
+
+# PostgreSQL 파티션 관리 설정
+# 오늘 이후 미리 만들어 둘 일별 파티션 수
+PARTITION_DAYS_AHEAD = _env_int("PARTITION_DAYS_AHEAD", 3)
+# 테이블별 파티션 보존 기간 (일, 기본값 0은 정리하지 않음, 기록을 지우게 되므로 명시적으로 설정해야 함)
+MESSAGES_RETENTION_DAYS = _env_int("MESSAGES_RETENTION_DAYS", 0)
+SESSIONS_RETENTION_DAYS = _env_int("SESSIONS_RETENTION_DAYS", 0)
+# 보존 기간이 지난 파티션 처리 방식 (detach | drop, detach는 테이블을 남겨 두므로 되돌릴 수 있음)
+PARTITION_RETENTION_ACTION = _env_str("PARTITION_RETENTION_ACTION", "detach")
+# 파티션 유지보수 주기 (초)
+PARTITION_MAINTENANCE_INTERVAL = _env_int("PARTITION_MAINTENANCE_INTERVAL", 3600)
+
+# 비밀번호 해시(bcrypt) 워커 풀 설정
+PASSWORD_HASH_WORKERS = _env_int("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))
+# 워커가 모두 사용 중일 때 대기할 수 있는 최대 요청 수 (초과 시 503 응답)
+PASSWORD_HASH_MAX_PENDING = _env_int("PASSWORD_HASH_MAX_PENDING", 64)
+# 스레드 대신 프로세스 풀 사용 여부
+PASSWORD_HASH_USE_PROCESSES = _env_bool("PASSWORD_HASH_USE_PROCESSES", False)
+
+# 사용자 정보 캐시 설정 (웹소켓 핸드셰이크 시 사용)
+# 프로세스 내 캐시의 최대 항목 수와 유효 시간 (초)
+USER_CACHE_SIZE = _env_int("USER_CACHE_SIZE", 10000)
+USER_CACHE_TTL = _env_float("USER_CACHE_TTL", 300.0)
+# 워커 간에 공유하는 Redis 해시 캐시 사용 여부와 유효 시간 (초)
+USER_CACHE_REDIS = _env_bool("USER_CACHE_REDIS", True)
+USER_CACHE_REDIS_TTL = _env_int("USER_CACHE_REDIS_TTL", 3600)
+
+# 채팅방 설정
+# 연결 시 자동으로 참여하는 기본 채팅방 (기존 전체 채팅)
+DEFAULT_ROOM = _env_str("DEFAULT_ROOM", "general")
+# 연결 하나가 동시에 참여할 수 있는 최대 채팅방 수
+MAX_ROOMS_PER_CONNECTION = _env_int("MAX_ROOMS_PER_CONNECTION", 20)
+
+# 접속자(presence) 설정
+# 노드 하트비트 주기 (초), 매 주기마다 전체 접속자 수를 한 번 계산
+PRESENCE_HEARTBEAT_INTERVAL = _env_float("PRESENCE_HEARTBEAT_INTERVAL", 1.0)
+# 이 시간 동안 하트비트가 없는 노드의 접속자는 집계에서 제외되고 만료됨 (초)
+PRESENCE_TTL = _env_int("PRESENCE_TTL", 15)
+# 접속자 수가 바뀌었을 때 클라이언트에 보내는 최소 간격 (초)
+USER_COUNT_MIN_PUSH_INTERVAL = _env_float("USER_COUNT_MIN_PUSH_INTERVAL", 2.0)
+
+# 전송 속도 제한 및 스팸 차단 설정
+# 제한기 구현 (redis: 워커 간 공유 | local: 프로세스 내)
+RATE_LIMITER_BACKEND = _env_str("RATE_LIMITER_BACKEND", "redis")
+# 사용자별 토큰 버킷 (최대 연속 전송 수, 초당 충전 토큰 수)
+RATE_LIMIT_CAPACITY = _env_int("RATE_LIMIT_CAPACITY", 10)
+RATE_LIMIT_REFILL = _env_float("RATE_LIMIT_REFILL", 2.0)
+# IP별 토큰 버킷 (0이면 사용하지 않음)
+IP_RATE_LIMIT_CAPACITY = _env_int("IP_RATE_LIMIT_CAPACITY", 0)
+IP_RATE_LIMIT_REFILL = _env_float("IP_RATE_LIMIT_REFILL", 6.0)
+# 스팸 감지: 시간 윈도우(초) 안에 같은 메시지를 임계값 이상 보내면 차단
+SPAM_WINDOW = _env_float("SPAM_WINDOW", 5.0)
+SPAM_THRESHOLD = _env_int("SPAM_THRESHOLD", 4)
+# 차단 시간 (초)
+BAN_DURATION = _env_int("BAN_DURATION", 20)
+
+# 연결 생존 확인(liveness) 설정
+# 이 시간 동안 아무 메시지도 받지 못한 연결에 ping 전송 (초)
+PING_INTERVAL = _env_float("PING_INTERVAL", 25.0)
+# 이 시간 동안 아무 메시지(pong 포함)도 받지 못한 연결은 끊음 (초)
+IDLE_TIMEOUT = _env_float("IDLE_TIMEOUT", 75.0)
+# 타이머 휠 한 칸의 시간 (초), 연결 확인 시점의 정밀도
+LIVENESS_TICK = _env_float("LIVENESS_TICK", 1.0)
+
+# 송신 프레임 묶음 전송(batching) 설정 (클라이언트가 ?batch=1로 연결했을 때만 적용)
+# 첫 프레임 이후 다른 프레임을 기다리는 최대 시간 (밀리초)
+BATCH_WINDOW_MS = _env_float("BATCH_WINDOW_MS", 10.0)
+# 묶음 하나에 담는 최대 프레임 수
+BATCH_MAX_FRAMES = _env_int("BATCH_MAX_FRAMES", 32)
+
+# 웹소켓 압축 설정
+# permessage-deflate 압축 사용 여부 (main.py로 직접 실행할 때 uvicorn에 전달)
+# 대역폭을 줄이는 대신 연결별 압축 컨텍스트만큼 CPU와 메모리를 더 사용
+WS_PER_MESSAGE_DEFLATE = _env_bool("WS_PER_MESSAGE_DEFLATE", True)
+
+# 로컬 쓰기 전 로그(WAL) 설정 (Redis 장애 시 메시지를 로컬 파일에 보관했다가 복구 후 재전송)
+# 로그 디렉터리 (워커마다 하위 디렉터리 사용)
+WAL_DIR = _env_str("WAL_DIR", "wal")
+# 세그먼트 파일 하나의 최대 크기와 전체 로그의 최대 크기 (바이트, 초과 시 가장 오래된 세그먼트 삭제)
+WAL_SEGMENT_BYTES = _env_int("WAL_SEGMENT_BYTES", 16 * 1024 * 1024)
+WAL_MAX_BYTES = _env_int("WAL_MAX_BYTES", 512 * 1024 * 1024)
+# 디스크 동기화 정책 (always: 기록마다 | interval: WAL_FSYNC_INTERVAL마다 | never: OS에 맡김)
+WAL_FSYNC = _env_str("WAL_FSYNC", "interval")
+WAL_FSYNC_INTERVAL = _env_float("WAL_FSYNC_INTERVAL", 1.0)
+# 장애 상태에서 Redis 복구를 확인하는 주기 (초)
+WAL_RECOVERY_INTERVAL = _env_float("WAL_RECOVERY_INTERVAL", 2.0)
+# 복구 후 한 번에 재전송하는 메시지 수
+WAL_REPLAY_BATCH = _env_int("WAL_REPLAY_BATCH", 500)
+
+# 재연결 시 놓친 메시지 재전송(resume) 설정
+# 재전송할 최대 메시지 수 (놓친 메시지가 더 많으면 클라이언트가 최근 메시지 전체를 다시 불러옴)
+RESUME_MAX_GAP = _env_int("RESUME_MAX_GAP", 500)
+
+# 웹소켓 입장 제어 설정 (재시작 후 재연결 폭주 완화, 워커별 적용)
+# 동시에 진행할 수 있는 최대 핸드셰이크 수
+ADMISSION_MAX_HANDSHAKES = _env_int("ADMISSION_MAX_HANDSHAKES", 64)
+# 초당 허용 연결 수와 순간 허용량 (속도가 0이면 제한하지 않음)
+ADMISSION_CONNECT_RATE = _env_float("ADMISSION_CONNECT_RATE", 200.0)
+ADMISSION_CONNECT_BURST = _env_int("ADMISSION_CONNECT_BURST", 400)
+# 거절한 연결의 재연결 시점에 더하는 임의 지연의 최대값과 전체 대기 시간 상한 (초)
+ADMISSION_RETRY_JITTER = _env_float("ADMISSION_RETRY_JITTER", 2.0)
+ADMISSION_MAX_RETRY_AFTER = _env_float("ADMISSION_MAX_RETRY_AFTER", 60.0)
+# 종료 시 연결을 닫으며 알려주는 재연결 대기 시간의 범위 (0~이 값 사이에서 연결마다 임의로 선택, 초)
+DRAIN_RECONNECT_JITTER = _env_float("DRAIN_RECONNECT_JITTER", 15.0)
+
+# 금칙어/링크 필터 설정 (브로드캐스트 전에 Aho-Corasick 오토마톤으로 검사)
+# 규칙 파일 경로와 Redis 키 (둘 다 비어 있고 링크 조치도 없으면 사용하지 않음, 둘 다 설정하면 합쳐서 사용)
+# 한 줄에 규칙 하나, "reject:단어"처럼 조치를 붙일 수 있고 '*'로 끝나면 단어 끝까지 대상
+# Redis 규칙을 바꾼 뒤에는 {키}:version 값을 증가시켜야 다시 읽음
+CONTENT_FILTER_FILE = _env_str("CONTENT_FILTER_FILE", "")
+CONTENT_FILTER_REDIS_KEY = _env_str("CONTENT_FILTER_REDIS_KEY", "")
+# 조치를 붙이지 않은 규칙의 조치 (mask | reject | flag)
+CONTENT_FILTER_DEFAULT_ACTION = _env_str("CONTENT_FILTER_DEFAULT_ACTION", "mask")
+# 링크(http://, https://, www.)에 적용할 조치 (비어 있으면 검사하지 않음)
+CONTENT_FILTER_LINK_ACTION = _env_str("CONTENT_FILTER_LINK_ACTION", "")
+# 가릴 때 사용할 문자
+CONTENT_FILTER_MASK_CHAR = _env_str("CONTENT_FILTER_MASK_CHAR", "*")
+# 단어 일부로 맞은 경우를 무시할지 여부 (띄어쓰기 없이 조사가 붙는 한국어에서는 끄는 것을 권장)
+CONTENT_FILTER_WHOLE_WORDS = _env_bool("CONTENT_FILTER_WHOLE_WORDS", False)
+# 규칙 원본 변경 확인 주기 (초)
+CONTENT_FILTER_RELOAD_INTERVAL = _env_float("CONTENT_FILTER_RELOAD_INTERVAL", 10.0)
+
+# 접속 기록(user_sessions) 설정 (접속/종료를 버퍼에 모았다가 일괄 저장, 핸드셰이크에서 PostgreSQL을 기다리지 않음)
+SESSION_AUDIT_ENABLED = _env_bool("SESSION_AUDIT_ENABLED", True)
+# 이만큼 쌓이면 바로 저장하고, 그렇지 않으면 주기(초)마다 저장
+SESSION_AUDIT_BATCH_SIZE = _env_int("SESSION_AUDIT_BATCH_SIZE", 500)
+SESSION_AUDIT_FLUSH_INTERVAL = _env_float("SESSION_AUDIT_FLUSH_INTERVAL", 2.0)
+# 저장하지 못하고 쌓인 기록의 최대 수 (초과하면 새 기록을 버림)
+SESSION_AUDIT_MAX_BUFFER = _env_int("SESSION_AUDIT_MAX_BUFFER", 50000)
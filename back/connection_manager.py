@@ -1,170 +1,426 @@
 from fastapi import WebSocket
-from typing import Dict, Set
-from collections import defaultdict, deque
-import json
+from typing import Dict, List, Optional, Set
+import math
+import random
+import re
 import time
 import logging
 import asyncio
+from outbound import OutboundQueue
+from codec import Frame, JSON
+from backplane import Backplane
+from response_cache import recent_messages_cache
+from presence import presence
+from liveness import LivenessTracker
+from metrics import (
+    chat_messages, chat_rate_limited, chat_bans, chat_disconnects, chat_fanout_seconds,
+    chat_active_connections, chat_outbound_queue_depth, chat_outbound_queue_depth_max
+)
+from rate_limiter import rate_limiter, RATE_LIMITED, BANNED, NEWLY_BANNED
+from wal import wal, BACKEND_ERRORS
+from admission import CLOSE_SERVICE_RESTART, retry_after_reason
 from redis_manager import redis_manager
+from content_filter import content_filter, FLAG, REJECT
+from session_audit import session_audit
+import config
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
 
+# 채팅방 이름 형식 (영문, 숫자, '_', '-'로 된 1~64자)
+ROOM_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class ClientConnection:
+    """웹소켓 연결 하나의 상태를 모아 둔 레코드
+
+    연결마다 사전 항목을 여러 개 두지 않도록 소켓, 사용자 정보, 송신 큐, 참여 채팅방,
+    생존 확인 상태, 차단 캐시를 __slots__ 객체 하나에 담는다. 연결이 끊기면 레코드를 버리는 것으로
+    연결에 딸린 상태가 모두 정리된다.
+    """
+
+    __slots__ = (
+        "websocket", "sender_id", "username", "nickname", "ip", "connected_at",
+        "outbound", "rooms", "last_seen", "rtt", "banned_until", "session_id"
+    )
+
+    def __init__(self, websocket: WebSocket, sender_id: str, username: str, nickname: str, ip: Optional[str] = None):
+        self.websocket = websocket
+        self.sender_id = sender_id
+        self.username = username
+        self.nickname = nickname
+        self.ip = ip
+        self.connected_at = time.time()
+        self.outbound: Optional[OutboundQueue] = None
+        # 참여 중인 채팅방 이름
+        self.rooms: Set[str] = set()
+        # 마지막으로 메시지를 받은 시각 (monotonic)과 RTT 지수 이동 평균 (밀리초), LivenessTracker가 갱신
+        self.last_seen = 0.0
+        self.rtt: Optional[float] = None
+        # 차단 해제 시각 (차단 중에는 Redis 왕복 없이 거절)
+        self.banned_until = 0.0
+        # user_sessions 기록 ID (접속 기록을 남기지 않으면 None)
+        self.session_id = None
+
 class ConnectionManager:
     def __init__(self):
-        # 활성 웹소켓 연결을 저장하는 딕셔너리
-        self.active_connections: Dict[str, WebSocket] = {}
-        # 사용자별 최근 메시지를 저장하는 딕셔너리 (최대 4개)
-        self.user_messages: Dict[str, deque] = defaultdict(lambda: deque(maxlen=4))
-        # 사용자 차단 정보를 저장하는 딕셔너리
-        self.user_ban_until: Dict[str, float] = {}
-        # 사용자 닉네임을 저장하는 딕셔너리
-        self.user_nicknames: Dict[str, str] = {}
-        # 스팸 감지를 위한 설정
-        self.spam_window = 5  # 스팸 감지 시간 윈도우 (초)
-        self.spam_threshold = 4  # 스팸으로 간주할 메시지 수 임계값
+        # 사용자 ID -> 활성 연결 레코드
+        self.connections: Dict[str, ClientConnection] = {}
+        # 채팅방별 참여 연결 집합 (채팅방 -> 연결 레코드)
+        self.rooms: Dict[str, Set[ClientConnection]] = {}
+        # 느린 소비자 처리 설정
+        self.outbound_queue_size = config.OUTBOUND_QUEUE_SIZE
+        self.slow_consumer_policy = config.SLOW_CONSUMER_POLICY
+        self.send_timeout = config.SEND_TIMEOUT
+        # 연결별 생존 확인 (타이머 휠 기반 ping 및 유휴 연결 종료)
+        self.liveness = LivenessTracker(
+            on_ping=self._send_ping,
+            on_timeout=self._expire,
+            ping_interval=config.PING_INTERVAL,
+            idle_timeout=config.IDLE_TIMEOUT,
+            tick=config.LIVENESS_TICK
+        )
+        # 브로드캐스트 전에 메시지를 순서대로 거치는 검사 단계
+        # 각 단계는 check(message) -> (조치, 전달할 메시지)를 제공하며 reject이면 전달하지 않음
+        self.message_filters: List = [content_filter] if content_filter.enabled else []
+        # 멀티 워커 모드에서 브로드캐스트를 전달하는 Redis 백플레인
+        self.backplane = Backplane(self) if config.BACKPLANE_ENABLED else None
         # 백그라운드 태스크를 저장하는 집합
         self.background_tasks: Set = set()
+        # 연결 수와 송신 큐 길이는 /metrics 수집 시점에 계산
+        chat_active_connections.set_function(lambda: len(self.connections))
+        chat_outbound_queue_depth.set_function(lambda: sum(len(c.outbound) for c in self.connections.values()))
+        chat_outbound_queue_depth_max.set_function(
+            lambda: max((len(c.outbound) for c in self.connections.values()), default=0)
+        )
+
+    async def connect(self, websocket: WebSocket, sender_id: str, username: str, nickname: str,
+                      batch: bool = False, codec: str = JSON, last_seq: Optional[int] = None,
+                      ip: Optional[str] = None) -> ClientConnection:
+        """새로운 웹소켓 연결을 처리하는 메서드
 
-    async def connect(self, websocket: WebSocket, sender_id: str, username: str, nickname: str):
-        """새로운 웹소켓 연결을 처리하는 메서드"""
+        재연결한 클라이언트가 기본 채팅방에서 마지막으로 받은 순번(last_seq)을 주면 놓친 메시지만 다시 보낸다.
+        """
         # 웹소켓 연결 수락
         await websocket.accept()
         # 이전 세션이 있으면 연결 해제
-        if sender_id in self.active_connections:
+        if sender_id in self.connections:
             await self.disconnect_previous_session(sender_id)
-        # 새 연결 정보 저장
-        self.active_connections[sender_id] = websocket
-        self.user_nicknames[sender_id] = nickname
-        # Redis에 활성 연결 추가
-        await redis_manager.add_active_connection(sender_id)
+        connection = self._register(websocket, sender_id, username, nickname, ip, batch, codec)
+        # 접속 기록은 버퍼에만 추가하고 백그라운드에서 일괄 저장
+        connection.session_id = session_audit.login(connection)
+        # 놓친 메시지 재전송 (재연결이 아니면 현재 순번만 전송)
+        await self.resume(connection, config.DEFAULT_ROOM, last_seq)
+        # 이 노드의 접속자 집합에 추가
+        await presence.add(sender_id)
+        # 다른 노드에 남아 있는 같은 사용자의 이전 세션 종료
+        if self.backplane is not None:
+            try:
+                await self.backplane.publish_kick(sender_id)
+            except BACKEND_ERRORS as e:
+                # Redis 장애 중에도 새 연결은 유지 (다른 노드에 남은 이전 세션은 종료하지 못함)
+                logger.warning(f"Backplane kick for {sender_id} failed: {e}")
         # 연결 로그 기록
-        logger.info(f"User {username} (ID: {sender_id}, Nickname: {nickname}) connected. Total connections: {len(self.active_connections)}")
-        # 현재 사용자 수 업데이트 메시지 전송
-        await self.send_user_count_update(websocket)
+        logger.info(f"User {username} (ID: {sender_id}, Nickname: {nickname}) connected. Total connections: {len(self.connections)}")
+        # 마지막으로 집계한 사용자 수 전송 (변경된 수는 다음 하트비트에서 전송됨)
+        self.send_user_count_update(sender_id)
+        return connection
+
+    def _register(self, websocket: WebSocket, sender_id: str, username: str, nickname: str,
+                  ip: Optional[str] = None, batch: bool = False, codec: str = JSON) -> ClientConnection:
+        """연결 레코드와 송신 큐를 만들어 이 노드의 인덱스에 등록하는 메서드 (Redis 왕복 없음)"""
+        connection = ClientConnection(websocket, sender_id, username, nickname, ip)
+        connection.outbound = OutboundQueue(
+            websocket,
+            self.outbound_queue_size,
+            self.slow_consumer_policy,
+            self.send_timeout,
+            on_evict=lambda: self._schedule_eviction(connection, "slow_consumer"),
+            # 묶음 전송을 요청한 클라이언트는 짧은 시간 동안의 프레임을 하나로 받음
+            batch_window=config.BATCH_WINDOW_MS / 1000 if batch else 0.0,
+            batch_max=config.BATCH_MAX_FRAMES if batch else 1,
+            codec=codec
+        )
+        self.connections[sender_id] = connection
+        # 기본 채팅방에 자동 참여
+        self._add_to_room(connection, config.DEFAULT_ROOM)
+        # 생존 확인 시작
+        self.liveness.track(sender_id, connection)
+        return connection
+
+    def _unregister(self, connection: ClientConnection):
+        """연결 레코드를 이 노드의 모든 인덱스에서 제거하는 메서드"""
+        if self.connections.get(connection.sender_id) is connection:
+            del self.connections[connection.sender_id]
+        for room in connection.rooms:
+            members = self.rooms.get(room)
+            if members is not None:
+                members.discard(connection)
+                if not members:
+                    del self.rooms[room]
+        connection.rooms.clear()
+        self.liveness.untrack(connection.sender_id)
 
     async def disconnect_previous_session(self, sender_id: str):
         """이전 세션을 종료하는 메서드"""
-        if sender_id in self.active_connections:
-            prev_websocket = self.active_connections[sender_id]
-            # 이전 세션에 만료 메시지 전송
-            await prev_websocket.send_json({"type": "session_expired"})
-            # 이전 연결 종료
-            await prev_websocket.close()
-            del self.active_connections[sender_id]
-            # Redis에서 활성 연결 제거
-            await redis_manager.remove_active_connection(sender_id)
-            logger.info(f"Previous session for user {sender_id} disconnected")
-
-    async def disconnect(self, sender_id: str):
+        connection = self.connections.get(sender_id)
+        if connection is None:
+            return
+        self._unregister(connection)
+        session_audit.logout(connection)
+        # 이전 세션에 만료 메시지 전송 후 연결 종료
+        connection.outbound.put(Frame({"type": "session_expired"}))
+        await connection.outbound.close()
+        # 이 노드의 접속자 집합에서 제거
+        await presence.remove(sender_id)
+        chat_disconnects.labels("replaced").inc()
+        logger.info(f"Previous session for user {sender_id} disconnected")
+
+    async def disconnect(self, sender_id: str, websocket: WebSocket = None, reason: str = "closed"):
         """웹소켓 연결을 종료하는 메서드"""
-        if sender_id in self.active_connections:
-            del self.active_connections[sender_id]
-            if sender_id in self.user_nicknames:
-                del self.user_nicknames[sender_id]
-            # Redis에서 활성 연결 제거
-            await redis_manager.remove_active_connection(sender_id)
-            logger.info(f"User {sender_id} disconnected. Total connections: {len(self.active_connections)}")
-
-    async def broadcast(self, message: str, sender_id: str, username: str, nickname: str):
-        """메시지를 모든 연결된 클라이언트에게 브로드캐스트하는 메서드"""
-        # 사용자 차단 여부 확인
-        if await self.is_user_banned(sender_id):
-            ban_time_left = int(self.user_ban_until[sender_id] - time.time())
-            await self.active_connections[sender_id].send_json({
-                "type": "chat_banned",
-                "time_left": ban_time_left
-            })
+        connection = self.connections.get(sender_id)
+        # 이미 새 세션으로 교체된 경우 이전 세션의 종료 처리는 무시
+        if connection is None or (websocket is not None and connection.websocket is not websocket):
             return
+        self._unregister(connection)
+        session_audit.logout(connection)
+        connection.outbound.abort()
+        # 이 노드의 접속자 집합에서 제거
+        await presence.remove(sender_id)
+        chat_disconnects.labels(reason).inc()
+        logger.info(f"User {sender_id} disconnected. Total connections: {len(self.connections)}")
 
-        current_time = time.time()
-        # 사용자 메시지 기록 업데이트
-        self.user_messages[sender_id].append((message, current_time))
-        # 스팸 여부 확인
-        if self.is_spam(sender_id):
-            await self.ban_user(sender_id)
-            await self.active_connections[sender_id].send_json({
+    async def join_room(self, sender_id: str, room: str, last_seq: Optional[int] = None):
+        """사용자를 채팅방에 참여시키는 메서드 (last_seq를 주면 그 이후의 메시지를 다시 보냄)"""
+        connection = self.connections.get(sender_id)
+        if connection is None:
+            return
+        if not ROOM_NAME_PATTERN.match(room or ""):
+            self.send_personal(sender_id, {"type": "room_error", "room": room, "reason": "invalid_room"})
+            return
+        if room not in connection.rooms and len(connection.rooms) >= config.MAX_ROOMS_PER_CONNECTION:
+            self.send_personal(sender_id, {"type": "room_error", "room": room, "reason": "too_many_rooms"})
+            return
+        self._add_to_room(connection, room)
+        self.send_personal(sender_id, {"type": "room_joined", "room": room})
+        await self.resume(connection, room, last_seq)
+
+    async def resume(self, connection: ClientConnection, room: str, last_seq: Optional[int]):
+        """채팅방에서 last_seq 이후에 놓친 메시지를 실시간 메시지보다 먼저 보내는 메서드
+
+        재전송할 메시지를 가져오는 동안 송신 큐를 멈춰 두므로 그 사이에 도착한 메시지와 순서가 섞이거나
+        빠지지 않는다. 놓친 메시지가 너무 많거나 최근 메시지 목록에 없으면 resync 프레임을 보내
+        클라이언트가 /recent_messages로 전체를 다시 불러오게 한다.
+        """
+        outbound = connection.outbound
+        outbound.hold()
+        frames: List[Frame] = []
+        try:
+            current, missed = await redis_manager.get_messages_since(room, last_seq, config.RESUME_MAX_GAP)
+        except BACKEND_ERRORS as e:
+            # 순번을 알 수 없으므로 재전송 없이 실시간 메시지만 전달
+            logger.warning(f"Could not resume room {room} for {connection.sender_id}: {e}")
+        else:
+            if missed is None:
+                frames.append(Frame({"type": "resync", "room": room, "seq": current}))
+            else:
+                frames.extend(Frame(self._chat_frame(data)) for data in missed)
+                frames.append(Frame({"type": "seq", "room": room, "seq": current}))
+        finally:
+            outbound.release(frames)
+
+    @staticmethod
+    def _chat_frame(data: Dict) -> Dict:
+        """Redis에 저장된 메시지를 채팅 프레임으로 바꾸는 메서드"""
+        return {
+            "type": "chat",
+            "room": data["room"],
+            "message": data["content"],
+            "sender_id": data["sender_id"],
+            "username": data["username"],
+            "nickname": data["nickname"],
+            "timestamp": int(data["timestamp"] * 1000),
+            "message_id": data["message_id"],
+            "seq": data["seq"]
+        }
+
+    def leave_room(self, sender_id: str, room: str):
+        """사용자를 채팅방에서 나가게 하는 메서드"""
+        connection = self.connections.get(sender_id)
+        if connection is not None and room in connection.rooms:
+            self._remove_from_room(connection, room)
+        self.send_personal(sender_id, {"type": "room_left", "room": room})
+
+    def _add_to_room(self, connection: ClientConnection, room: str):
+        """채팅방 인덱스에 연결을 추가하는 메서드"""
+        self.rooms.setdefault(room, set()).add(connection)
+        connection.rooms.add(room)
+
+    def _remove_from_room(self, connection: ClientConnection, room: str):
+        """채팅방 인덱스에서 연결을 제거하는 메서드 (빈 채팅방은 삭제)"""
+        members = self.rooms.get(room)
+        if members is not None:
+            members.discard(connection)
+            if not members:
+                del self.rooms[room]
+        connection.rooms.discard(room)
+
+    def _schedule_eviction(self, connection: ClientConnection, reason: str):
+        """느린 소비자나 응답 없는 연결의 퇴출을 writer 태스크 밖에서 실행하도록 예약하는 메서드"""
+        task = asyncio.create_task(self._evict(connection, reason))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def _evict(self, connection: ClientConnection, reason: str):
+        """뒤처진 소비자나 응답 없는 연결을 끊는 메서드"""
+        await self.disconnect(connection.sender_id, connection.websocket, reason)
+        try:
+            # 1013: 잠시 후 다시 시도 (클라이언트는 재연결)
+            await connection.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def drain(self, reconnect_jitter: float):
+        """종료 전에 모든 연결을 닫으며 연결마다 다른 재연결 시점을 알려주는 메서드
+
+        클라이언트가 한꺼번에 재연결하지 않도록 0~reconnect_jitter초 사이의 대기 시간을 흩어서 전달한다.
+        """
+        connections = list(self.connections.values())
+
+        async def close(connection: ClientConnection):
+            await self.disconnect(connection.sender_id, connection.websocket, "drain")
+            try:
+                await connection.websocket.close(
+                    code=CLOSE_SERVICE_RESTART,
+                    reason=retry_after_reason(random.uniform(0, reconnect_jitter))
+                )
+            except Exception:
+                pass
+
+        await asyncio.gather(*(close(connection) for connection in connections))
+        logger.info(f"Drained {len(connections)} connections")
+
+    def _send_ping(self, sender_id: str, sent_at: int):
+        """생존 확인용 ping을 송신 큐에 넣는 메서드 (클라이언트는 t를 담아 pong으로 응답)"""
+        self.send_personal(sender_id, {"type": "ping", "t": sent_at}, key="ping")
+
+    def _expire(self, sender_id: str):
+        """유휴 시간을 넘긴 연결을 끊는 메서드"""
+        connection = self.connections.get(sender_id)
+        if connection is not None:
+            self._schedule_eviction(connection, "idle")
+
+    def send_personal(self, sender_id: str, payload: Dict, key: str = None):
+        """특정 사용자에게 프레임을 전송 큐에 넣는 메서드"""
+        connection = self.connections.get(sender_id)
+        if connection is not None:
+            connection.outbound.put(Frame(payload), key)
+
+    def send_to_all(self, payload: Dict, key: str = None):
+        """프레임을 코덱별로 한 번만 인코딩해 이 노드의 모든 연결의 전송 큐에 넣는 메서드"""
+        self.deliver(Frame(payload), key)
+
+    def deliver(self, frame: Frame, key: str = None):
+        """프레임을 이 노드의 모든 연결의 전송 큐에 넣는 메서드"""
+        for connection in list(self.connections.values()):
+            connection.outbound.put(frame, key)
+
+    def deliver_to_room(self, room: str, frame: Frame):
+        """프레임을 이 노드에서 채팅방에 참여한 연결의 전송 큐에만 넣는 메서드"""
+        with chat_fanout_seconds.time():
+            for connection in list(self.rooms.get(room, ())):
+                connection.outbound.put(frame)
+
+    async def publish(self, payload: Dict, room: str):
+        """프레임을 코덱별로 한 번만 인코딩해 모든 노드에서 채팅방에 참여한 연결에 전달하는 메서드"""
+        frame = Frame(payload)
+        if self.backplane is not None:
+            try:
+                # 백플레인을 거쳐 자기 자신을 포함한 모든 노드에 전달 (백플레인에서는 JSON 텍스트 사용)
+                await self.backplane.publish_frame(room, frame.text)
+                return
+            except BACKEND_ERRORS as e:
+                # Redis 장애 중에는 이 노드의 연결에만 전달
+                logger.warning(f"Backplane publish failed, delivering locally only: {e}")
+        # 새 메시지가 추가되었으므로 최근 메시지 응답 캐시 무효화
+        recent_messages_cache.invalidate(room)
+        self.deliver_to_room(room, frame)
+
+    async def broadcast(self, message: str, sender_id: str, username: str, nickname: str,
+                        room: str = config.DEFAULT_ROOM):
+        """메시지를 채팅방에 참여한 클라이언트에게 브로드캐스트하는 메서드"""
+        connection = self.connections.get(sender_id)
+        if connection is None:
+            return
+        # 참여하지 않은 채팅방에는 메시지를 보낼 수 없음
+        if room not in connection.rooms:
+            self.send_personal(sender_id, {"type": "room_error", "room": room, "reason": "not_joined"})
+            return
+
+        now = time.time()
+        if now < connection.banned_until:
+            # 차단 중인 연결은 제한기를 거치지 않고 거절
+            status, wait = BANNED, connection.banned_until - now
+        else:
+            # 차단 여부, 전송 속도, 스팸 여부를 한 번에 확인
+            status, wait = await rate_limiter.check(sender_id, message, connection.ip)
+        if status in (BANNED, NEWLY_BANNED):
+            connection.banned_until = now + wait
+            if status == NEWLY_BANNED:
+                chat_bans.inc()
+                logger.info(f"User {sender_id} banned for spamming")
+            self.send_personal(sender_id, {
                 "type": "chat_banned",
-                "time_left": 20
+                "time_left": math.ceil(wait)
+            })
+            return
+        if status == RATE_LIMITED:
+            chat_rate_limited.inc()
+            self.send_personal(sender_id, {
+                "type": "rate_limited",
+                "retry_after": round(wait, 1)
             })
             return
 
+        # 금칙어와 링크 검사 (규칙 수와 관계없이 메시지 길이에 비례하는 시간)
+        for message_filter in self.message_filters:
+            action, message = message_filter.check(message)
+            if action == REJECT:
+                self.send_personal(sender_id, {"type": "message_rejected", "room": room, "reason": "blocked_content"})
+                return
+            if action == FLAG:
+                logger.warning(f"Flagged message from user {sender_id} in room {room}")
+
+        current_time = time.time()
         # 메시지 데이터 구성
         message_data = {
             "type": "chat",
+            "room": room,
             "message": message,
             "sender_id": sender_id,
             "username": username,
             "nickname": nickname,
             "timestamp": int(current_time * 1000)
         }
-        # Redis에 메시지 추가
-        await redis_manager.add_message(sender_id, message, username, nickname)
-        # 모든 연결된 클라이언트에게 메시지 전송
-        for connection in self.active_connections.values():
-            await connection.send_json(message_data)
-
-    def is_spam(self, sender_id: str):
-        """스팸 메시지 여부를 판단하는 메서드"""
-        if len(self.user_messages[sender_id]) < self.spam_threshold:
-            return False
-        current_time = time.time()
-        oldest_message_time = self.user_messages[sender_id][0][1]
-        # 지정된 시간 윈도우 내에 임계값 이상의 동일한 메시지가 있는지 확인
-        if current_time - oldest_message_time <= self.spam_window:
-            return all(msg == self.user_messages[sender_id][0][0] for msg, _ in self.user_messages[sender_id])
-        return False
-
-    async def ban_user(self, sender_id: str):
-        """사용자를 일시적으로 차단하는 메서드"""
-        ban_duration = 20  # 20초 동안 차단
-        self.user_ban_until[sender_id] = time.time() + ban_duration
-
-    async def is_user_banned(self, sender_id: str) -> bool:
-        """사용자의 차단 여부를 확인하는 메서드"""
-        if sender_id in self.user_ban_until:
-            if time.time() >= self.user_ban_until[sender_id]:
-                # 차단 시간이 지났으면 차단 정보 삭제
-                del self.user_ban_until[sender_id]
-                self.user_messages[sender_id].clear()
-                return False
-            return True
-        return False
-
-    async def send_user_count_update(self, websocket: WebSocket):
-        """현재 접속자 수를 클라이언트에게 전송하는 메서드"""
-        user_count = await redis_manager.get_active_connections_count()
-        await websocket.send_json({"type": "user_count", "count": user_count})
+        # Redis에 메시지 추가 (Redis 장애 시 로컬 WAL에 기록하고 복구 후 재전송)
+        stored = await wal.store(sender_id, message, username, nickname, room)
+        # 클라이언트가 재연결할 때 놓친 메시지를 알 수 있도록 순번 전달 (WAL에 기록된 메시지는 순번 없음)
+        message_data["message_id"] = stored["message_id"]
+        if stored["seq"] is not None:
+            message_data["seq"] = stored["seq"]
+        chat_messages.inc()
+        # 메시지를 한 번만 인코딩해 채팅방 멤버의 송신 큐에 전달
+        await self.publish(message_data, room)
 
-    async def check_connections(self):
-        """주기적으로 연결 상태를 확인하는 메서드"""
-        while True:
-            try:
-                for sender_id, connection in list(self.active_connections.items()):
-                    try:
-                        # 각 연결에 ping 메시지 전송
-                        await connection.send_json({"type": "ping"})
-                    except Exception:
-                        # 연결 실패 시 연결 해제
-                        await self.disconnect(sender_id)
-                # 60초 대기 후 다음 확인 실행
-                await asyncio.sleep(60)
-            except Exception as e:
-                logger.error(f"Error in check connections: {e}")
-                await asyncio.sleep(5)
+    def send_user_count_update(self, sender_id: str):
+        """현재 접속자 수를 클라이언트에게 전송하는 메서드"""
+        self.send_personal(sender_id, {"type": "user_count", "count": presence.count}, key="user_count")
 
     async def cleanup_old_data(self):
         """오래된 데이터를 정리하는 메서드"""
         while True:
             try:
-                current_time = time.time()
-                for sender_id in list(self.user_messages.keys()):
-                    # 1시간 이상 지난 메시지 삭제
-                    if not self.user_messages[sender_id] or current_time - self.user_messages[sender_id][-1][1] > 3600:
-                        del self.user_messages[sender_id]
-                    # 만료된 사용자 차단 정보 삭제
-                    if sender_id in self.user_ban_until and current_time >= self.user_ban_until[sender_id]:
-                        del self.user_ban_until[sender_id]
+                # 제한기의 만료된 프로세스 내 상태 정리
+                rate_limiter.prune()
                 # 1시간마다 실행
                 await asyncio.sleep(3600)
             except Exception as e:
@@ -173,11 +429,15 @@ class ConnectionManager:
 
     def start_background_tasks(self):
         """백그라운드 태스크를 시작하는 메서드"""
-        self.background_tasks.add(asyncio.create_task(self.check_connections()))
+        if self.backplane is not None:
+            self.backplane.start()
+        self.background_tasks.add(asyncio.create_task(self.liveness.run()))
         self.background_tasks.add(asyncio.create_task(self.cleanup_old_data()))
 
     def stop_background_tasks(self):
         """실행 중인 백그라운드 태스크를 중지하는 메서드"""
+        if self.backplane is not None:
+            self.backplane.stop()
         for task in self.background_tasks:
             task.cancel()
         self.background_tasks.clear()
\ No newline at end of file
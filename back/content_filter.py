@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+from redis.exceptions import RedisError
+from redis_manager import redis_manager
+from metrics import content_filter_actions, content_filter_seconds, content_filter_patterns
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 검사 결과 (뒤로 갈수록 강한 조치, 한 메시지에서 여러 규칙이 맞으면 가장 강한 조치를 적용)
+ALLOW = "allow"    # 그대로 전달
+FLAG = "flag"      # 그대로 전달하고 기록
+MASK = "mask"      # 맞은 부분을 가려서 전달
+REJECT = "reject"  # 전달하지 않음
+ACTIONS = (FLAG, MASK, REJECT)
+_SEVERITY = {ALLOW: 0, FLAG: 1, MASK: 2, REJECT: 3}
+
+# 링크로 보는 접두어 (CONTENT_FILTER_LINK_ACTION을 설정하면 단어 끝까지 검사 대상)
+LINK_PREFIXES = ("http://", "https://", "www.")
+
+# 단어(공백이 아닌 문자열)의 끝을 찾는 정규식
+_WORD_END = re.compile(r"\S*")
+
+def fold(text: str) -> str:
+    """대소문자를 구분하지 않도록 소문자로 바꾸는 함수 (글자 위치가 바뀌지 않도록 길이를 유지)"""
+    folded = text.lower()
+    if len(folded) != len(text):
+        # 소문자로 바꾸면 길이가 달라지는 글자(예: 'İ')는 그대로 둠
+        folded = "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+    return folded
+
+def parse_rules(text: str, default_action: str) -> List[Tuple[str, str, bool]]:
+    """규칙 목록 문자열을 (패턴, 조치, 단어 끝까지 확장 여부) 리스트로 바꾸는 함수
+
+    한 줄에 규칙 하나이며 '#'으로 시작하는 줄은 주석이다.
+    "reject:단어"처럼 조치를 앞에 붙일 수 있고(없으면 default_action),
+    "flag:bit.ly/*"처럼 '*'로 끝나면 맞은 위치부터 단어 끝까지를 대상으로 한다.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        action = default_action
+        prefix, sep, rest = line.partition(":")
+        if sep and prefix.lower() in ACTIONS:
+            action, line = prefix.lower(), rest.strip()
+        extend = line.endswith("*")
+        pattern = fold(line.rstrip("*"))
+        if pattern:
+            rules.append((pattern, action, extend))
+    return rules
+
+class Automaton:
+    """여러 패턴을 한 번에 찾는 Aho-Corasick 오토마톤
+
+    검사 시간은 패턴 수와 관계없이 입력 길이와 찾은 개수에 비례한다.
+    만든 뒤에는 바뀌지 않으므로 규칙을 다시 읽을 때는 새 오토마톤을 만들어 교체한다.
+    """
+
+    __slots__ = ("rules", "_lengths", "_goto", "_fail", "_out")
+
+    def __init__(self, rules: List[Tuple[str, str, bool]]):
+        self.rules = rules
+        self._lengths = [len(pattern) for pattern, _, _ in rules]
+        # 상태별 전이 (글자 -> 다음 상태), 실패 시 이동할 상태, 이 상태에서 끝나는 규칙 번호
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Tuple[int, ...]] = [()]
+        for index, (pattern, _, _) in enumerate(rules):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] += (index,)
+        # 너비 우선으로 실패 링크를 계산하고 실패 상태의 출력을 합침
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                target = fail[state]
+                while target and ch not in goto[target]:
+                    target = fail[target]
+                fail[nxt] = goto[target].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def search(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """text에서 맞은 (시작 위치, 끝 위치, 규칙 번호)를 끝 위치 순서로 반환하는 메서드"""
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = position + 1
+                for index in out[state]:
+                    yield end - lengths[index], end, index
+
+class ContentFilter:
+    """금칙어와 링크를 검사하는 브로드캐스트 파이프라인 단계
+
+    규칙은 파일과 Redis 키에서 읽어 하나의 오토마톤으로 미리 만들어 두고,
+    원본이 바뀌면 백그라운드에서 새로 만들어 교체한다 (검사 중인 메시지에는 영향 없음).
+    """
+
+    def __init__(self, file_path: str, redis_key: str, default_action: str, link_action: str,
+                 mask_char: str, whole_words: bool, reload_interval: float):
+        if default_action not in ACTIONS or (link_action and link_action not in ACTIONS):
+            raise ValueError(f"Unknown content filter action: {default_action}, {link_action}")
+        self.file_path = file_path
+        self.redis_key = redis_key
+        self.default_action = default_action
+        self.link_action = link_action
+        self.mask_char = mask_char
+        # 단어 일부로 맞은 경우(예: 'class' 안의 'ass')를 무시할지 여부
+        self.whole_words = whole_words
+        self.reload_interval = reload_interval
+        self._automaton: Optional[Automaton] = None
+        # 마지막으로 읽은 원본의 버전
+        self._version = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file_path or self.redis_key or self.link_action)
+
+    def check(self, message: str) -> Tuple[str, str]:
+        """메시지를 검사해 (조치, 전달할 메시지)를 반환하는 메서드"""
+        automaton = self._automaton
+        if automaton is None:
+            return ALLOW, message
+        started = time.perf_counter()
+        text = fold(message)
+        action = ALLOW
+        spans = []
+        for start, end, index in automaton.search(text):
+            _, rule_action, extend = automaton.rules[index]
+            if self.whole_words and not self._is_whole_word(text, start, end, extend):
+                continue
+            if rule_action == REJECT:
+                action = REJECT
+                break
+            if _SEVERITY[rule_action] > _SEVERITY[action]:
+                action = rule_action
+            if rule_action == MASK:
+                spans.append((start, _WORD_END.match(text, end).end() if extend else end))
+        if spans and action == MASK:
+            chars = list(message)
+            for start, end in spans:
+                chars[start:end] = self.mask_char * (end - start)
+            message = "".join(chars)
+        content_filter_seconds.observe(time.perf_counter() - started)
+        if action != ALLOW:
+            content_filter_actions.labels(action).inc()
+        return action, message
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int, extend: bool) -> bool:
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        return extend or end == len(text) or not text[end].isalnum()
+
+    def load_rules(self, rules: List[Tuple[str, str, bool]]):
+        """규칙 리스트로 오토마톤을 만들어 교체하는 메서드"""
+        self._automaton = Automaton(rules) if rules else None
+        content_filter_patterns.set(len(rules))
+
+    async def _source_version(self) -> tuple:
+        """규칙 원본의 버전을 반환하는 메서드 (파일 수정 시각과 크기, Redis 버전 키 값)"""
+        version = []
+        if self.file_path:
+            stat = await asyncio.to_thread(os.stat, self.file_path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        if self.redis_key:
+            # 규칙을 바꾼 뒤 {key}:version을 증가시키면 각 워커가 다음 확인 때 다시 읽음
+            version.append(await redis_manager.redis.get(f"{self.redis_key}:version"))
+        return tuple(version)
+
+    async def reload(self) -> bool:
+        """규칙 원본이 바뀌었으면 오토마톤을 다시 만들어 교체하는 메서드"""
+        version = await self._source_version()
+        if version == self._version:
+            return False
+        parts = []
+        if self.file_path:
+            parts.append(await asyncio.to_thread(self._read_file))
+        if self.redis_key:
+            value = await redis_manager.redis.get(self.redis_key)
+            parts.append(value.decode("utf-8") if isinstance(value, bytes) else (value or ""))
+        rules = parse_rules("\n".join(parts), self.default_action)
+        if self.link_action:
+            rules.extend((prefix, self.link_action, True) for prefix in LINK_PREFIXES)
+        # 규칙이 많으면 오토마톤을 만드는 데 시간이 걸리므로 이벤트 루프 밖에서 생성
+        automaton = await asyncio.to_thread(Automaton, rules) if rules else None
+        self._automaton = automaton
+        self._version = version
+        content_filter_patterns.set(len(rules))
+        logger.info(f"Loaded {len(rules)} content filter patterns")
+        return True
+
+    def _read_file(self) -> str:
+        with open(self.file_path, encoding="utf-8") as f:
+            return f.read()
+
+    async def run(self):
+        """규칙 원본의 변경을 주기적으로 확인해 다시 읽는 태스크"""
+        while True:
+            try:
+                await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except (OSError, RedisError, UnicodeDecodeError) as e:
+                # 원본을 읽을 수 없으면 마지막으로 읽은 규칙을 계속 사용
+                logger.warning(f"Could not reload content filter rules: {e}")
+            except Exception as e:
+                logger.error(f"Error in content filter reload: {e}")
+            await asyncio.sleep(self.reload_interval)
+
+# ContentFilter 인스턴스 생성
+content_filter = ContentFilter(
+    file_path=config.CONTENT_FILTER_FILE,
+    redis_key=config.CONTENT_FILTER_REDIS_KEY,
+    default_action=config.CONTENT_FILTER_DEFAULT_ACTION,
+    link_action=config.CONTENT_FILTER_LINK_ACTION,
+    mask_char=config.CONTENT_FILTER_MASK_CHAR,
+    whole_words=config.CONTENT_FILTER_WHOLE_WORDS,
+    reload_interval=config.CONTENT_FILTER_RELOAD_INTERVAL
+)
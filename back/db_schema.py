@@ -1,9 +1,15 @@
 import asyncpg
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Set, Tuple
+import config
 
 logger = logging.getLogger(__name__)
 
+def _sql_literal(value: str) -> str:
+    """DDL에 넣을 문자열 리터럴을 만드는 함수 (DDL에는 바인드 파라미터를 쓸 수 없음)"""
+    return "'" + value.replace("'", "''") + "'"
+
 async def create_tables(conn):
     """필요한 테이블과 인덱스를 생성하는 메서드"""
     # users 테이블 생성
@@ -18,17 +24,28 @@ async def create_tables(conn):
         )
     ''')
     
+    # room 기본값은 애플리케이션의 기본 채팅방과 같게 유지
+    default_room = _sql_literal(config.DEFAULT_ROOM)
     # messages 테이블 생성 (파티션 테이블)
-    await conn.execute('''
+    await conn.execute(f'''
         CREATE TABLE IF NOT EXISTS messages (
             created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
             sender_id UUID NOT NULL,
             nickname VARCHAR(50) NOT NULL,
             content TEXT NOT NULL,
+            message_id UUID,
+            room VARCHAR(64) NOT NULL DEFAULT {default_room},
             FOREIGN KEY (sender_id) REFERENCES users(id)
         ) PARTITION BY RANGE (created_at)
     ''')
-    
+    # 기존 messages 테이블에 message_id 컬럼(아웃박스 재전달 시 중복 저장 방지용)과 room 컬럼 추가
+    # (기존 행은 기본 채팅방으로 채우고, 기본 채팅방 설정이 바뀌면 컬럼 기본값도 맞춤)
+    await conn.execute(f'''
+        ALTER TABLE messages ADD COLUMN IF NOT EXISTS message_id UUID;
+        ALTER TABLE messages ADD COLUMN IF NOT EXISTS room VARCHAR(64) NOT NULL DEFAULT {default_room};
+        ALTER TABLE messages ALTER COLUMN room SET DEFAULT {default_room};
+    ''')
+
     # user_sessions 테이블 생성 (파티션 테이블)
     await conn.execute('''
         CREATE TABLE IF NOT EXISTS user_sessions (
@@ -63,6 +80,9 @@ async def create_tables(conn):
         CREATE INDEX IF NOT EXISTS idx_messages_sender_id ON messages(sender_id);
         CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at);
         CREATE INDEX IF NOT EXISTS idx_messages_sender_created ON messages(sender_id, created_at);
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_message_id ON messages(message_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_messages_created_message ON messages(created_at, message_id);
+        CREATE INDEX IF NOT EXISTS idx_messages_room_created ON messages(room, created_at, message_id);
         CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions(user_id);
         CREATE INDEX IF NOT EXISTS idx_user_sessions_login_time ON user_sessions(login_time);
         CREATE INDEX IF NOT EXISTS idx_user_sessions_ip_address ON user_sessions(ip_address);
@@ -84,12 +104,78 @@ async def ensure_partition_exists(conn, table_name: str, date: datetime.date):
             date
         )
 
+class PartitionManager:
+    """일별 파티션을 관리하는 클래스
+
+    이미 확인한 파티션은 메모리에 기억해 쓰기 경로에서 카탈로그 조회를 생략하고,
+    파티션을 미리 생성하며 보존 기간이 지난 파티션을 분리하거나 삭제한다.
+    """
+
+    def __init__(self, tables: Dict[str, int]):
+        # 테이블 이름 -> 보존 기간(일, 0이면 정리하지 않음)
+        self.tables = tables
+        # 존재가 확인된 (테이블 이름, 날짜) 집합
+        self._known: Set[Tuple[str, date]] = set()
+
+    async def ensure(self, conn, table_name: str, partition_date: date):
+        """파티션이 없으면 생성하는 메서드 (확인된 파티션은 카탈로그를 조회하지 않음)"""
+        if (table_name, partition_date) in self._known:
+            return
+        await ensure_partition_exists(conn, table_name, partition_date)
+        self._known.add((table_name, partition_date))
+
+    async def create_ahead(self, pool, days_ahead: int):
+        """오늘부터 days_ahead일 뒤까지의 파티션을 미리 생성하는 메서드"""
+        today = datetime.now().date()
+        async with pool.acquire() as conn:
+            for table_name in self.tables:
+                for offset in range(days_ahead + 1):
+                    await self.ensure(conn, table_name, today + timedelta(days=offset))
+
+    async def enforce_retention(self, pool, action: str = "drop") -> List[str]:
+        """보존 기간이 지난 파티션을 분리(detach)하거나 삭제(drop)하는 메서드"""
+        removed = []
+        today = datetime.now().date()
+        async with pool.acquire() as conn:
+            for table_name, retention_days in self.tables.items():
+                if retention_days <= 0:
+                    continue
+                cutoff = today - timedelta(days=retention_days)
+                rows = await conn.fetch(
+                    "SELECT c.relname FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "JOIN pg_class p ON p.oid = i.inhparent "
+                    "WHERE p.relname = $1",
+                    table_name
+                )
+                for row in rows:
+                    partition_name = row['relname']
+                    try:
+                        partition_date = datetime.strptime(partition_name[len(table_name) + 1:], '%Y_%m_%d').date()
+                    except ValueError:
+                        # 이 클래스가 만들지 않은 파티션은 건드리지 않음
+                        continue
+                    if partition_date >= cutoff:
+                        continue
+                    async with conn.transaction():
+                        await conn.execute(f'ALTER TABLE "{table_name}" DETACH PARTITION "{partition_name}"')
+                        if action == "drop":
+                            await conn.execute(f'DROP TABLE "{partition_name}"')
+                    self._known.discard((table_name, partition_date))
+                    removed.append(partition_name)
+                    logger.info(f"Retention: {action} partition {partition_name}")
+        return removed
+
+# 파티션 매니저 인스턴스 생성
+partition_manager = PartitionManager({
+    'messages': config.MESSAGES_RETENTION_DAYS,
+    'user_sessions': config.SESSIONS_RETENTION_DAYS,
+})
+
 async def initialize_database(pool):
     """데이터베이스 초기화 및 테이블 생성"""
     async with pool.acquire() as conn:
         await create_tables(conn)
-        
-        # 현재 날짜에 대한 파티션만 생성
-        current_date = datetime.now().date()
-        await ensure_partition_exists(conn, 'messages', current_date)
-        await ensure_partition_exists(conn, 'user_sessions', current_date)
\ No newline at end of file
+
+    # 오늘부터 설정된 일수만큼 앞선 날짜의 파티션을 미리 생성
+    await partition_manager.create_ahead(pool, config.PARTITION_DAYS_AHEAD)
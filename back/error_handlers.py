@@ -1,7 +1,9 @@
 from functools import wraps
 import logging
 import asyncpg
+from fastapi import HTTPException
 from redis.exceptions import RedisError
+from password_hasher import PasswordHasherBusy
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
@@ -19,6 +21,13 @@ def handle_error(func):
             # 원래 함수 실행
             # 데코레이트된 함수를 그대로 실행하고 결과를 반환
             return await func(*args, **kwargs)
+        except HTTPException:
+            # 엔드포인트가 의도적으로 발생시킨 HTTP 오류는 그대로 전달
+            raise
+        except PasswordHasherBusy:
+            # 비밀번호 해시 워커 풀이 포화 상태이면 잠시 후 재시도하도록 안내
+            logger.warning("Password hasher busy, asking client to retry")
+            raise HTTPException(status_code=503, detail="Server is busy, please retry", headers={"Retry-After": "1"})
         except asyncpg.UniqueViolationError:
             # 중복 데이터 삽입 시도 시 처리
             # 예: 이미 존재하는 사용자 이름으로 회원가입 시도 등
@@ -0,0 +1,173 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# RTT 지수 이동 평균 가중치
+RTT_SMOOTHING = 0.2
+
+class TimerWheel:
+    """고정된 칸 수의 해시 타이머 휠
+
+    각 키는 한 칸에만 들어가며 일정 등록, 변경, 취소가 모두 O(1)이다.
+    최대 지연 시간은 칸 수 × tick보다 짧아야 한다.
+    """
+
+    def __init__(self, tick: float, max_delay: float):
+        self.tick = tick
+        self._slots: List[Set[str]] = [set() for _ in range(math.ceil(max_delay / tick) + 2)]
+        # 키 -> 들어 있는 칸 번호
+        self._where: Dict[str, int] = {}
+        # 다음에 처리할 칸 번호와 그 칸이 만료되는 시각
+        self._cursor = 0
+        self._cursor_time = time.monotonic() + tick
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def schedule(self, key: str, delay: float):
+        """delay초 뒤에 만료되도록 키를 등록하거나 다시 등록하는 메서드"""
+        self.cancel(key)
+        ticks = max(0, math.ceil((time.monotonic() + delay - self._cursor_time) / self.tick))
+        ticks = min(ticks, len(self._slots) - 1)
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot].add(key)
+        self._where[key] = slot
+
+    def cancel(self, key: str):
+        """등록된 키를 제거하는 메서드"""
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            self._slots[slot].discard(key)
+
+    def advance(self, now: float) -> List[str]:
+        """now까지 만료된 칸을 비우고 만료된 키 목록을 반환하는 메서드"""
+        expired = []
+        while self._cursor_time <= now:
+            slot = self._slots[self._cursor]
+            for key in slot:
+                del self._where[key]
+            expired.extend(slot)
+            slot.clear()
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            self._cursor_time += self.tick
+        return expired
+
+    def next_deadline(self) -> float:
+        """다음 칸이 만료되는 시각을 반환하는 메서드"""
+        return self._cursor_time
+
+class LivenessTracker:
+    """연결별 마지막 수신 시각을 기준으로 ping과 유휴 연결 종료를 처리하는 클래스
+
+    받은 메시지는 마지막 수신 시각만 갱신하고(O(1)), 타이머 휠에서 연결의 차례가
+    돌아왔을 때 유휴 시간에 따라 ping 전송, 재등록, 연결 종료를 결정한다.
+    확인 시점이 연결 시각에 따라 흩어지므로 한 번에 모든 소켓을 순회하지 않는다.
+    마지막 수신 시각과 RTT는 연결 상태 객체(last_seen, rtt 속성)에 직접 기록한다.
+    """
+
+    def __init__(self, on_ping: Callable[[str, int], None], on_timeout: Callable[[str], None],
+                 ping_interval: float, idle_timeout: float, tick: float):
+        self._on_ping = on_ping
+        self._on_timeout = on_timeout
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self._wheel = TimerWheel(tick, max(ping_interval, idle_timeout))
+        # 사용자 ID -> 연결 상태 객체 (last_seen: 마지막 수신 시각(monotonic), rtt: RTT 지수 이동 평균(밀리초))
+        self._tracked: Dict[str, Any] = {}
+
+    def track(self, sender_id: str, state: Any):
+        """새 연결의 생존 확인을 시작하는 메서드"""
+        state.last_seen = time.monotonic()
+        state.rtt = None
+        self._tracked[sender_id] = state
+        self._wheel.schedule(sender_id, self.ping_interval)
+
+    def untrack(self, sender_id: str):
+        """종료된 연결의 생존 확인을 중지하는 메서드"""
+        self._wheel.cancel(sender_id)
+        self._tracked.pop(sender_id, None)
+
+    def touch(self, sender_id: str):
+        """연결에서 메시지를 받았음을 기록하는 메서드"""
+        state = self._tracked.get(sender_id)
+        if state is not None:
+            state.last_seen = time.monotonic()
+
+    def pong(self, sender_id: str, sent_at) -> Optional[float]:
+        """ping에 대한 응답으로 RTT를 갱신하고 측정값(밀리초)을 반환하는 메서드"""
+        state = self._tracked.get(sender_id)
+        if state is None or not isinstance(sent_at, (int, float)):
+            return None
+        sample = time.monotonic() * 1000 - sent_at
+        if sample < 0:
+            return None
+        previous = state.rtt
+        state.rtt = sample if previous is None else previous + RTT_SMOOTHING * (sample - previous)
+        return sample
+
+    def _expire(self, sender_id: str, now: float):
+        """타이머 휠에서 만료된 연결 하나를 처리하는 메서드"""
+        state = self._tracked.get(sender_id)
+        if state is None:
+            return
+        idle = now - state.last_seen
+        if idle >= self.idle_timeout:
+            logger.info(f"Connection {sender_id} idle for {idle:.1f}s, closing")
+            self.untrack(sender_id)
+            self._on_timeout(sender_id)
+        elif idle >= self.ping_interval:
+            # 응답이 오면 RTT를 계산할 수 있도록 서버 시각(밀리초)을 함께 전송
+            self._on_ping(sender_id, int(now * 1000))
+            self._wheel.schedule(sender_id, min(self.ping_interval, self.idle_timeout - idle))
+        else:
+            # 그 사이 메시지를 받았으면 마지막 수신 시각 기준으로 다시 등록
+            self._wheel.schedule(sender_id, self.ping_interval - idle)
+
+    def stats(self) -> Dict:
+        """생존 확인 대상 연결 수와 RTT 요약을 반환하는 메서드"""
+        samples = sorted(state.rtt for state in self._tracked.values() if state.rtt is not None)
+        return {
+            "connections": len(self._tracked),
+            "rtt_samples": len(samples),
+            "rtt_avg_ms": round(sum(samples) / len(samples), 1) if samples else None,
+            "rtt_p50_ms": round(samples[len(samples) // 2], 1) if samples else None,
+            "rtt_max_ms": round(samples[-1], 1) if samples else None,
+        }
+
+    def connection_stats(self, limit: int) -> List[Dict]:
+        """연결별 RTT와 마지막 수신 시각을 RTT가 큰 순서로 최대 limit개 반환하는 메서드"""
+        now, wall_now = time.monotonic(), time.time()
+        # 연결 수가 많아도 전체를 정렬하지 않고 상위 limit개만 선택
+        states = heapq.nlargest(
+            limit, self._tracked.items(),
+            key=lambda item: item[1].rtt if item[1].rtt is not None else -1.0
+        )
+        return [
+            {
+                "sender_id": sender_id,
+                "rtt_ms": round(state.rtt, 1) if state.rtt is not None else None,
+                # last_seen은 monotonic 시각이므로 Unix 시각으로 바꿔서 반환
+                "last_seen": round(wall_now - (now - state.last_seen), 3),
+            }
+            for sender_id, state in states
+        ]
+
+    async def run(self):
+        """타이머 휠을 한 칸씩 진행하며 만료된 연결을 처리하는 태스크"""
+        while True:
+            try:
+                await asyncio.sleep(max(0.0, self._wheel.next_deadline() - time.monotonic()))
+                now = time.monotonic()
+                for sender_id in self._wheel.advance(now):
+                    self._expire(sender_id, now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in liveness tracker: {e}")
+                await asyncio.sleep(1)
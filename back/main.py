@@ -1,15 +1,27 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
-from postgresql_manager import postgres_manager
+from postgresql_manager import postgres_manager, DUPLICATE_USER
 from redis_manager import redis_manager
+from user_cache import user_cache
+from availability_index import availability_index
+from message_history import get_history, parse_cursor
+from response_cache import recent_messages_cache
+from presence import presence
+from wal import wal
+from session_audit import session_audit
+from admission import admission, reject, CLOSE_OVERLOADED, CLOSE_SERVICE_RESTART
 from pydantic import BaseModel, Field
-from connection_manager import ConnectionManager
+from connection_manager import ConnectionManager, ROOM_NAME_PATTERN
+from codec import PROTOCOLS, JSON, receive_frame
+import metrics
 from error_handlers import handle_error
-from background_tasks import start_background_tasks, stop_background_tasks
+from background_tasks import start_background_tasks, stop_background_tasks, sync_stats
 import json
 import asyncio
+import uuid
+import config
 
 # FastAPI 애플리케이션 인스턴스 생성
 app = FastAPI()
@@ -37,15 +49,21 @@ async def startup_event():
     """애플리케이션 시작 시 실행되는 이벤트 핸들러"""
     await postgres_manager.start()  # PostgreSQL 연결 시작
     await redis_manager.connect()  # Redis 연결 시작
-    await redis_manager.redis.delete("active_connections")  # active_connections 초기화
+    wal.open()  # 로컬 WAL 열기 (재전송하지 못한 메시지가 있으면 장애 모드로 시작)
+    await presence.register()  # 이 노드의 접속자 정보만 초기화
     start_background_tasks(manager)  # 백그라운드 작업 시작
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """애플리케이션 종료 시 실행되는 이벤트 핸들러"""
+    admission.draining = True  # 새 연결 거절
+    await manager.drain(config.DRAIN_RECONNECT_JITTER)  # 남은 연결에 흩어진 재연결 시점을 알리고 종료
+    stop_background_tasks(manager)  # 백그라운드 작업 종료
+    await presence.unregister()  # 이 노드의 접속자 정보 제거
+    wal.close()  # 로컬 WAL을 디스크에 기록하고 닫기
+    await session_audit.close()  # 남은 접속 기록 저장
     await postgres_manager.stop()  # PostgreSQL 연결 종료
     await redis_manager.disconnect()  # Redis 연결 종료
-    stop_background_tasks(manager)  # 백그라운드 작업 종료
 
 class UserRegister(BaseModel):
     """사용자 등록을 위한 Pydantic 모델"""
@@ -58,13 +76,20 @@ class UserRegister(BaseModel):
 @handle_error
 async def register(user: UserRegister):
     """사용자 등록 엔드포인트"""
-    success, message = await postgres_manager.register_user(user.username, user.password, user.email, user.nickname)
+    success, result = await postgres_manager.register_user(user.username, user.password, user.email, user.nickname)
     if not success:
-        raise HTTPException(status_code=400, detail=message)
-    login_success, login_result = await postgres_manager.login_user(user.username, user.password)
-    if not login_success:
-        raise HTTPException(status_code=400, detail="Registration successful, but auto-login failed")
-    return {"message": "Registration and login successful", "user_id": login_result["user_id"], "username": user.username, "nickname": login_result["nickname"]}
+        if result == DUPLICATE_USER:
+            # 중복 체크 인덱스가 사용 가능하다고 잘못 답했을 수 있으므로 충돌한 값을 인덱스에 추가
+            await availability_index.add_values(
+                await postgres_manager.get_taken_values(user.username, user.email, user.nickname)
+            )
+        raise HTTPException(status_code=400, detail=result)
+    # 새로 등록된 사용자 ID에 대한 캐시 항목 무효화
+    await user_cache.invalidate(result)
+    # 중복 체크 인덱스에 새 사용자 정보 추가
+    await availability_index.add(user.username, user.email, user.nickname)
+    # 방금 해시한 비밀번호를 다시 검증하지 않고 등록 결과로 바로 로그인 처리
+    return {"message": "Registration and login successful", "user_id": result, "username": user.username, "nickname": user.nickname}
 
 class LoginData(BaseModel):
     """로그인을 위한 Pydantic 모델"""
@@ -91,47 +116,129 @@ class DuplicateCheckData(BaseModel):
 async def check_duplicate(data: DuplicateCheckData):
     """중복 체크 엔드포인트"""
     if data.email:
-        is_duplicate = await postgres_manager.check_duplicate('email', data.email)
-        return {"isDuplicate": is_duplicate}
+        field, value = 'email', data.email
     elif data.username:
-        is_duplicate = await postgres_manager.check_duplicate('username', data.username)
-        return {"isDuplicate": is_duplicate}
+        field, value = 'username', data.username
     elif data.nickname:
-        is_duplicate = await postgres_manager.check_duplicate('nickname', data.nickname)
-        return {"isDuplicate": is_duplicate}
+        field, value = 'nickname', data.nickname
     else:
         raise HTTPException(status_code=400, detail="Invalid request")
+    # Redis 인덱스로 먼저 확인하고, 판단할 수 없을 때만 PostgreSQL 조회
+    is_duplicate = await availability_index.is_taken(field, value)
+    if is_duplicate is None:
+        is_duplicate = await postgres_manager.check_duplicate(field, value)
+    return {"isDuplicate": is_duplicate}
 
 @app.get("/recent_messages")
 @handle_error
-async def get_recent_messages(limit: int = 50):
-    """최근 메시지를 가져오는 엔드포인트"""
-    messages = await redis_manager.get_recent_messages(limit)
-    return {"messages": messages}
+async def get_recent_messages(request: Request, limit: int = 50, room: str = config.DEFAULT_ROOM):
+    """채팅방의 최근 메시지를 가져오는 엔드포인트 (미리 직렬화된 응답 캐시 사용, ETag 지원)"""
+    if not ROOM_NAME_PATTERN.match(room):
+        raise HTTPException(status_code=400, detail="Invalid room")
+    limit = max(1, min(limit, 2000))
+    body, etag = await recent_messages_cache.get(room, limit)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/messages/history")
+@handle_error
+async def get_message_history(before: str = None, limit: int = 50, sender_id: str = None,
+                              room: str = config.DEFAULT_ROOM):
+    """채팅방의 커서 기반 메시지 기록 조회 엔드포인트 (before=<timestamp,message_id>)"""
+    if not ROOM_NAME_PATTERN.match(room):
+        raise HTTPException(status_code=400, detail="Invalid room")
+    try:
+        cursor = parse_cursor(before) if before else None
+        if sender_id:
+            sender_id = str(uuid.UUID(sender_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor or sender ID")
+    limit = max(1, min(limit, 200))
+    return await get_history(cursor, limit, sender_id, room)
+
+@app.get("/sync_status")
+async def get_sync_status():
+    """Redis → PostgreSQL 영속화 지연 지표를 반환하는 엔드포인트"""
+    return sync_stats
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 텍스트 형식으로 지표를 반환하는 엔드포인트"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/liveness_status")
+async def get_liveness_status():
+    """이 워커의 연결 생존 확인 대상 수와 RTT 요약을 반환하는 엔드포인트"""
+    return manager.liveness.stats()
+
+@app.get("/liveness_status/connections")
+async def get_liveness_connections(limit: int = 100):
+    """이 워커의 연결별 RTT와 마지막 수신 시각을 RTT가 큰 순서로 반환하는 엔드포인트"""
+    limit = max(1, min(limit, 1000))
+    return {"connections": manager.liveness.connection_stats(limit)}
+
+def parse_seq(value) -> Optional[int]:
+    """클라이언트가 보낸 메시지 순번을 정수로 바꾸는 함수 (없거나 잘못된 값이면 None)"""
+    try:
+        seq = int(value)
+    except (TypeError, ValueError):
+        return None
+    return seq if seq >= 0 else None
 
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     """WebSocket 연결을 처리하는 엔드포인트"""
-    user = await postgres_manager.get_user_by_id(user_id)
-    if not user:
-        await websocket.close(code=4003)  # 유효하지 않은 사용자 ID
-        logger.warning(f"Invalid user ID attempted to connect: {user_id}")
+    # 동시 핸드셰이크 수와 연결 속도를 넘으면 재연결 대기 시간을 담아 거절
+    retry_after = admission.acquire()
+    if retry_after is not None:
+        await reject(websocket, CLOSE_SERVICE_RESTART if admission.draining else CLOSE_OVERLOADED, retry_after)
         return
-
-    username = user['username']
-    nickname = user['nickname']
-    await manager.connect(websocket, user_id, username, nickname)
+    try:
+        # 재연결 폭주 시 PostgreSQL 조회를 줄이기 위해 캐시를 거쳐 사용자 정보 조회
+        user = await user_cache.get_user(user_id)
+        if not user:
+            await websocket.close(code=4003)  # 유효하지 않은 사용자 ID
+            logger.warning(f"Invalid user ID attempted to connect: {user_id}")
+            return
+
+        username = user['username']
+        nickname = user['nickname']
+        ip = websocket.client.host if websocket.client else None
+        # 클라이언트가 연결 시 ?batch=1로 묶음 전송을 요청할 수 있음
+        batch = websocket.query_params.get('batch') == '1'
+        # ?proto=2이면 MessagePack 바이너리 프레임 사용 (기본값은 JSON 텍스트)
+        codec = PROTOCOLS.get(websocket.query_params.get('proto', '1'), JSON)
+        # 재연결한 클라이언트는 ?last_seq=N으로 기본 채팅방에서 마지막으로 받은 메시지 순번을 알려줌
+        last_seq = parse_seq(websocket.query_params.get('last_seq'))
+        await manager.connect(websocket, user_id, username, nickname, batch, codec, last_seq, ip)
+    finally:
+        admission.release()
 
     try:
         while True:
-            data = await websocket.receive_json()
-            await manager.broadcast(data['message'], user_id, username, nickname)
+            # 클라이언트는 프로토콜과 관계없이 텍스트(JSON)나 바이너리(MessagePack) 프레임을 보낼 수 있음
+            data = await receive_frame(websocket)
+            # 어떤 메시지든 받으면 연결이 살아 있는 것으로 간주
+            manager.liveness.touch(user_id)
+            message_type = data.get('type', 'chat')
+            if message_type == 'pong':
+                manager.liveness.pong(user_id, data.get('t'))
+            elif message_type == 'join':
+                await manager.join_room(user_id, data.get('room'), parse_seq(data.get('last_seq')))
+            elif message_type == 'leave':
+                manager.leave_room(user_id, data.get('room'))
+            else:
+                await manager.broadcast(data['message'], user_id, username, nickname, data.get('room', config.DEFAULT_ROOM))
     except WebSocketDisconnect:
-        await manager.disconnect(user_id)
+        await manager.disconnect(user_id, websocket)
     except Exception as e:
         logger.error(f"Error in WebSocket connection: {e}")
-        await manager.disconnect(user_id)
+        await manager.disconnect(user_id, websocket)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # 여러 워커로 실행하려면 CHAT_BACKPLANE=1과 함께 WORKERS를 지정
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=config.WORKERS,
+                ws_per_message_deflate=config.WS_PER_MESSAGE_DEFLATE)
\ No newline at end of file
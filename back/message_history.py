@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from redis_manager import redis_manager, room_messages_key
+from postgresql_manager import postgres_manager
+import config
+
+def parse_cursor(cursor: str) -> Tuple[float, str]:
+    """'timestamp,message_id' 형식의 커서를 파싱하는 함수 (형식이 잘못되면 ValueError)"""
+    timestamp, _, message_id = cursor.partition(",")
+    if message_id:
+        # 형식 검증 및 소문자 hex로 정규화
+        message_id = uuid.UUID(message_id).hex
+    return float(timestamp), message_id
+
+def make_cursor(message: Dict) -> str:
+    """메시지의 (timestamp, message_id)로 다음 페이지 커서를 만드는 함수"""
+    return f"{message['timestamp']!r},{message.get('message_id', '')}"
+
+async def get_history(before: Optional[Tuple[float, str]], limit: int, sender_id: str = None,
+                      room: str = config.DEFAULT_ROOM) -> Dict:
+    """채팅방에서 커서 이전의 메시지 한 페이지를 최신순으로 가져오는 함수
+
+    최근 메시지는 Redis 리스트(채팅방 리스트 또는 user:{id}:messages)에서 읽고,
+    Redis에 남아 있지 않은 오래된 페이지는 PostgreSQL에서 같은 커서로 이어서 읽는다.
+    """
+    if sender_id:
+        messages, exhausted = await redis_manager.get_messages_before(f"user:{sender_id}:messages", before, limit, room)
+    else:
+        messages, exhausted = await redis_manager.get_messages_before(room_messages_key(room), before, limit)
+    if exhausted and len(messages) < limit:
+        # Redis에서 읽은 마지막 메시지부터 PostgreSQL에서 이어서 조회
+        cursor = (messages[-1]["timestamp"], messages[-1].get("message_id", "")) if messages else before
+        db_before = None
+        if cursor is not None:
+            db_before = (datetime.fromtimestamp(cursor[0]), uuid.UUID(cursor[1]) if cursor[1] else None)
+        messages += await postgres_manager.get_message_history(db_before, limit - len(messages), sender_id, room)
+    next_cursor = make_cursor(messages[-1]) if len(messages) >= limit else None
+    return {"messages": messages, "next_cursor": next_cursor}
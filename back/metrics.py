@@ -0,0 +1,240 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 지연 시간 히스토그램의 기본 구간 (초)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# 등록된 모든 지표 (노출 순서 유지)
+_registry: List["_Metric"] = []
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Prometheus 텍스트 형식의 레이블 문자열을 만드는 함수"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """레이블별 하위 지표를 관리하는 지표의 공통 부분
+
+    레이블이 없는 지표는 자기 자신이 하위 지표 역할을 한다.
+    hot path에서는 labels()로 얻은 하위 지표를 모듈 수준에 미리 만들어 두고 사용한다.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        _registry.append(self)
+
+    def labels(self, *values: str) -> "_Metric":
+        """레이블 값에 해당하는 하위 지표를 반환하는 메서드 (처음 사용할 때 생성)"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self) -> "_Metric":
+        child = object.__new__(type(self))
+        child._init_child()
+        return child
+
+    def _samples(self) -> List[Tuple[str, Tuple[str, ...], str, float]]:
+        """(이름 접미사, 레이블 값, 추가 레이블, 값) 목록을 반환하는 메서드"""
+        if not self.labelnames:
+            return [(suffix, (), extra, value) for suffix, extra, value in self._values()]
+        return [
+            (suffix, values, extra, value)
+            for values, child in self._children.items()
+            for suffix, extra, value in child._values()
+        ]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """단조 증가하는 카운터"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._init_child()
+
+    def _init_child(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def _values(self):
+        return [("_total", "", self.value)]
+
+class Gauge(_Metric):
+    """임의로 오르내리는 값 (함수를 지정하면 수집할 때 값을 계산)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._init_child()
+
+    def _init_child(self):
+        self.value = 0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """수집할 때마다 호출해 값을 얻을 함수를 지정하는 메서드 (hot path에 비용 없음)"""
+        self._function = function
+
+    def _values(self):
+        value = self.value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                value = float("nan")
+        return [("", "", value)]
+
+class _Timer:
+    """with 블록의 실행 시간을 히스토그램에 기록하는 컨텍스트 매니저"""
+
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: "Histogram"):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+class Histogram(_Metric):
+    """고정 구간 히스토그램 (관측 한 번에 이진 탐색 한 번과 정수 덧셈만 수행)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+        self._init_child()
+
+    def _new_child(self) -> "Histogram":
+        child = object.__new__(Histogram)
+        child._bounds = self._bounds
+        child._init_child()
+        return child
+
+    def _init_child(self):
+        # 마지막 칸은 +Inf 구간
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum += value
+
+    def time(self) -> _Timer:
+        """with 블록의 실행 시간(초)을 기록하는 메서드"""
+        return _Timer(self)
+
+    def _values(self):
+        values = []
+        cumulative = 0
+        for bound, count in zip(self._bounds + (float("inf"),), self._counts):
+            cumulative += count
+            values.append(("_bucket", f'le="{_format_value(bound)}"', cumulative))
+        values.append(("_sum", "", self._sum))
+        values.append(("_count", "", cumulative))
+        return values
+
+def render() -> str:
+    """등록된 모든 지표를 Prometheus 텍스트 형식으로 반환하는 함수"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# 채팅 팬아웃 지표
+chat_messages = Counter("chat_messages", "Chat messages accepted for broadcast")
+chat_rate_limited = Counter("chat_rate_limited", "Chat messages rejected by the rate limiter")
+chat_bans = Counter("chat_bans", "Users banned for spamming")
+chat_disconnects = Counter("chat_disconnects", "WebSocket disconnects by reason", ["reason"])
+chat_fanout_seconds = Histogram("chat_fanout_seconds", "Time to enqueue one frame for every local room member")
+chat_active_connections = Gauge("chat_active_connections", "WebSocket connections on this worker")
+chat_outbound_queue_depth = Gauge("chat_outbound_queue_depth", "Frames waiting in all outbound queues")
+chat_outbound_queue_depth_max = Gauge("chat_outbound_queue_depth_max", "Frames waiting in the fullest outbound queue")
+chat_outbound_dropped = Counter("chat_outbound_dropped", "Frames dropped or coalesced away for slow consumers")
+chat_handshakes_in_flight = Gauge("chat_handshakes_in_flight", "WebSocket handshakes in progress on this worker")
+chat_connects_rejected = Counter("chat_connects_rejected", "WebSocket connects rejected by admission control", ["reason"])
+
+# 저장소 지표
+redis_command_seconds = Histogram("redis_command_seconds", "Redis round-trip latency by operation", ["op"])
+db_query_seconds = Histogram("db_query_seconds", "PostgreSQL call latency by operation", ["op"])
+db_pool_size = Gauge("db_pool_size", "Connections open in the asyncpg pool")
+db_pool_in_use = Gauge("db_pool_in_use", "Connections checked out of the asyncpg pool")
+
+# 비밀번호 해시 지표
+password_hash_seconds = Histogram(
+    "password_hash_seconds", "bcrypt hash/verify time including pool queueing", ["op"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+)
+password_hash_in_flight = Gauge("password_hash_in_flight", "bcrypt jobs running or queued")
+
+# Redis → PostgreSQL 영속화 지표
+sync_lag_seconds = Gauge("sync_lag_seconds", "Age of the oldest message not yet persisted to PostgreSQL")
+sync_backlog = Gauge("sync_backlog", "Messages waiting in the outbox stream")
+sync_messages = Counter("sync_messages", "Messages persisted to PostgreSQL by this worker")
+sync_outbox_saturated = Gauge(
+    "sync_outbox_saturated", "1 while the outbox backlog is above OUTBOX_ALERT_RATIO of OUTBOX_MAX_LEN"
+)
+
+# 사용자 정보 캐시 지표
+user_cache_lookups = Counter("user_cache_lookups", "User cache lookups by result", ["result"])
+user_cache_size = Gauge("user_cache_size", "Entries in the in-process user cache")
+
+# 로컬 쓰기 전 로그(WAL) 지표
+wal_degraded = Gauge("wal_degraded", "1 while chat writes go to the local WAL instead of Redis")
+wal_bytes = Gauge("wal_bytes", "Bytes of chat messages waiting in the local WAL")
+wal_dropped_segments = Counter("wal_dropped_segments", "WAL segments discarded because the size bound was exceeded")
+wal_replayed = Counter("wal_replayed", "Messages replayed from the local WAL into Redis")
+
+# 금칙어/링크 필터 지표
+content_filter_actions = Counter("content_filter_actions", "Chat messages masked, rejected or flagged by the content filter", ["action"])
+content_filter_seconds = Histogram(
+    "content_filter_seconds", "Time to scan one chat message with the content filter",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+)
+content_filter_patterns = Gauge("content_filter_patterns", "Patterns loaded into the content filter automaton")
+
+# 접속 기록 지표
+session_audit_pending = Gauge("session_audit_pending", "Connect/disconnect records waiting to be written to user_sessions")
+session_audit_dropped = Counter("session_audit_dropped", "Connect/disconnect records dropped because the audit buffer was full")
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Dict, List, Optional
+from fastapi import WebSocket
+from codec import Frame, JSON, MSGPACK, encode_batch
+from metrics import chat_outbound_dropped
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 느린 소비자 처리 정책
+DROP = "drop"          # 큐가 가득 차면 새 프레임을 버림
+COALESCE = "coalesce"  # 큐가 가득 차면 가장 오래된 프레임을 버리고 새 프레임을 유지
+EVICT = "evict"        # 큐가 가득 차면 연결을 끊음
+POLICIES = (DROP, COALESCE, EVICT)
+
+class OutboundQueue:
+    """웹소켓 연결 하나에 대한 제한된 송신 큐와 전용 writer 태스크"""
+
+    def __init__(self, websocket: WebSocket, maxsize: int, policy: str, send_timeout: float,
+                 on_evict: Callable[[], None], batch_window: float = 0.0, batch_max: int = 1,
+                 codec: str = JSON):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.policy = policy
+        self.send_timeout = send_timeout
+        # 연결이 협상한 프레임 인코딩 (json | msgpack)
+        self.codec = codec
+        # 느린 소비자이거나 전송에 실패했을 때 호출되는 콜백
+        self._on_evict = on_evict
+        # 묶음 전송 설정 (batch_max가 1 이하이면 프레임마다 따로 전송)
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        # 전송 대기 중인 프레임 ([coalesce 키, Frame] 형태)
+        self._frames: deque = deque()
+        # coalesce 키별 대기 중인 프레임 (같은 키의 프레임은 최신 값으로 덮어씀)
+        self._keyed: Dict[str, list] = {}
+        self._wakeup = asyncio.Event()
+        # 재전송할 프레임을 앞에 넣을 때까지 전송을 멈추는지 여부
+        self._held = False
+        self._held_at = 0
+        # 묶음 하나를 채울 만큼 프레임이 쌓였음을 알리는 이벤트
+        self._batch_full = asyncio.Event()
+        self._closed = False
+        self.dropped = 0
+        self._task = asyncio.create_task(self._writer())
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def put(self, frame: Frame, key: Optional[str] = None) -> bool:
+        """프레임을 큐에 넣는 메서드 (대기하지 않음)"""
+        if self._closed:
+            return False
+        if key is not None:
+            entry = self._keyed.get(key)
+            if entry is not None:
+                # 아직 전송되지 않은 같은 종류의 프레임은 최신 값으로 교체
+                entry[1] = frame
+                return True
+        if len(self._frames) >= self.maxsize:
+            if self.policy == EVICT:
+                self._evict("outbound queue full")
+                return False
+            self.dropped += 1
+            chat_outbound_dropped.inc()
+            if self.policy == DROP:
+                return False
+            # COALESCE: 가장 오래된 프레임을 버리고 최신 프레임을 유지
+            old_key, _ = self._frames.popleft()
+            if old_key is not None:
+                self._keyed.pop(old_key, None)
+        entry = [key, frame]
+        self._frames.append(entry)
+        if key is not None:
+            self._keyed[key] = entry
+        self._wakeup.set()
+        if len(self._frames) >= self.batch_max:
+            self._batch_full.set()
+        return True
+
+    def hold(self):
+        """release가 호출될 때까지 전송을 멈추는 메서드 (그동안 들어온 프레임은 큐에 쌓임)"""
+        self._held = True
+        self._held_at = len(self._frames)
+
+    def release(self, frames: List[Frame] = ()):
+        """hold 이후에 들어온 프레임보다 앞에 frames를 넣고 전송을 재개하는 메서드
+
+        놓친 메시지를 실시간 메시지보다 먼저 보내기 위해 사용하며, 큐 크기 제한을 적용하지 않는다.
+        """
+        if not self._closed:
+            position = min(self._held_at, len(self._frames))
+            for offset, frame in enumerate(frames):
+                self._frames.insert(position + offset, [None, frame])
+        self._held = False
+        self._wakeup.set()
+
+    async def _writer(self):
+        """큐에 쌓인 프레임을 순서대로 웹소켓에 전송하는 태스크"""
+        try:
+            while True:
+                while not self._frames or (self._held and not self._closed):
+                    if self._closed:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                if self.batch_max > 1 and len(self._frames) < self.batch_max and not self._closed:
+                    # 짧은 시간 동안 뒤따르는 프레임을 모아 한 번에 전송
+                    self._batch_full.clear()
+                    try:
+                        await asyncio.wait_for(self._batch_full.wait(), self.batch_window)
+                    except asyncio.TimeoutError:
+                        pass
+                    if not self._frames:
+                        continue
+                items = []
+                while self._frames and len(items) < self.batch_max:
+                    key, frame = self._frames.popleft()
+                    if key is not None:
+                        self._keyed.pop(key, None)
+                    items.append(frame.encode(self.codec))
+                data = items[0] if len(items) == 1 else encode_batch(items, self.codec)
+                if self.codec == MSGPACK:
+                    send = self.websocket.send_bytes(data)
+                else:
+                    send = self.websocket.send_text(data)
+                await asyncio.wait_for(send, self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._evict("send timeout")
+        except Exception as e:
+            self._evict(f"send failed: {e}")
+
+    def _evict(self, reason: str):
+        """송신을 중단하고 연결 퇴출 콜백을 호출하는 메서드"""
+        if self._closed:
+            return
+        logger.warning(f"Evicting slow or broken consumer: {reason}")
+        self._closed = True
+        self._frames.clear()
+        self._keyed.clear()
+        self._wakeup.set()
+        self._on_evict()
+
+    def abort(self):
+        """남은 프레임을 버리고 writer 태스크를 즉시 중지하는 메서드"""
+        self._closed = True
+        self._frames.clear()
+        self._keyed.clear()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    async def close(self, code: int = 1000, timeout: float = 1.0):
+        """남은 프레임을 전송한 뒤 웹소켓을 닫는 메서드"""
+        self._closed = True
+        self._wakeup.set()
+        if not self._task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            # 이미 닫힌 연결은 무시
+            pass
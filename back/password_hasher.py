@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import bcrypt
+from metrics import password_hash_seconds, password_hash_in_flight
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+class PasswordHasherBusy(Exception):
+    """해시 워커 풀이 포화 상태라 요청을 받을 수 없을 때 발생하는 예외"""
+
+def _hash_password(password: str) -> str:
+    # 프로세스 풀에서도 실행할 수 있도록 모듈 수준 함수로 정의
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def _check_password(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+# 작업 종류별 소요 시간 히스토그램
+_hash_seconds = password_hash_seconds.labels("hash")
+_verify_seconds = password_hash_seconds.labels("verify")
+
+class PasswordHasher:
+    """bcrypt 해시/검증을 이벤트 루프 밖의 제한된 워커 풀에서 실행하는 클래스
+
+    동시에 처리 중이거나 대기 중인 요청이 max_workers + max_pending을 넘으면
+    대기열을 늘리지 않고 PasswordHasherBusy를 발생시킨다.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.limit = max_workers + max_pending
+        self.use_processes = use_processes
+        self.in_flight = 0
+        self._executor: Executor = None
+
+    def _get_executor(self) -> Executor:
+        """워커 풀을 처음 사용할 때 생성하는 메서드"""
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, histogram, func, *args):
+        """허용 한도 안에서 함수를 워커 풀에서 실행하는 메서드 (대기 시간을 포함해 소요 시간 기록)"""
+        if self.in_flight >= self.limit:
+            logger.warning("Password hasher is saturated, rejecting request")
+            raise PasswordHasherBusy()
+        self.in_flight += 1
+        try:
+            with histogram.time():
+                return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        """비밀번호를 bcrypt로 해시하는 메서드"""
+        return await self._run(_hash_seconds, _hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """비밀번호가 해시와 일치하는지 확인하는 메서드"""
+        return await self._run(_verify_seconds, _check_password, password, hashed_password)
+
+    def shutdown(self):
+        """워커 풀을 종료하는 메서드"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+# PasswordHasher 인스턴스 생성
+password_hasher = PasswordHasher(
+    config.PASSWORD_HASH_WORKERS,
+    config.PASSWORD_HASH_MAX_PENDING,
+    config.PASSWORD_HASH_USE_PROCESSES
+)
+
+password_hash_in_flight.set_function(lambda: password_hasher.in_flight)
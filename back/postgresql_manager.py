@@ -1,10 +1,15 @@
 import asyncpg
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import uuid
-from datetime import datetime, timedelta
-import bcrypt
-from db_schema import initialize_database, ensure_partition_exists
+from datetime import datetime
+from db_schema import initialize_database, partition_manager
+from password_hasher import password_hasher, PasswordHasherBusy
+from metrics import db_query_seconds, db_pool_size, db_pool_in_use
+import config
+
+# 사용자 이름, 이메일, 닉네임 중 하나가 이미 사용 중이어서 등록에 실패했을 때의 결과 메시지
+DUPLICATE_USER = "Username or email already exists"
 
 class PostgresManager:
     def __init__(self):
@@ -25,21 +30,26 @@ class PostgresManager:
     async def stop(self):
         """데이터베이스 연결 풀을 종료하는 메서드"""
         await self.pool.close()
+        password_hasher.shutdown()
 
     async def register_user(self, username: str, password: str, email: str, nickname: str):
         """새 사용자를 등록하는 메서드"""
         try:
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-            async with self.pool.acquire() as conn:
-                user_id = await conn.fetchval(
-                    'INSERT INTO users (id, username, email, nickname, password) VALUES ($1, $2, $3, $4, $5) RETURNING id',
-                    uuid.uuid4(), username, email, nickname, hashed_password.decode('utf-8')
-                )
+            # bcrypt 해시는 워커 풀에서 실행해 이벤트 루프를 막지 않음
+            hashed_password = await password_hasher.hash(password)
+            with db_query_seconds.labels("register_user").time():
+                async with self.pool.acquire() as conn:
+                    user_id = await conn.fetchval(
+                        'INSERT INTO users (id, username, email, nickname, password) VALUES ($1, $2, $3, $4, $5) RETURNING id',
+                        uuid.uuid4(), username, email, nickname, hashed_password
+                    )
             self.logger.info(f"User registered successfully: {username}")
             return True, str(user_id)
         except asyncpg.UniqueViolationError:
             self.logger.warning(f"Attempted to register existing username or email: {username}")
-            return False, "Username or email already exists"
+            return False, DUPLICATE_USER
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             self.logger.error(f"Error registering user {username}: {e}")
             return False, "Error registering user"
@@ -47,16 +57,19 @@ class PostgresManager:
     async def login_user(self, username: str, password: str):
         """사용자 로그인을 처리하는 메서드"""
         try:
-            async with self.pool.acquire() as conn:
-                user = await conn.fetchrow(
-                    'SELECT id, password, nickname FROM users WHERE username = $1',
-                    username
-                )
-            if user and bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+            with db_query_seconds.labels("login_user").time():
+                async with self.pool.acquire() as conn:
+                    user = await conn.fetchrow(
+                        'SELECT id, password, nickname FROM users WHERE username = $1',
+                        username
+                    )
+            if user and await password_hasher.verify(password, user['password']):
                 self.logger.info(f"Successful login for username: {username}")
                 return True, {"user_id": str(user['id']), "nickname": user['nickname']}
             self.logger.warning(f"Failed login attempt for username: {username}")
             return False, "Invalid username or password"
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             self.logger.error(f"Error during login for {username}: {e}")
             return False, "Error during login"
@@ -66,7 +79,7 @@ class PostgresManager:
         try:
             message_date = datetime.now().date()
             async with self.pool.acquire() as conn:
-                await ensure_partition_exists(conn, 'messages', message_date)
+                await partition_manager.ensure(conn, 'messages', message_date)
                 await conn.execute(
                     'INSERT INTO messages (sender_id, nickname, content) VALUES ($1, $2, $3)',
                     uuid.UUID(sender_id), nickname, content
@@ -76,45 +89,100 @@ class PostgresManager:
             self.logger.error(f"Error saving message: {e}")
             return False
 
-    async def save_user_session(self, user_id: str, ip_address: str):
-        """사용자 세션을 저장하는 메서드"""
+    async def save_user_sessions(self, logins: List[Tuple], logouts: List[Tuple]) -> bool:
+        """접속/종료 기록을 한 트랜잭션에서 일괄 저장하는 메서드
+
+        logins는 (login_time, id, user_id, ip_address), logouts는 (id, login_time, logout_time) 튜플의 리스트이다.
+        접속 기록은 unnest 한 번으로 삽입하고, 종료 시각은 unnest 한 번으로 갱신한다
+        (login_time을 함께 비교해 해당 파티션만 확인). 같은 묶음에 들어온 접속의 종료도 처리되도록 삽입을 먼저 한다.
+        """
+        if not logins and not logouts:
+            return True
         try:
-            session_date = datetime.now().date()
-            async with self.pool.acquire() as conn:
-                await ensure_partition_exists(conn, 'user_sessions', session_date)
-                await conn.execute(
-                    'INSERT INTO user_sessions (id, user_id, ip_address) VALUES ($1, $2, $3)',
-                    uuid.uuid4(), uuid.UUID(user_id), ip_address
-                )
+            with db_query_seconds.labels("save_user_sessions").time():
+                async with self.pool.acquire() as conn:
+                    for session_date in {login[0].astimezone().date() for login in logins}:
+                        await partition_manager.ensure(conn, 'user_sessions', session_date)
+                    async with conn.transaction():
+                        if logins:
+                            await conn.execute(
+                                'INSERT INTO user_sessions (login_time, id, user_id, ip_address) '
+                                'SELECT * FROM unnest($1::timestamptz[], $2::uuid[], $3::uuid[], $4::inet[])',
+                                *(list(column) for column in zip(*logins))
+                            )
+                        if logouts:
+                            await conn.execute(
+                                'UPDATE user_sessions s SET logout_time = u.logout_time '
+                                'FROM unnest($1::uuid[], $2::timestamptz[], $3::timestamptz[]) AS u(id, login_time, logout_time) '
+                                'WHERE s.id = u.id AND s.login_time = u.login_time',
+                                *(list(column) for column in zip(*logouts))
+                            )
             return True
         except Exception as e:
-            self.logger.error(f"Error saving user session: {e}")
+            self.logger.error(f"Error saving user sessions: {e}")
             return False
 
-    async def get_recent_messages_from_db(self, limit: int = 50) -> List[Dict]:
-        """데이터베이스에서 최근 메시지를 가져오는 메서드"""
+    async def get_message_history(self, before: Optional[Tuple[datetime, Optional[uuid.UUID]]], limit: int = 50,
+                                  sender_id: str = None, room: str = config.DEFAULT_ROOM) -> List[Dict]:
+        """채팅방에서 커서(created_at, message_id)보다 오래된 메시지를 최신순으로 가져오는 메서드
+
+        키셋 조건과 LIMIT으로 커서보다 새로운 파티션은 제외하고 인덱스 순서대로 필요한 행만 읽으며,
+        users 조인은 페이지에 포함된 행에 대해서만 수행한다.
+        """
         try:
-            async with self.pool.acquire() as conn:
-                rows = await conn.fetch('''
-                    SELECT m.created_at, m.content, m.nickname, u.username as sender
-                    FROM messages m
-                    JOIN users u ON m.sender_id = u.id
-                    ORDER BY m.created_at DESC
-                    LIMIT $1
-                ''', limit)
-            return [dict(r) for r in rows]
+            # idx_messages_room_created 인덱스 사용
+            conditions = ['room = $1']
+            args = [room]
+            if sender_id is not None:
+                # idx_messages_sender_created 인덱스 사용
+                args.append(uuid.UUID(sender_id))
+                conditions.append(f'sender_id = ${len(args)}')
+            if before is not None:
+                before_time, before_id = before
+                args.append(before_time)
+                if before_id is None:
+                    conditions.append(f'created_at < ${len(args)}')
+                else:
+                    args.append(before_id)
+                    conditions.append(f'(created_at < ${len(args) - 1} OR (created_at = ${len(args) - 1} AND message_id < ${len(args)}))')
+            args.append(limit)
+            where = f"WHERE {' AND '.join(conditions)}"
+            with db_query_seconds.labels("get_message_history").time():
+                async with self.pool.acquire() as conn:
+                    rows = await conn.fetch(f'''
+                        SELECT m.created_at, m.message_id, m.room, m.sender_id, m.nickname, m.content, u.username
+                        FROM (
+                            SELECT created_at, message_id, room, sender_id, nickname, content
+                            FROM messages
+                            {where}
+                            ORDER BY created_at DESC, message_id DESC
+                            LIMIT ${len(args)}
+                        ) m
+                        JOIN users u ON m.sender_id = u.id
+                        ORDER BY m.created_at DESC, m.message_id DESC
+                    ''', *args)
+            return [{
+                "message_id": row['message_id'].hex if row['message_id'] else "",
+                "room": row['room'],
+                "content": row['content'],
+                "sender_id": str(row['sender_id']),
+                "username": row['username'],
+                "nickname": row['nickname'],
+                "timestamp": row['created_at'].timestamp()
+            } for row in rows]
         except Exception as e:
-            self.logger.error(f"Error fetching recent messages from database: {e}")
+            self.logger.error(f"Error fetching message history from database: {e}")
             return []
 
     async def get_user_by_id(self, user_id: str):
         """사용자 ID로 사용자 정보를 가져오는 메서드"""
         try:
-            async with self.pool.acquire() as conn:
-                user = await conn.fetchrow(
-                    'SELECT id, username, nickname FROM users WHERE id = $1',
-                    uuid.UUID(user_id)
-                )
+            with db_query_seconds.labels("get_user_by_id").time():
+                async with self.pool.acquire() as conn:
+                    user = await conn.fetchrow(
+                        'SELECT id, username, nickname FROM users WHERE id = $1',
+                        uuid.UUID(user_id)
+                    )
             if user:
                 return {"id": str(user['id']), "username": user['username'], "nickname": user['nickname']}
             return None
@@ -123,23 +191,74 @@ class PostgresManager:
             return None
 
     async def save_messages_from_redis(self, messages: List[Dict]):
-        """Redis에서 가져온 메시지를 PostgreSQL에 저장하는 메서드"""
+        """Redis에서 가져온 메시지를 PostgreSQL에 일괄 저장하는 메서드
+
+        발신자 검증은 집합 단위 쿼리로 한 번만 수행하고, 레코드는 하나의 트랜잭션 안에서
+        임시 테이블로 COPY한 뒤 INSERT ... SELECT로 옮긴다. 아웃박스 재전달이나 WAL 재전송으로
+        같은 message_id가 다시 들어오면 묶음 안에서는 미리 걸러내고, 이미 저장된 것은 ON CONFLICT로 무시한다.
+        """
+        if not messages:
+            return True
         try:
-            async with self.pool.acquire() as conn:
-                for message in messages:
-                    # 사용자 ID가 유효한지 확인
-                    user_exists = await conn.fetchval('SELECT EXISTS(SELECT 1 FROM users WHERE id = $1)', uuid.UUID(message['sender_id']))
-                    if not user_exists:
-                        self.logger.warning(f"Skipping message from non-existent user: {message['sender_id']}")
+            # 메시지를 레코드로 변환 (created_at, sender_id, nickname, content, message_id, room)
+            records = []
+            seen_ids = set()
+            for message in messages:
+                try:
+                    sender_id = uuid.UUID(message['sender_id'])
+                except (ValueError, TypeError):
+                    self.logger.warning(f"Skipping message with invalid sender ID: {message.get('sender_id')}")
+                    continue
+                message_id = uuid.UUID(message['message_id']) if message.get('message_id') else None
+                # 같은 묶음에 중복된 메시지는 처음 것만 저장
+                if message_id is not None:
+                    if message_id in seen_ids:
                         continue
+                    seen_ids.add(message_id)
+                records.append((
+                    datetime.fromtimestamp(message['timestamp']), sender_id,
+                    message['nickname'], message['content'], message_id,
+                    message.get('room', config.DEFAULT_ROOM)
+                ))
+            if not records:
+                return True
 
-                    message_date = datetime.fromtimestamp(message['timestamp']).date()
-                    await ensure_partition_exists(conn, 'messages', message_date)
-                    await conn.execute(
-                        'INSERT INTO messages (sender_id, nickname, content, created_at) VALUES ($1, $2, $3, $4)',
-                        uuid.UUID(message['sender_id']), message['nickname'], message['content'],
-                        datetime.fromtimestamp(message['timestamp'])
-                    )
+            with db_query_seconds.labels("save_messages").time():
+                async with self.pool.acquire() as conn:
+                    # 사용자 ID가 유효한지 한 번의 쿼리로 확인
+                    sender_ids = list({record[1] for record in records})
+                    rows = await conn.fetch('SELECT id FROM users WHERE id = ANY($1::uuid[])', sender_ids)
+                    valid_senders = {row['id'] for row in rows}
+                    for sender_id in set(sender_ids) - valid_senders:
+                        self.logger.warning(f"Skipping messages from non-existent user: {sender_id}")
+                    records = [record for record in records if record[1] in valid_senders]
+                    if not records:
+                        return True
+
+                    async with conn.transaction():
+                        for message_date in {record[0].date() for record in records}:
+                            await partition_manager.ensure(conn, 'messages', message_date)
+                        # 트랜잭션이 끝나면 사라지는 임시 테이블로 COPY
+                        await conn.execute('''
+                            CREATE TEMP TABLE messages_staging (
+                                created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                                sender_id UUID NOT NULL,
+                                nickname VARCHAR(50) NOT NULL,
+                                content TEXT NOT NULL,
+                                message_id UUID,
+                                room VARCHAR(64) NOT NULL
+                            ) ON COMMIT DROP
+                        ''')
+                        await conn.copy_records_to_table(
+                            'messages_staging', records=records,
+                            columns=['created_at', 'sender_id', 'nickname', 'content', 'message_id', 'room']
+                        )
+                        # 부모 테이블에 삽입하면 각 행이 해당 파티션으로 라우팅되고, 이미 저장된 메시지는 무시됨
+                        await conn.execute(
+                            'INSERT INTO messages (created_at, sender_id, nickname, content, message_id, room) '
+                            'SELECT created_at, sender_id, nickname, content, message_id, room FROM messages_staging '
+                            'ON CONFLICT DO NOTHING'
+                        )
             return True
         except Exception as e:
             self.logger.error(f"Error saving messages from Redis: {e}")
@@ -148,12 +267,35 @@ class PostgresManager:
     async def check_duplicate(self, field: str, value: str) -> bool:
         """이메일, 사용자 이름, 닉네임의 중복을 확인하는 메서드"""
         try:
-            async with self.pool.acquire() as conn:
-                count = await conn.fetchval(f'SELECT COUNT(*) FROM users WHERE {field} = $1', value)
-            return count > 0
+            with db_query_seconds.labels("check_duplicate").time():
+                async with self.pool.acquire() as conn:
+                    # 유니크 인덱스에서 존재 여부만 확인
+                    return await conn.fetchval(f'SELECT EXISTS(SELECT 1 FROM users WHERE {field} = $1)', value)
         except Exception as e:
             self.logger.error(f"Error checking duplicate {field}: {e}")
             return False
 
+    async def get_taken_values(self, username: str, email: str, nickname: str) -> Dict[str, str]:
+        """주어진 사용자 이름, 이메일, 닉네임 중 이미 사용 중인 값을 필드별로 반환하는 메서드"""
+        values = {'username': username, 'email': email, 'nickname': nickname}
+        try:
+            with db_query_seconds.labels("get_taken_values").time():
+                async with self.pool.acquire() as conn:
+                    rows = await conn.fetch(
+                        'SELECT username, email, nickname FROM users '
+                        'WHERE username = $1 OR email = $2 OR nickname = $3',
+                        username, email, nickname
+                    )
+        except Exception as e:
+            self.logger.error(f"Error looking up taken values for {username}: {e}")
+            return {}
+        return {field: value for field, value in values.items() if any(row[field] == value for row in rows)}
+
 # PostgresManager 인스턴스 생성
-postgres_manager = PostgresManager()
\ No newline at end of file
+postgres_manager = PostgresManager()
+
+# 연결 풀 사용량은 /metrics 수집 시점에 계산
+db_pool_size.set_function(lambda: postgres_manager.pool.get_size() if postgres_manager.pool else 0)
+db_pool_in_use.set_function(
+    lambda: postgres_manager.pool.get_size() - postgres_manager.pool.get_idle_size() if postgres_manager.pool else 0
+)
\ No newline at end of file
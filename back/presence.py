@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from redis.exceptions import RedisError
+from redis_manager import redis_manager
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 노드 목록 (정렬 집합, 점수는 마지막 하트비트 시각)
+NODES_KEY = "presence:nodes"
+
+# 하트비트 갱신, 만료된 노드 정리, 전체 접속자 수 계산을 한 번의 왕복으로 처리하는 스크립트
+# KEYS[1] = 노드 목록, KEYS[2] = 이 노드의 접속자 집합
+# ARGV[1] = 현재 시각, ARGV[2] = TTL(초), ARGV[3] = 노드 ID
+HEARTBEAT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+local total = 0
+for _, node in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    total = total + redis.call('SCARD', 'presence:' .. node)
+end
+return total
+"""
+
+class PresenceService:
+    """노드별 접속자 집합과 TTL 하트비트로 전체 접속자 수를 관리하는 클래스
+
+    각 노드는 presence:{node_id} 집합에 자신에게 연결된 사용자를 기록하고 주기적으로 TTL을 갱신한다.
+    프로세스가 비정상 종료되면 하트비트가 멈추므로 해당 노드의 집합은 TTL이 지나면 사라진다.
+    전체 접속자 수는 주기마다 한 번 계산하며, 값이 바뀐 경우에만 설정된 최소 간격으로 클라이언트에 전송한다.
+    """
+
+    def __init__(self, heartbeat_interval: float, ttl: int, min_push_interval: float):
+        self.node_id = config.NODE_ID
+        self.node_key = f"presence:{self.node_id}"
+        self.heartbeat_interval = heartbeat_interval
+        self.ttl = ttl
+        self.min_push_interval = min_push_interval
+        # 마지막으로 계산한 전체 접속자 수
+        self.count = 0
+        self._heartbeat = None
+        # Redis 장애로 접속자 집합이 실제 연결과 달라졌을 수 있어 다시 채워야 하는지 여부
+        self._resync = False
+
+    async def register(self):
+        """이 노드의 접속자 집합을 초기화하고 노드 목록에 등록하는 메서드"""
+        # 다른 노드의 접속 정보는 건드리지 않고 이 노드의 집합만 비움
+        self._heartbeat = redis_manager.redis.register_script(HEARTBEAT_SCRIPT)
+        async with redis_manager.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self.node_key)
+            pipe.zadd(NODES_KEY, {self.node_id: time.time()})
+            await pipe.execute()
+
+    async def unregister(self):
+        """이 노드의 접속자 집합을 삭제하고 노드 목록에서 제거하는 메서드"""
+        async with redis_manager.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self.node_key)
+            pipe.zrem(NODES_KEY, self.node_id)
+            await pipe.execute()
+
+    async def add(self, sender_id: str):
+        """이 노드의 접속자 집합에 사용자를 추가하는 메서드 (Redis 장애 시 복구 후 다시 채움)
+
+        새로 추가되었으면 마지막으로 계산한 접속자 수에도 바로 반영해, 방금 연결한 클라이언트가
+        다음 하트비트 전에도 자신을 포함한 수를 받도록 한다 (정확한 값은 다음 하트비트에서 다시 계산).
+        """
+        try:
+            async with redis_manager.redis.pipeline(transaction=True) as pipe:
+                pipe.sadd(self.node_key, sender_id)
+                pipe.expire(self.node_key, self.ttl)
+                added, _ = await pipe.execute()
+            if added:
+                self.count += 1
+        except RedisError as e:
+            logger.warning(f"Failed to add {sender_id} to presence, will resync: {e}")
+            self._resync = True
+
+    async def remove(self, sender_id: str):
+        """이 노드의 접속자 집합에서 사용자를 제거하는 메서드 (Redis 장애 시 복구 후 다시 채움)"""
+        try:
+            if await redis_manager.redis.srem(self.node_key, sender_id):
+                self.count = max(0, self.count - 1)
+        except RedisError as e:
+            logger.warning(f"Failed to remove {sender_id} from presence, will resync: {e}")
+            self._resync = True
+
+    async def resync(self, sender_ids):
+        """이 노드의 접속자 집합을 실제 연결 목록으로 다시 채우는 메서드"""
+        async with redis_manager.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self.node_key)
+            if sender_ids:
+                pipe.sadd(self.node_key, *sender_ids)
+            pipe.expire(self.node_key, self.ttl)
+            await pipe.execute()
+        self._resync = False
+
+    async def heartbeat(self) -> int:
+        """하트비트를 갱신하고 전체 접속자 수를 계산하는 메서드"""
+        self.count = int(await self._heartbeat(keys=[NODES_KEY, self.node_key], args=[time.time(), self.ttl, self.node_id]))
+        return self.count
+
+    async def run(self, manager):
+        """하트비트를 보내고 접속자 수가 바뀐 경우에만 모든 연결에 전송하는 태스크"""
+        last_pushed_count = None
+        last_push_time = 0.0
+        while True:
+            try:
+                if self._resync:
+                    await self.resync(list(manager.connections))
+                count = await self.heartbeat()
+                now = time.monotonic()
+                if count != last_pushed_count and now - last_push_time >= self.min_push_interval:
+                    # 아직 전송되지 않은 이전 user_count 프레임은 최신 값으로 교체됨
+                    manager.send_to_all({"type": "user_count", "count": count}, key="user_count")
+                    last_pushed_count = count
+                    last_push_time = now
+                await asyncio.sleep(self.heartbeat_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 오류 발생 시 로그 기록 및 5초 대기 후 재시도
+                logger.error(f"Error in presence heartbeat: {e}", exc_info=True)
+                # 장애가 TTL보다 길었다면 접속자 집합이 만료되었으므로 복구 후 다시 채움
+                self._resync = True
+                await asyncio.sleep(5)
+
+# PresenceService 인스턴스 생성
+presence = PresenceService(config.PRESENCE_HEARTBEAT_INTERVAL, config.PRESENCE_TTL, config.USER_COUNT_MIN_PUSH_INTERVAL)
@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import time
+from typing import Dict, Optional, Tuple
+from redis.exceptions import RedisError
+from redis_manager import redis_manager
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 검사 결과
+ALLOWED = 0       # 전송 허용
+RATE_LIMITED = 1  # 토큰 부족 (잠시 후 재시도)
+BANNED = 2        # 차단 중
+NEWLY_BANNED = 3  # 이번 메시지로 스팸이 감지되어 차단됨
+
+# 차단 확인, 토큰 버킷, 중복 메시지 감지를 원자적으로 한 번의 왕복으로 처리하는 스크립트
+# KEYS[1] = 사용자 상태 해시, KEYS[2] = 차단 키, KEYS[3] = IP 상태 해시 (선택)
+# ARGV = 현재 시각(ms), 버킷 용량, 초당 충전량, 메시지 해시, 스팸 임계값, 스팸 윈도우(ms), 차단 시간(ms),
+#        IP 버킷 용량, IP 초당 충전량
+# 반환값 = {결과, 대기 시간(ms)}
+CHECK_SCRIPT = """
+local now = tonumber(ARGV[1])
+local ban_ttl = redis.call('PTTL', KEYS[2])
+if ban_ttl > 0 then
+    return {2, ban_ttl}
+end
+
+local function take(key, capacity, rate)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) / 1000 * rate)
+    local allowed = tokens >= 1
+    if allowed then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 60000)
+    return allowed, math.ceil((1 - tokens) / rate * 1000)
+end
+
+local allowed, wait = take(KEYS[1], tonumber(ARGV[2]), tonumber(ARGV[3]))
+if not allowed then
+    return {1, wait}
+end
+if #KEYS >= 3 then
+    allowed, wait = take(KEYS[3], tonumber(ARGV[8]), tonumber(ARGV[9]))
+    if not allowed then
+        return {1, wait}
+    end
+end
+
+local dup = redis.call('HMGET', KEYS[1], 'dh', 'dc', 'df')
+local count = 1
+local first = now
+if dup[1] == ARGV[4] and now - tonumber(dup[3]) <= tonumber(ARGV[6]) then
+    count = tonumber(dup[2]) + 1
+    first = tonumber(dup[3])
+end
+if count >= tonumber(ARGV[5]) then
+    redis.call('HDEL', KEYS[1], 'dh', 'dc', 'df')
+    redis.call('SET', KEYS[2], 1, 'PX', ARGV[7])
+    return {3, tonumber(ARGV[7])}
+end
+redis.call('HSET', KEYS[1], 'dh', ARGV[4], 'dc', count, 'df', tostring(first))
+return {0, 0}
+"""
+
+def content_hash(message: str) -> str:
+    """중복 감지에 사용할 메시지의 짧은 해시를 구하는 함수"""
+    return hashlib.blake2b(message.encode("utf-8"), digest_size=8).hexdigest()
+
+class LocalRateLimiter:
+    """Redis 없이 같은 규칙을 프로세스 내에서 적용하는 제한기 (단일 워커용)"""
+
+    def __init__(self):
+        # 키 -> [토큰, 마지막 충전 시각]
+        self._buckets: Dict[str, list] = {}
+        # 사용자 ID -> [메시지 해시, 반복 횟수, 첫 전송 시각]
+        self._duplicates: Dict[str, list] = {}
+        # 사용자 ID -> 차단 해제 시각
+        self._banned_until: Dict[str, float] = {}
+
+    def _take(self, key: str, capacity: int, rate: float, now: float) -> Tuple[bool, float]:
+        """토큰 버킷에서 토큰 하나를 꺼내는 메서드"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(capacity), now]
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        bucket[0], bucket[1] = tokens, now
+        return allowed, (1 - tokens) / rate
+
+    async def check(self, sender_id: str, message: str, ip: Optional[str] = None) -> Tuple[int, float]:
+        """메시지 전송 가능 여부를 (결과, 대기 시간(초))로 반환하는 메서드"""
+        now = time.time()
+        banned_until = self._banned_until.get(sender_id)
+        if banned_until is not None:
+            if now < banned_until:
+                return BANNED, banned_until - now
+            del self._banned_until[sender_id]
+
+        allowed, wait = self._take(sender_id, config.RATE_LIMIT_CAPACITY, config.RATE_LIMIT_REFILL, now)
+        if not allowed:
+            return RATE_LIMITED, wait
+        if ip and config.IP_RATE_LIMIT_CAPACITY > 0:
+            allowed, wait = self._take(f"ip:{ip}", config.IP_RATE_LIMIT_CAPACITY, config.IP_RATE_LIMIT_REFILL, now)
+            if not allowed:
+                return RATE_LIMITED, wait
+
+        digest = content_hash(message)
+        duplicate = self._duplicates.get(sender_id)
+        if duplicate is not None and duplicate[0] == digest and now - duplicate[2] <= config.SPAM_WINDOW:
+            duplicate[1] += 1
+        else:
+            duplicate = self._duplicates[sender_id] = [digest, 1, now]
+        if duplicate[1] >= config.SPAM_THRESHOLD:
+            del self._duplicates[sender_id]
+            self._banned_until[sender_id] = now + config.BAN_DURATION
+            return NEWLY_BANNED, float(config.BAN_DURATION)
+        return ALLOWED, 0.0
+
+    def prune(self):
+        """가득 찬 버킷, 지난 중복 기록, 만료된 차단 정보를 정리하는 메서드"""
+        now = time.time()
+        for key, bucket in list(self._buckets.items()):
+            if now - bucket[1] > 3600:
+                del self._buckets[key]
+        for sender_id, duplicate in list(self._duplicates.items()):
+            if now - duplicate[2] > config.SPAM_WINDOW:
+                del self._duplicates[sender_id]
+        for sender_id, banned_until in list(self._banned_until.items()):
+            if now >= banned_until:
+                del self._banned_until[sender_id]
+
+class RedisRateLimiter:
+    """Redis Lua 스크립트로 사용자(및 IP)별 토큰 버킷과 중복 메시지 차단을 처리하는 제한기
+
+    상태는 사용자당 작은 해시 하나(토큰, 마지막 충전 시각, 마지막 메시지 해시와 반복 횟수)이며
+    TTL로 자동 만료된다. 차단은 ban:{user_id} 키로 모든 워커가 공유하고,
+    차단 중인 연결은 연결 레코드에 기록한 차단 해제 시각으로 Redis 왕복 없이 거절한다 (ConnectionManager).
+    Redis를 사용할 수 없는 동안에는 같은 규칙을 프로세스 내에서 적용한다.
+    """
+
+    def __init__(self):
+        self._script = None
+        # Redis 장애 시 사용하는 프로세스 내 제한기
+        self._fallback = LocalRateLimiter()
+
+    async def check(self, sender_id: str, message: str, ip: Optional[str] = None) -> Tuple[int, float]:
+        """메시지 전송 가능 여부를 (결과, 대기 시간(초))로 반환하는 메서드"""
+        now = time.time()
+        if self._script is None:
+            self._script = redis_manager.redis.register_script(CHECK_SCRIPT)
+        keys = [f"ratelimit:{sender_id}", f"ban:{sender_id}"]
+        if ip and config.IP_RATE_LIMIT_CAPACITY > 0:
+            keys.append(f"ratelimit:ip:{ip}")
+        try:
+            result, wait_ms = await self._script(keys=keys, args=[
+                now * 1000, config.RATE_LIMIT_CAPACITY, config.RATE_LIMIT_REFILL, content_hash(message),
+                config.SPAM_THRESHOLD, int(config.SPAM_WINDOW * 1000), config.BAN_DURATION * 1000,
+                config.IP_RATE_LIMIT_CAPACITY, config.IP_RATE_LIMIT_REFILL
+            ])
+        except RedisError:
+            return await self._fallback.check(sender_id, message, ip)
+        return int(result), int(wait_ms) / 1000
+
+    def prune(self):
+        """Redis 장애 중에 쌓인 프로세스 내 상태를 정리하는 메서드"""
+        self._fallback.prune()
+
+# 설정에 따라 제한기 인스턴스 생성
+rate_limiter = LocalRateLimiter() if config.RATE_LIMITER_BACKEND == "local" else RedisRateLimiter()
@@ -1,47 +1,226 @@
 import redis.asyncio as redis
+import asyncio
 import json
 import time
-from typing import List, Dict
+import uuid
+from typing import List, Dict, Optional, Tuple
+from redis.exceptions import ResponseError
+from metrics import redis_command_seconds
+import config
+
+def room_messages_key(room: str) -> str:
+    """채팅방의 최근 메시지 리스트 키를 반환하는 함수 (기본 채팅방은 기존 all_messages 키 사용)"""
+    if room == config.DEFAULT_ROOM:
+        return "all_messages"
+    return f"room:{room}:messages"
+
+def room_seq_key(room: str) -> str:
+    """채팅방의 메시지 순번 카운터 키를 반환하는 함수"""
+    return f"seq:{room}"
+
+# 클라이언트가 마지막으로 받은 순번 이후의 메시지를 한 번의 왕복으로 원자적으로 가져오는 스크립트
+# KEYS[1] = 순번 카운터, KEYS[2] = 채팅방 최근 메시지 리스트
+# ARGV[1] = 마지막으로 받은 순번 (빈 문자열이면 현재 순번만 반환), ARGV[2] = 재전송할 최대 메시지 수
+# 반환값 = {현재 순번} | {현재 순번, -1(재전송 불가)} | {현재 순번, 메시지 리스트(최신순)}
+MESSAGES_SINCE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if ARGV[1] == '' then
+    return {current}
+end
+local gap = current - tonumber(ARGV[1])
+if gap <= 0 then
+    return {current, {}}
+end
+if gap > tonumber(ARGV[2]) then
+    return {current, -1}
+end
+return {current, redis.call('LRANGE', KEYS[2], 0, gap - 1)}
+"""
+
+# 메시지 묶음에 채팅방별 순번을 부여하고 최근 메시지 리스트와 아웃박스에 저장하는 스크립트
+# 순번 할당과 저장을 한 번의 왕복에 원자적으로 수행하므로 여러 워커가 동시에 써도 리스트 순서가 순번 순서와 같다
+# KEYS[1] = 아웃박스 스트림, KEYS[2..R+1] = 채팅방별 순번 카운터, KEYS[R+2..2R+1] = 채팅방별 최근 메시지 리스트,
+# KEYS[2R+2..] = 사용자별 최근 메시지 리스트
+# ARGV[1] = 채팅방 수(R), ARGV[2] = 사용자 수, ARGV[3] = 아웃박스 최대 길이 (대략, 0이면 제한 없음),
+# 이후 메시지마다 (채팅방 번호, 사용자 번호, seq를 뺀 JSON 페이로드)
+# 반환값 = 메시지별로 부여한 순번 리스트
+ADD_MESSAGES_SCRIPT = """
+local rooms = tonumber(ARGV[1])
+local users = tonumber(ARGV[2])
+local outbox_max_len = tonumber(ARGV[3])
+local counts = {}
+for i = 4, #ARGV, 3 do
+    local room = tonumber(ARGV[i])
+    counts[room] = (counts[room] or 0) + 1
+end
+local next_seq = {}
+for room, count in pairs(counts) do
+    next_seq[room] = redis.call('INCRBY', KEYS[1 + room], count) - count + 1
+end
+local seqs = {}
+for i = 4, #ARGV, 3 do
+    local room = tonumber(ARGV[i])
+    local seq = next_seq[room]
+    next_seq[room] = seq + 1
+    local payload = '{"seq": ' .. seq .. ', ' .. string.sub(ARGV[i + 2], 2)
+    redis.call('LPUSH', KEYS[1 + rooms + room], payload)
+    redis.call('LPUSH', KEYS[1 + 2 * rooms + tonumber(ARGV[i + 1])], payload)
+    if outbox_max_len > 0 then
+        redis.call('XADD', KEYS[1], 'MAXLEN', '~', outbox_max_len, '*', 'payload', payload)
+    else
+        redis.call('XADD', KEYS[1], '*', 'payload', payload)
+    end
+    seqs[#seqs + 1] = seq
+end
+for room = 1, rooms do
+    redis.call('LTRIM', KEYS[1 + rooms + room], 0, 1999)
+end
+for user = 1, users do
+    redis.call('LTRIM', KEYS[1 + 2 * rooms + user], 0, 199)
+end
+return seqs
+"""
 
 class RedisManager:
     def __init__(self):
         self.redis = None
+        # 묶어서 보낼 메시지 쓰기 대기열과 이를 처리하는 태스크
+        self._write_queue: List = []
+        self._write_task = None
+        self.write_batch_size = 500
+        self._messages_since = None
+        self._add_messages = None
 
     async def connect(self):
         """Redis 서버에 연결하는 메서드"""
-        # localhost의 Redis 서버에 비동기적으로 연결
-        self.redis = await redis.from_url("redis://localhost")
+        # 설정된 Redis 서버에 비동기적으로 연결
+        self.redis = await redis.from_url(config.REDIS_URL)
 
     async def disconnect(self):
         """Redis 연결을 종료하는 메서드"""
         if self.redis is not None:
             await self.redis.close()
 
-    async def add_message(self, sender_id: str, message: str, username: str, nickname: str):
+    async def add_message(self, sender_id: str, message: str, username: str, nickname: str,
+                          room: str = config.DEFAULT_ROOM):
         """새 메시지를 Redis에 추가하는 메서드"""
-        # 메시지 데이터 구성
-        message_data = {
-            "content": message,
-            "sender_id": sender_id,
-            "username": username,
-            "nickname": nickname,
-            "timestamp": time.time()
-        }
-        # 사용자별 메시지 저장 (최근 200개)
-        await self.redis.lpush(f"user:{sender_id}:messages", json.dumps(message_data))
-        await self.redis.ltrim(f"user:{sender_id}:messages", 0, 199)
-        
-        # 전체 메시지 저장 (최근 2000개)
-        await self.redis.lpush("all_messages", json.dumps(message_data))
-        await self.redis.ltrim("all_messages", 0, 1999)
-
-    async def get_recent_messages(self, limit: int = 50) -> List[Dict]:
+        await self.add_messages([(sender_id, message, username, nickname, room)])
+
+    async def add_messages(self, messages: List[Tuple]) -> List[Dict]:
+        """여러 메시지를 하나의 스크립트 호출(한 번의 왕복)로 Redis에 추가하는 메서드
+
+        messages는 (sender_id, message, username, nickname, room) 튜플의 리스트이며 오래된 순서로 전달한다.
+        로컬 WAL에서 재전송하는 메시지는 원래의 (timestamp, message_id)를 튜플 끝에 덧붙여 전달한다.
+        각 메시지에는 채팅방별로 단조 증가하는 순번(seq)을 부여하며, 저장된 메시지 딕셔너리 리스트를 반환한다.
+        """
+        if not messages:
+            return []
+        if self._add_messages is None:
+            self._add_messages = self.redis.register_script(ADD_MESSAGES_SCRIPT)
+        # 채팅방과 사용자에 번호를 매겨 키 목록에서의 위치로 사용 (Lua 인덱스는 1부터)
+        rooms: Dict[str, int] = {}
+        users: Dict[str, int] = {}
+        args = []
+        stored = []
+        for sender_id, message, username, nickname, room, *original in messages:
+            timestamp, message_id = original if original else (time.time(), uuid.uuid4().hex)
+            data = {
+                "message_id": message_id,
+                "room": room,
+                "content": message,
+                "sender_id": sender_id,
+                "username": username,
+                "nickname": nickname,
+                "timestamp": timestamp
+            }
+            stored.append(data)
+            # JSON 직렬화는 메시지마다 한 번만 수행하고 순번은 스크립트가 페이로드 앞에 붙임
+            args.extend((rooms.setdefault(room, len(rooms) + 1), users.setdefault(sender_id, len(users) + 1),
+                         json.dumps(data)))
+        keys = [config.OUTBOX_STREAM]
+        keys.extend(room_seq_key(room) for room in rooms)
+        keys.extend(room_messages_key(room) for room in rooms)
+        keys.extend(f"user:{sender_id}:messages" for sender_id in users)
+
+        with redis_command_seconds.labels("add_messages").time():
+            seqs = await self._add_messages(keys=keys, args=[len(rooms), len(users), config.OUTBOX_MAX_LEN] + args)
+        for data, seq in zip(stored, seqs):
+            data["seq"] = int(seq)
+        return stored
+
+    async def enqueue_message(self, sender_id: str, message: str, username: str, nickname: str,
+                              room: str = config.DEFAULT_ROOM, timestamp: Optional[float] = None,
+                              message_id: Optional[str] = None) -> Dict:
+        """메시지 쓰기를 큐에 넣고 저장될 때까지 기다린 뒤 저장된 메시지를 반환하는 메서드
+
+        동시에 들어온 쓰기는 add_messages 한 번으로 모아서 보내므로
+        버스트 상황에서도 Redis 왕복 횟수가 메시지 수에 비례해 늘어나지 않는다.
+        timestamp와 message_id를 주면 새로 만들지 않고 그 값으로 저장한다.
+        """
+        entry = (sender_id, message, username, nickname, room)
+        if message_id is not None:
+            entry += (timestamp, message_id)
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.append((entry, future))
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._flush_writes())
+        return await future
+
+    async def _flush_writes(self):
+        """큐에 쌓인 메시지 쓰기를 묶어서 Redis에 보내는 태스크"""
+        while self._write_queue:
+            batch = self._write_queue[:self.write_batch_size]
+            del self._write_queue[:self.write_batch_size]
+            try:
+                stored = await self.add_messages([entry for entry, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), data in zip(batch, stored):
+                    if not future.done():
+                        future.set_result(data)
+
+    async def get_recent_messages(self, limit: int = 50, room: str = config.DEFAULT_ROOM) -> List[Dict]:
         """최근 메시지를 가져오는 메서드"""
-        # 'all_messages' 리스트에서 지정된 개수만큼의 최근 메시지를 가져옴
-        messages = await self.redis.lrange("all_messages", 0, limit - 1)
+        # 채팅방 메시지 리스트에서 지정된 개수만큼의 최근 메시지를 가져옴
+        with redis_command_seconds.labels("get_recent_messages").time():
+            messages = await self.redis.lrange(room_messages_key(room), 0, limit - 1)
         # JSON 문자열을 파이썬 딕셔너리로 변환하여 반환
         return [json.loads(msg) for msg in messages]
 
+    async def get_recent_messages_raw(self, limit: int = 50, room: str = config.DEFAULT_ROOM) -> List[bytes]:
+        """최근 메시지를 JSON 문자열(바이트) 그대로 가져오는 메서드"""
+        with redis_command_seconds.labels("get_recent_messages").time():
+            return await self.redis.lrange(room_messages_key(room), 0, limit - 1)
+
+    async def get_messages_since(self, room: str, last_seq: Optional[int], max_gap: int) -> Tuple[int, Optional[List[Dict]]]:
+        """채팅방의 현재 순번과 last_seq 이후의 메시지(오래된 순서)를 반환하는 메서드
+
+        last_seq가 None이면 메시지 없이 현재 순번만 반환하고, 놓친 메시지가 max_gap개를 넘거나
+        최근 메시지 리스트에 남아 있지 않으면 메시지 대신 None을 반환한다 (클라이언트 전체 재조회 필요).
+        """
+        if self._messages_since is None:
+            self._messages_since = self.redis.register_script(MESSAGES_SINCE_SCRIPT)
+        with redis_command_seconds.labels("messages_since").time():
+            result = await self._messages_since(
+                keys=[room_seq_key(room), room_messages_key(room)],
+                args=["" if last_seq is None else last_seq, max_gap]
+            )
+        current = int(result[0])
+        if last_seq is None:
+            return current, []
+        if last_seq > current or result[1] == -1:
+            # 클라이언트가 서버보다 앞서 있으면 순번이 초기화된 것이므로 전체 재조회
+            return current, None
+        messages = [json.loads(raw) for raw in reversed(result[1])]
+        messages = [m for m in messages if m.get("seq", 0) > last_seq]
+        if current > last_seq and (not messages or messages[0]["seq"] != last_seq + 1):
+            # 가장 오래된 놓친 메시지가 리스트에 없음 (순번 도입 전 메시지이거나 잘려 나감)
+            return current, None
+        return current, messages
+
     async def get_user_messages(self, sender_id: str, limit: int = 50) -> List[Dict]:
         """특정 사용자의 최근 메시지를 가져오는 메서드"""
         # 특정 사용자의 메시지 리스트에서 지정된 개수만큼의 최근 메시지를 가져옴
@@ -49,26 +228,101 @@ class RedisManager:
         # JSON 문자열을 파이썬 딕셔너리로 변환하여 반환
         return [json.loads(msg) for msg in messages]
 
-    async def add_active_connection(self, sender_id: str):
-        """활성 연결을 추가하는 메서드"""
-        # 'active_connections' 집합에 사용자 ID를 추가
-        await self.redis.sadd("active_connections", sender_id)
-
-    async def remove_active_connection(self, sender_id: str):
-        """활성 연결을 제거하는 메서드"""
-        # 'active_connections' 집합에서 사용자 ID를 제거
-        await self.redis.srem("active_connections", sender_id)
-
-    async def get_active_connections_count(self) -> int:
-        """활성 연결 수를 가져오는 메서드"""
-        # 'active_connections' 집합의 크기(활성 연결 수)를 반환
-        return await self.redis.scard("active_connections")
-
-    async def clear_synced_messages(self, count: int):
-        """동기화된 메시지를 Redis에서 제거하는 메서드"""
-        # 'all_messages' 리스트에서 지정된 개수만큼의 메시지를 제거
-        # 이는 PostgreSQL로 동기화된 후 Redis에서 해당 메시지들을 삭제하는 용도로 사용됨
-        await self.redis.ltrim("all_messages", count, -1)
+    async def get_messages_before(self, key: str, before: Optional[Tuple[float, str]], limit: int,
+                                  room: str = None) -> Tuple[List[Dict], bool]:
+        """최신순 메시지 리스트에서 커서(timestamp, message_id)보다 오래된 메시지를 가져오는 메서드
+
+        (메시지 목록, 리스트 끝까지 읽었는지 여부)를 반환한다.
+        리스트는 최근 2000개로 제한되므로 한 번에 페이지 크기의 몇 배씩 나눠 읽는다.
+        room을 지정하면 여러 채팅방이 섞인 리스트(사용자별 리스트)에서 해당 채팅방 메시지만 고른다.
+        """
+        page = []
+        start = 0
+        chunk = max(limit * 2, 100)
+        while True:
+            raw_messages = await self.redis.lrange(key, start, start + chunk - 1)
+            for raw in raw_messages:
+                message = json.loads(raw)
+                if room is not None and message.get("room", config.DEFAULT_ROOM) != room:
+                    continue
+                if before is None or (message["timestamp"], message.get("message_id", "")) < before:
+                    page.append(message)
+                    if len(page) >= limit:
+                        return page, False
+            if len(raw_messages) < chunk:
+                return page, True
+            start += chunk
+
+    async def ensure_outbox_group(self):
+        """아웃박스 스트림과 컨슈머 그룹을 생성하는 메서드 (이미 있으면 무시)"""
+        try:
+            await self.redis.xgroup_create(config.OUTBOX_STREAM, config.OUTBOX_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read_outbox(self, consumer: str, start_id: str, count: int, block_ms: int) -> List[Tuple[str, Dict]]:
+        """컨슈머 그룹으로 아웃박스 메시지를 읽는 메서드
+
+        start_id가 ">"이면 새 메시지를 block_ms 동안 기다리고,
+        "0"이면 이 컨슈머에 전달됐지만 아직 확인되지 않은 메시지를 다시 읽는다.
+        """
+        result = await self.redis.xreadgroup(
+            config.OUTBOX_GROUP, consumer, {config.OUTBOX_STREAM: start_id},
+            count=count, block=block_ms if start_id == ">" else None
+        )
+        if not result:
+            return []
+        return self._parse_outbox_entries(result[0][1])
+
+    async def claim_stale_outbox(self, consumer: str, min_idle_ms: int, count: int) -> List[Tuple[str, Dict]]:
+        """중단된 컨슈머가 확인하지 못한 메시지를 가져오는 메서드"""
+        with redis_command_seconds.labels("claim_outbox").time():
+            result = await self.redis.xautoclaim(
+                config.OUTBOX_STREAM, config.OUTBOX_GROUP, consumer, min_idle_ms, start_id="0-0", count=count
+            )
+        return self._parse_outbox_entries(result[1])
+
+    def _parse_outbox_entries(self, entries) -> List[Tuple[str, Dict]]:
+        """스트림 항목을 (항목 ID, 메시지 딕셔너리) 리스트로 변환하는 메서드"""
+        parsed = []
+        for entry_id, fields in entries:
+            if isinstance(entry_id, bytes):
+                entry_id = entry_id.decode("utf-8")
+            message = None
+            if fields and b"payload" in fields:
+                try:
+                    message = json.loads(fields[b"payload"])
+                except ValueError:
+                    # 손상된 항목은 None으로 표시해 확인 처리만 하도록 함
+                    message = None
+            parsed.append((entry_id, message))
+        return parsed
+
+    async def ack_outbox(self, entry_ids: List[str]):
+        """PostgreSQL에 커밋된 메시지를 확인 처리하고 스트림에서 삭제하는 메서드"""
+        if not entry_ids:
+            return
+        with redis_command_seconds.labels("ack_outbox").time():
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.xack(config.OUTBOX_STREAM, config.OUTBOX_GROUP, *entry_ids)
+                pipe.xdel(config.OUTBOX_STREAM, *entry_ids)
+                await pipe.execute()
+
+    async def get_outbox_lag(self) -> Tuple[float, int]:
+        """영속화 지연(가장 오래된 미확인 메시지의 나이, 초)과 대기 중인 메시지 수를 반환하는 메서드"""
+        # 확인된 항목은 즉시 삭제되므로 스트림에 남아 있는 항목이 곧 미영속화 메시지
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.xrange(config.OUTBOX_STREAM, count=1)
+            pipe.xlen(config.OUTBOX_STREAM)
+            oldest, backlog = await pipe.execute()
+        if not oldest:
+            return 0.0, backlog
+        oldest_id = oldest[0][0]
+        if isinstance(oldest_id, bytes):
+            oldest_id = oldest_id.decode("utf-8")
+        oldest_ms = int(oldest_id.split("-")[0])
+        return max(0.0, time.time() - oldest_ms / 1000), backlog
 
 # RedisManager 인스턴스 생성
 redis_manager = RedisManager()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+from typing import Dict, Tuple
+from redis_manager import redis_manager
+
+class RecentMessagesCache:
+    """/recent_messages 응답 본문(바이트)과 ETag를 (채팅방, limit)별로 캐시하는 클래스
+
+    Redis에 저장된 메시지는 이미 JSON 문자열이므로 디코딩/재인코딩 없이 이어 붙여 본문을 만든다.
+    채팅방에 새 메시지가 전달될 때마다 그 채팅방의 세대(generation)를 올려 캐시를 무효화하며,
+    같은 키에 대한 동시 요청은 하나의 Redis 조회를 공유한다.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        # 채팅방 -> 세대
+        self._generations: Dict[str, int] = {}
+        # (채팅방, limit) -> (세대, 응답 본문, ETag)
+        self._entries: Dict[Tuple[str, int], Tuple[int, bytes, str]] = {}
+        # (채팅방, limit) -> 진행 중인 조회
+        self._pending: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    def invalidate(self, room: str):
+        """채팅방에 새 메시지가 추가되었을 때 캐시를 무효화하는 메서드"""
+        self._generations[room] = self._generations.get(room, 0) + 1
+
+    async def get(self, room: str, limit: int) -> Tuple[bytes, str]:
+        """채팅방과 limit에 해당하는 (응답 본문, ETag)를 반환하는 메서드"""
+        key = (room, limit)
+        generation = self._generations.get(room, 0)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == generation:
+            return entry[1], entry[2]
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            raw_messages = await redis_manager.get_recent_messages_raw(limit, room)
+            body = b'{"messages":[' + b','.join(raw_messages) + b']}'
+            etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            # 조회 중에 새 메시지가 들어왔으면 결과를 캐시하지 않음
+            if generation == self._generations.get(room, 0):
+                self._entries.pop(key, None)
+                if len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[key] = (generation, body, etag)
+            future.set_result((body, etag))
+            return body, etag
+        except Exception as e:
+            future.set_exception(e)
+            # 대기 중인 요청이 없으면 예외가 처리되지 않았다는 경고가 나지 않도록 함
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+# RecentMessagesCache 인스턴스 생성
+recent_messages_cache = RecentMessagesCache()
@@ -0,0 +1,135 @@
+import asyncio
+import ipaddress
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from postgresql_manager import postgres_manager
+from metrics import session_audit_pending, session_audit_dropped
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# IP를 알 수 없는 연결에 기록하는 주소 (ip_address 컬럼은 NOT NULL)
+UNKNOWN_IP = ipaddress.ip_address("0.0.0.0")
+
+def _parse_ip(ip: Optional[str]):
+    try:
+        return ipaddress.ip_address(ip)
+    except ValueError:
+        return UNKNOWN_IP
+
+class SessionAuditWriter:
+    """웹소켓 접속/종료 기록을 버퍼에 모았다가 user_sessions 테이블에 일괄 저장하는 클래스
+
+    connect/disconnect에서는 메모리 버퍼에 추가만 하므로 핸드셰이크가 PostgreSQL을 기다리지 않는다.
+    기록이 batch_size만큼 쌓이거나 flush_interval이 지나면 한 트랜잭션으로 저장하고,
+    저장에 실패한 기록은 버퍼에 되돌려 다음 주기에 다시 시도한다 (버퍼 크기는 max_buffer로 제한).
+    """
+
+    def __init__(self, enabled: bool, batch_size: int, flush_interval: float, max_buffer: int):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        # (login_time, id, user_id, ip_address) 튜플
+        self._logins: List[Tuple] = []
+        # (id, login_time, logout_time) 튜플
+        self._logouts: List[Tuple] = []
+        self._batch_ready = asyncio.Event()
+        # 진행 중인 저장 (태스크가 취소되어도 끝까지 실행하고 종료 시 기다림)
+        self._saving: Optional[asyncio.Future] = None
+        session_audit_pending.set_function(lambda: len(self))
+
+    def __len__(self) -> int:
+        return len(self._logins) + len(self._logouts)
+
+    def _append(self, records: List[Tuple], record: Tuple) -> bool:
+        if len(self) >= self.max_buffer:
+            session_audit_dropped.inc()
+            return False
+        records.append(record)
+        if len(self) >= self.batch_size:
+            self._batch_ready.set()
+        return True
+
+    def login(self, connection) -> Optional[uuid.UUID]:
+        """연결의 접속 기록을 버퍼에 추가하고 세션 ID를 반환하는 메서드 (버리면 None)"""
+        if not self.enabled:
+            return None
+        try:
+            user_id = uuid.UUID(connection.sender_id)
+        except ValueError:
+            return None
+        session_id = uuid.uuid4()
+        login_time = datetime.fromtimestamp(connection.connected_at, timezone.utc)
+        if not self._append(self._logins, (login_time, session_id, user_id, _parse_ip(connection.ip))):
+            return None
+        return session_id
+
+    def logout(self, connection):
+        """연결의 종료 시각을 버퍼에 추가하는 메서드"""
+        if connection.session_id is None:
+            return
+        login_time = datetime.fromtimestamp(connection.connected_at, timezone.utc)
+        self._append(self._logouts, (connection.session_id, login_time, datetime.now(timezone.utc)))
+
+    async def flush(self) -> bool:
+        """버퍼에 쌓인 기록을 저장하는 메서드 (실패하면 버퍼에 되돌림)"""
+        if self._saving is not None:
+            await asyncio.shield(self._saving)
+        if not len(self):
+            return True
+        logins, logouts = self._logins, self._logouts
+        self._logins, self._logouts = [], []
+        self._batch_ready.clear()
+        # 태스크가 취소되어도 이미 시작한 저장은 끝까지 실행
+        self._saving = asyncio.ensure_future(postgres_manager.save_user_sessions(logins, logouts))
+        try:
+            saved = await asyncio.shield(self._saving)
+        finally:
+            if self._saving.done():
+                self._saving = None
+        if not saved:
+            # 새로 들어온 기록 앞에 되돌리고 버퍼 한도를 넘는 만큼은 오래된 기록부터 버림
+            self._logins = logins + self._logins
+            self._logouts = logouts + self._logouts
+            overflow = len(self) - self.max_buffer
+            if overflow > 0:
+                session_audit_dropped.inc(overflow)
+                dropped_logins = min(overflow, len(self._logins))
+                del self._logins[:dropped_logins]
+                del self._logouts[:overflow - dropped_logins]
+        return saved
+
+    async def run(self):
+        """일정 주기나 묶음 크기마다 기록을 저장하는 태스크"""
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                if not await self.flush():
+                    await asyncio.sleep(self.flush_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in session audit writer: {e}")
+                await asyncio.sleep(self.flush_interval)
+
+    async def close(self):
+        """종료 시 진행 중인 저장을 기다리고 남은 기록을 저장하는 메서드"""
+        if not self.enabled:
+            return
+        if not await self.flush():
+            logger.warning(f"Discarding {len(self)} session audit records that could not be saved")
+
+# SessionAuditWriter 인스턴스 생성
+session_audit = SessionAuditWriter(
+    enabled=config.SESSION_AUDIT_ENABLED,
+    batch_size=config.SESSION_AUDIT_BATCH_SIZE,
+    flush_interval=config.SESSION_AUDIT_FLUSH_INTERVAL,
+    max_buffer=config.SESSION_AUDIT_MAX_BUFFER
+)
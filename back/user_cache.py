@@ -0,0 +1,111 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from redis_manager import redis_manager
+from postgresql_manager import postgres_manager
+from metrics import user_cache_lookups, user_cache_size
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 조회 결과별 카운터 (수집 전에도 세 결과가 모두 0으로 노출됨)
+_hit_lookups = user_cache_lookups.labels("hit")
+_redis_hit_lookups = user_cache_lookups.labels("redis_hit")
+_miss_lookups = user_cache_lookups.labels("miss")
+
+class UserCache:
+    """사용자 ID → 사용자 정보(username, nickname)를 캐시하는 TTL/LRU 캐시
+
+    프로세스 내 캐시에 없으면 워커 간에 공유하는 Redis 해시(user_profile:{id})를 확인하고,
+    그래도 없을 때만 PostgreSQL을 조회한다.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, use_redis: bool, redis_ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.redis_ttl = redis_ttl
+        # 사용자 ID -> (만료 시각, 사용자 정보), 가장 최근에 사용한 항목이 끝에 위치
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # 적중/실패 카운터
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        """캐시를 거쳐 사용자 정보를 가져오는 메서드"""
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                _hit_lookups.inc()
+                return entry[1]
+            del self._entries[user_id]
+
+        if self.use_redis:
+            user = await self._get_from_redis(user_id)
+            if user is not None:
+                self.redis_hits += 1
+                _redis_hit_lookups.inc()
+                self._store(user_id, user, now)
+                return user
+
+        self.misses += 1
+        _miss_lookups.inc()
+        user = await postgres_manager.get_user_by_id(user_id)
+        if user is not None:
+            self._store(user_id, user, now)
+            if self.use_redis:
+                await self._set_in_redis(user_id, user)
+        return user
+
+    async def invalidate(self, user_id: str):
+        """사용자 등록/변경 시 캐시 항목을 무효화하는 메서드"""
+        self._entries.pop(user_id, None)
+        if self.use_redis:
+            try:
+                await redis_manager.redis.delete(f"user_profile:{user_id}")
+            except Exception as e:
+                logger.warning(f"Failed to invalidate cached user {user_id}: {e}")
+
+    def stats(self) -> Dict:
+        """캐시 적중/실패 카운터를 반환하는 메서드"""
+        return {"size": len(self._entries), "hits": self.hits, "redis_hits": self.redis_hits, "misses": self.misses}
+
+    def _store(self, user_id: str, user: Dict, now: float):
+        """프로세스 내 캐시에 저장하고 크기를 넘으면 가장 오래 사용하지 않은 항목을 제거하는 메서드"""
+        self._entries[user_id] = (now + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _get_from_redis(self, user_id: str) -> Optional[Dict]:
+        """Redis 해시에서 사용자 정보를 가져오는 메서드 (Redis 오류 시 None)"""
+        try:
+            username, nickname = await redis_manager.redis.hmget(f"user_profile:{user_id}", "username", "nickname")
+        except Exception as e:
+            logger.warning(f"Failed to read cached user {user_id} from Redis: {e}")
+            return None
+        if username is None or nickname is None:
+            return None
+        return {"id": user_id, "username": username.decode("utf-8"), "nickname": nickname.decode("utf-8")}
+
+    async def _set_in_redis(self, user_id: str, user: Dict):
+        """Redis 해시에 사용자 정보를 저장하는 메서드"""
+        try:
+            async with redis_manager.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(f"user_profile:{user_id}", mapping={"username": user["username"], "nickname": user["nickname"]})
+                pipe.expire(f"user_profile:{user_id}", self.redis_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to cache user {user_id} in Redis: {e}")
+
+# UserCache 인스턴스 생성
+user_cache = UserCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL, config.USER_CACHE_REDIS, config.USER_CACHE_REDIS_TTL)
+
+# 캐시 크기는 /metrics 수집 시점에 읽음
+user_cache_size.set_function(lambda: len(user_cache._entries))
@@ -0,0 +1,315 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from redis.exceptions import RedisError
+from redis_manager import redis_manager
+from response_cache import recent_messages_cache
+from metrics import wal_degraded, wal_bytes, wal_dropped_segments, wal_replayed
+import config
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 디스크 동기화 정책
+ALWAYS = "always"
+INTERVAL = "interval"
+NEVER = "never"
+
+SEGMENT_PATTERN = re.compile(r"^(\d{10})\.log$")
+LOCK_FILE = "owner.lock"
+# 워커 디렉터리 생성, 점유, 고아 세그먼트 인수를 워커 사이에서 직렬화하는 루트 잠금 파일
+ADOPT_LOCK_FILE = ".adopt.lock"
+
+# Redis 쓰기를 포기하고 로그에 기록할 오류 (연결 실패, 시간 초과 등)
+BACKEND_ERRORS = (RedisError, OSError, asyncio.TimeoutError)
+
+class WriteAheadLog:
+    """Redis에 쓰지 못한 채팅 메시지를 보관하는 세그먼트 단위 append-only 로그
+
+    Redis 쓰기가 실패하면 장애 모드로 전환해 이후 메시지를 모두 로그에만 기록하고
+    (순서를 지키기 위해 복구가 끝날 때까지 Redis 쓰기를 시도하지 않음),
+    Redis가 돌아오면 오래된 세그먼트부터 add_messages로 묶어서 재전송한 뒤 삭제한다.
+    Redis에 들어간 메시지는 아웃박스를 거쳐 PostgreSQL에도 저장된다.
+
+    세그먼트 동기화와 교체는 잠금으로 직렬화해 이벤트 루프 밖에서 수행하고, 재전송한 묶음의 위치는
+    세그먼트별 오프셋 파일에 기록해 도중에 실패해도 이미 보낸 메시지를 다시 보내지 않는다.
+
+    워커마다 자신의 하위 디렉터리를 잠금 파일로 점유하며, 시작할 때 잠금이 풀린
+    (종료된 워커의) 디렉터리의 세그먼트를 넘겨받아 함께 재전송한다.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int, max_bytes: int, fsync: str, fsync_interval: float):
+        if fsync not in (ALWAYS, INTERVAL, NEVER):
+            raise ValueError(f"Unknown WAL fsync policy: {fsync}")
+        self.root = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.directory: Optional[str] = None
+        # Redis 쓰기가 실패해 로그에 기록 중인지 여부
+        self.degraded = False
+        # 봉인된 세그먼트 (번호, 크기) 목록 (오래된 순서)
+        self._sealed: List[Tuple[int, int]] = []
+        self._file = None
+        self._seq = 0
+        self._size = 0
+        self._dirty = False
+        self._lock_fd = None
+        # 현재 세그먼트 파일과 세그먼트 목록을 바꾸는 작업(기록, 동기화, 교체, 삭제)을 직렬화하는 잠금
+        self._io_lock = asyncio.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _, size in self._sealed) + self._size
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:010d}.log")
+
+    def _offset_path(self, seq: int) -> str:
+        """세그먼트에서 재전송을 마친 레코드 수를 기록하는 파일 경로"""
+        return os.path.join(self.directory, f"{seq:010d}.offset")
+
+    def _remove_segment(self, seq: int):
+        os.remove(self._path(seq))
+        try:
+            os.remove(self._offset_path(seq))
+        except FileNotFoundError:
+            pass
+
+    def open(self):
+        """워커 디렉터리를 점유하고 남아 있는 세그먼트를 불러오는 메서드"""
+        os.makedirs(self.root, exist_ok=True)
+        self.directory = os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", config.NODE_ID))
+        # 동시에 시작한 워커가 아직 잠그지 않은 이 디렉터리를 고아로 보고 지우지 않도록
+        # 디렉터리 생성부터 고아 인수까지 루트 잠금을 잡고 수행
+        adopt_fd = os.open(os.path.join(self.root, ADOPT_LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(adopt_fd, fcntl.LOCK_EX)
+            os.makedirs(self.directory, exist_ok=True)
+            self._lock_fd = self._try_lock(self.directory)
+            if self._lock_fd is None:
+                raise RuntimeError(f"WAL directory {self.directory} is locked by another process")
+            for seq, _ in self._list_segments(self.directory):
+                self._seq = max(self._seq, seq)
+            self._sealed = self._list_segments(self.directory)
+            self._adopt_orphans()
+        finally:
+            os.close(adopt_fd)
+        self._open_segment()
+        if self._sealed:
+            logger.warning(f"Found {self.total_bytes} bytes of unreplayed WAL, entering degraded mode")
+            self._set_degraded(True)
+
+    def close(self):
+        """현재 세그먼트를 디스크에 기록하고 닫는 메서드"""
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+            if self._size == 0:
+                os.remove(self._path(self._seq))
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _try_lock(self, directory: str) -> Optional[int]:
+        """디렉터리의 잠금 파일을 비차단으로 잠그는 메서드 (이미 잠겨 있으면 None)"""
+        fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            os.close(fd)
+            return None
+
+    def _list_segments(self, directory: str) -> List[Tuple[int, int]]:
+        segments = []
+        for name in os.listdir(directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                segments.append((int(match.group(1)), os.path.getsize(os.path.join(directory, name))))
+        return sorted(segments)
+
+    def _adopt_orphans(self):
+        """종료된 워커가 남긴 세그먼트를 이 워커의 디렉터리로 옮기는 메서드"""
+        for name in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, name)
+            if directory == self.directory or not os.path.isdir(directory):
+                continue
+            fd = self._try_lock(directory)
+            if fd is None:
+                # 실행 중인 다른 워커의 디렉터리
+                continue
+            try:
+                segments = self._list_segments(directory)
+                if not segments:
+                    continue
+                for seq, size in segments:
+                    self._seq += 1
+                    offset_path = os.path.join(directory, f"{seq:010d}.offset")
+                    if os.path.exists(offset_path):
+                        os.rename(offset_path, self._offset_path(self._seq))
+                    os.rename(os.path.join(directory, f"{seq:010d}.log"), self._path(self._seq))
+                    self._sealed.append((self._seq, size))
+                    logger.info(f"Adopted WAL segment {seq} from {name}")
+                # 잠금을 잡은 채로 지워서 다른 워커가 그 사이에 점유하지 못하게 함
+                shutil.rmtree(directory, ignore_errors=True)
+            finally:
+                os.close(fd)
+
+    def _open_segment(self):
+        self._seq += 1
+        self._file = open(self._path(self._seq), "ab")
+        self._size = 0
+
+    def _rotate(self):
+        """현재 세그먼트를 봉인하고 새 세그먼트를 여는 메서드 (_io_lock을 잡고 스레드에서 호출)"""
+        self._sync()
+        self._file.close()
+        self._sealed.append((self._seq, self._size))
+        self._open_segment()
+        # 전체 크기 제한을 넘으면 가장 오래된 세그먼트부터 삭제 (메시지 유실)
+        while self._sealed and self.total_bytes > self.max_bytes:
+            seq, size = self._sealed.pop(0)
+            self._remove_segment(seq)
+            wal_dropped_segments.inc()
+            logger.error(f"WAL exceeded {self.max_bytes} bytes, dropped segment {seq} ({size} bytes)")
+
+    def _sync(self):
+        if self._dirty and self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    async def append(self, entries: List[Tuple]):
+        """메시지 (sender_id, message, username, nickname, room, timestamp, message_id)를 로그에 기록하는 메서드"""
+        data = b"".join(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n" for entry in entries)
+        async with self._io_lock:
+            self._file.write(data)
+            self._size += len(data)
+            self._dirty = True
+            if self.fsync == ALWAYS:
+                await asyncio.to_thread(self._sync)
+            elif self.fsync == NEVER:
+                # 프로세스가 죽어도 OS 버퍼에는 남도록 파이썬 버퍼만 비움
+                self._file.flush()
+                self._dirty = False
+            if self._size >= self.segment_bytes:
+                await asyncio.to_thread(self._rotate)
+
+    def _set_degraded(self, degraded: bool):
+        self.degraded = degraded
+        wal_degraded.set(1 if degraded else 0)
+
+    async def store(self, sender_id: str, message: str, username: str, nickname: str, room: str) -> Dict:
+        """메시지를 Redis에 저장하고, 실패하거나 장애 모드이면 로그에 기록하는 메서드
+
+        저장된 메시지 딕셔너리를 반환한다. 로그에 기록한 메시지에는 순번(seq)이 없으며
+        재전송할 때 부여된다.
+        """
+        # Redis 쓰기가 시간 초과 등으로 실패해도 실제로는 저장되었을 수 있으므로, 로그에도 같은 ID와 시각을
+        # 기록해 재전송된 메시지를 PostgreSQL에서 중복으로 걸러낼 수 있게 함
+        timestamp, message_id = time.time(), uuid.uuid4().hex
+        if not self.degraded:
+            try:
+                return await redis_manager.enqueue_message(sender_id, message, username, nickname, room,
+                                                           timestamp, message_id)
+            except BACKEND_ERRORS as e:
+                logger.error(f"Redis write failed, switching to local WAL: {e}")
+                self._set_degraded(True)
+        await self.append([(sender_id, message, username, nickname, room, timestamp, message_id)])
+        return {"message_id": message_id, "room": room, "seq": None, "timestamp": timestamp}
+
+    def _read_segment(self, seq: int) -> Tuple[List[Tuple], int]:
+        """세그먼트의 레코드와 이미 재전송한 레코드 수를 반환하는 메서드"""
+        entries = []
+        with open(self._path(seq), "rb") as f:
+            for line in f:
+                try:
+                    entries.append(tuple(json.loads(line)))
+                except ValueError:
+                    # 기록 도중 중단된 마지막 줄은 버림
+                    logger.warning(f"Skipping torn WAL record in segment {seq}")
+        try:
+            with open(self._offset_path(seq)) as f:
+                offset = int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            offset = 0
+        return entries, offset
+
+    def _write_offset(self, seq: int, offset: int):
+        """세그먼트에서 재전송을 마친 레코드 수를 원자적으로 기록하는 메서드"""
+        path = self._offset_path(seq)
+        with open(path + ".tmp", "w") as f:
+            f.write(str(offset))
+        os.replace(path + ".tmp", path)
+
+    async def replay(self, batch_size: int) -> int:
+        """봉인된 세그먼트를 오래된 순서로 Redis에 재전송하고 삭제하는 메서드
+
+        묶음마다 재전송한 위치를 기록하므로, 중간에 실패하면 다음 시도는 마지막으로 성공한 묶음 다음부터 이어서 보낸다.
+        """
+        replayed = 0
+        while True:
+            async with self._io_lock:
+                if not self._sealed:
+                    if self._size == 0:
+                        return replayed
+                    # 현재 세그먼트도 봉인해서 재전송 대상으로 만듦
+                    await asyncio.to_thread(self._rotate)
+                    continue
+                seq, _ = self._sealed[0]
+                entries, offset = await asyncio.to_thread(self._read_segment, seq)
+            for i in range(offset, len(entries), batch_size):
+                batch = entries[i:i + batch_size]
+                await redis_manager.add_messages(batch)
+                # 재전송한 메시지가 최근 메시지 응답에 포함되도록 해당 채팅방의 캐시 무효화
+                for room in {entry[4] for entry in batch}:
+                    recent_messages_cache.invalidate(room)
+                replayed += len(batch)
+                wal_replayed.inc(len(batch))
+                await asyncio.to_thread(self._write_offset, seq, i + len(batch))
+            async with self._io_lock:
+                # 재전송하는 동안 크기 제한으로 이미 삭제되었을 수 있음
+                if self._sealed and self._sealed[0][0] == seq:
+                    self._sealed.pop(0)
+                    await asyncio.to_thread(self._remove_segment, seq)
+                elif os.path.exists(self._offset_path(seq)):
+                    os.remove(self._offset_path(seq))
+
+    async def run(self):
+        """주기적으로 로그를 디스크에 동기화하고, 장애 모드이면 Redis 복구 후 재전송하는 태스크"""
+        last_recovery = 0.0
+        while True:
+            try:
+                await asyncio.sleep(self.fsync_interval)
+                if self.fsync == INTERVAL:
+                    async with self._io_lock:
+                        await asyncio.to_thread(self._sync)
+                now = time.monotonic()
+                if self.degraded and now - last_recovery >= config.WAL_RECOVERY_INTERVAL:
+                    last_recovery = now
+                    await redis_manager.redis.ping()
+                    replayed = await self.replay(config.WAL_REPLAY_BATCH)
+                    # 재전송 중 새로 기록된 메시지가 없을 때만 정상 모드로 복귀
+                    if not self._sealed and self._size == 0:
+                        self._set_degraded(False)
+                        logger.info(f"Redis recovered, replayed {replayed} messages from WAL")
+            except asyncio.CancelledError:
+                raise
+            except BACKEND_ERRORS as e:
+                logger.warning(f"Redis still unavailable, keeping WAL: {e}")
+            except Exception as e:
+                logger.error(f"Error in WAL maintenance: {e}", exc_info=True)
+
+# WriteAheadLog 인스턴스 생성
+wal = WriteAheadLog(config.WAL_DIR, config.WAL_SEGMENT_BYTES, config.WAL_MAX_BYTES, config.WAL_FSYNC, config.WAL_FSYNC_INTERVAL)
+wal_bytes.set_function(lambda: wal.total_bytes)
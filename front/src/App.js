@@ -2,6 +2,7 @@ import React, { useState, useEffect, useCallback } from 'react';
 import ChatPage from './pages/ChatPage';
 import AuthModal from './components/AuthModal';
 import { useWebSocket } from './hooks/useWebSocket';
+import { decodeFrames } from './protocol';
 import './styles/base.css';
 import './styles/components.css';
 import './styles/utilities.css';
@@ -21,9 +22,10 @@ function App() {
   useEffect(() => {
     if (socket) {
       const handleMessage = (event) => {
-        const data = JSON.parse(event.data);
-        if (data.type === 'user_count') {
-          setUserCount(data.count);
+        for (const data of decodeFrames(event)) {
+          if (data.type === 'user_count') {
+            setUserCount(data.count);
+          }
         }
       };
 
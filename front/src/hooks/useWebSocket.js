@@ -1,5 +1,6 @@
 import { useState, useEffect, useCallback, useRef } from 'react';
 import { URLS } from '../urls';
+import { WS_QUERY, DEFAULT_ROOM, decodeFrames, retryDelay } from '../protocol';
 
 export function useWebSocket(user) {
   const [socket, setSocket] = useState(null);
@@ -9,11 +10,16 @@ export function useWebSocket(user) {
 
   const reconnectAttempt = useRef(0);
   const timeoutId = useRef(null);
+  // 기본 채팅방에서 마지막으로 받은 메시지 순번 (재연결 시 놓친 메시지만 다시 받는 데 사용)
+  const lastSeq = useRef(null);
 
   const setupWebSocket = useCallback(() => {
     if (!user) return;
 
-    const newSocket = new WebSocket(`${URLS.WS_URL}/${user.userId}`);
+    const resumeQuery = lastSeq.current === null ? '' : `&last_seq=${lastSeq.current}`;
+    const newSocket = new WebSocket(`${URLS.WS_URL}/${user.userId}${WS_QUERY}${resumeQuery}`);
+    // 프로토콜 2의 바이너리 프레임을 decodeFrames로 처리할 수 있도록 ArrayBuffer로 수신
+    newSocket.binaryType = 'arraybuffer';
 
     newSocket.onopen = () => {
       console.log('WebSocket Connected');
@@ -22,27 +28,41 @@ export function useWebSocket(user) {
     };
 
     newSocket.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      if (data.type === 'user_count') {
-        setUserCount(data.count);
-      } else if (data.type === 'session_expired') {
-        setShowSessionExpiredModal(true);
-      } else if (data.type === 'chat_banned') {
-        setChatBanTimeLeft(data.time_left);
+      for (const data of decodeFrames(event)) {
+        if (data.seq !== undefined && (data.room ?? DEFAULT_ROOM) === DEFAULT_ROOM) {
+          // chat 프레임과 연결 시 받는 seq/resync 프레임 모두 최신 순번을 담고 있음
+          lastSeq.current = Math.max(lastSeq.current ?? 0, data.seq);
+          if (data.type === 'resync') lastSeq.current = data.seq;
+        }
+        if (data.type === 'ping') {
+          // 서버의 생존 확인 요청에 받은 시각을 그대로 담아 응답 (RTT 측정용)
+          newSocket.send(JSON.stringify({ type: 'pong', t: data.t }));
+        } else if (data.type === 'user_count') {
+          setUserCount(data.count);
+        } else if (data.type === 'session_expired') {
+          setShowSessionExpiredModal(true);
+        } else if (data.type === 'chat_banned') {
+          setChatBanTimeLeft(data.time_left);
+        } else if (data.type === 'rate_limited') {
+          setChatBanTimeLeft(Math.ceil(data.retry_after));
+        }
       }
     };
 
     newSocket.onclose = (event) => {
       if (event.code !== 1000) {
         console.log('WebSocket Disconnected');
+        // 서버가 과부하나 재시작으로 재연결 시점을 지정했으면 그대로 따름
+        const serverDelay = retryDelay(event);
         const timeout = Math.min(1000 * (2 ** reconnectAttempt.current), 30000);
         const jitter = Math.random() * 1000;
-        console.log(`Attempting to reconnect in ${timeout + jitter}ms...`);
+        const delay = serverDelay ?? timeout + jitter;
+        console.log(`Attempting to reconnect in ${delay}ms...`);
         
         timeoutId.current = setTimeout(() => {
           reconnectAttempt.current++;
           setupWebSocket();
-        }, timeout + jitter);
+        }, delay);
       }
     };
 
@@ -53,6 +73,7 @@ export function useWebSocket(user) {
 
   useEffect(() => {
     if (user) {
+      lastSeq.current = null;
       setupWebSocket();
     }
     return () => {
@@ -77,9 +98,12 @@ export function useWebSocket(user) {
   useEffect(() => {
     if (socket) {
       const handleMessage = (event) => {
-        const data = JSON.parse(event.data);
-        if (data.type === 'chat_banned') {
-          setChatBanTimeLeft(data.time_left);
+        for (const data of decodeFrames(event)) {
+          if (data.type === 'chat_banned') {
+            setChatBanTimeLeft(data.time_left);
+          } else if (data.type === 'rate_limited') {
+            setChatBanTimeLeft(Math.ceil(data.retry_after));
+          }
         }
       };
 
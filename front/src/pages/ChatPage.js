@@ -1,6 +1,27 @@
 import React, { useState, useEffect, useCallback } from 'react';
+import axios from 'axios';
 import ChatMessages from '../components/ChatMessages';
 import ChatInput from '../components/ChatInput';
+import { DEFAULT_ROOM, decodeFrames } from '../protocol';
+import { URLS } from '../urls';
+
+// 서버에 저장된 메시지(/recent_messages, 최신순)를 채팅 프레임 형식으로 변환
+const toChatFrames = (stored) => stored.slice().reverse().map(msg => ({
+  type: 'chat',
+  room: msg.room,
+  message: msg.content,
+  sender_id: msg.sender_id,
+  username: msg.username,
+  nickname: msg.nickname,
+  timestamp: Math.floor(msg.timestamp * 1000),
+  message_id: msg.message_id,
+  seq: msg.seq
+}));
+
+// 같은 메시지인지 비교 (재전송된 메시지는 message_id로, 이전 형식은 시각과 발신자로 비교)
+const isSameMessage = (a, b) => (a.message_id && b.message_id
+  ? a.message_id === b.message_id
+  : a.timestamp === b.timestamp && a.sender_id === b.sender_id);
 
 function ChatPage({ socket, user, chatBanTimeLeft, sendMessage }) {
   // 채팅 메시지를 저장하는 상태
@@ -26,22 +47,31 @@ function ChatPage({ socket, user, chatBanTimeLeft, sendMessage }) {
     if (!socket) return;
 
     const handleMessage = (event) => {
-      const data = JSON.parse(event.data);
-            
+      const decoded = decodeFrames(event);
+      // 놓친 메시지가 너무 많아 재전송할 수 없으면 최근 메시지 전체를 다시 불러옴
+      if (decoded.some(data => data.type === 'resync' && data.room === DEFAULT_ROOM)) {
+        axios.get(URLS.RECENT_MESSAGES, { params: { room: DEFAULT_ROOM, limit: 200 } })
+          .then(response => setMessages(toChatFrames(response.data.messages)))
+          .catch(error => console.error('Failed to reload messages:', error));
+      }
       // 사용자 수 업데이트와 채팅 금지 메시지는 무시
-      if (data.type !== 'user_count' && data.type !== 'chat_banned') {
-        setMessages(prev => {
+      const frames = decoded.filter(
+        data => data.type !== 'user_count' && data.type !== 'chat_banned'
+      );
+      if (frames.length === 0) return;
+
+      // 묶음으로 받은 메시지는 한 번의 상태 갱신으로 추가
+      setMessages(prev => {
+        const next = [...prev];
+        for (const data of frames) {
           // 중복 메시지 및 빈 메시지 필터링
-          const isDuplicate = prev.some(msg => 
-            msg.timestamp === data.timestamp && msg.sender_id === data.sender_id
-          );
+          const isDuplicate = next.some(msg => isSameMessage(msg, data));
           const isEmptyContent = !data.message || data.message.trim() === '' || data.message === '내용 없음';
-          
-          if (isDuplicate || isEmptyContent) return prev;
 
-          return [...prev, data];
-        });
-      }
+          if (!isDuplicate && !isEmptyContent) next.push(data);
+        }
+        return next.length === prev.length ? prev : next;
+      });
     };
 
     socket.addEventListener('message', handleMessage);
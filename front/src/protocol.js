@@ -0,0 +1,118 @@
+// src/protocol.js
+
+// 웹소켓 연결 시 서버와 협상하는 옵션 (쿼리 문자열로 전달)
+// batch=1: 짧은 시간 안에 생긴 프레임을 {"type":"batch","frames":[...]} 하나로 묶어 받음
+// proto=2: 필드 이름을 정수 태그로 줄인 MessagePack 바이너리 프레임으로 받음
+export const WS_QUERY = '?batch=1&proto=2';
+
+// 연결 시 자동으로 참여하는 기본 채팅방 (back/config.py의 DEFAULT_ROOM)
+export const DEFAULT_ROOM = 'general';
+
+// 프로토콜 2의 정수 태그에 대응하는 필드 이름 (back/codec.py의 FIELD_NAMES와 순서가 같아야 함)
+const FIELD_NAMES = [
+  'type', 'message', 'sender_id', 'username', 'nickname', 'timestamp', 'room',
+  'count', 'time_left', 'retry_after', 't', 'frames', 'message_id', 'reason', 'seq',
+];
+
+// 서버가 재연결 대기 시간을 담아 보내는 close 코드 (back/admission.py와 같아야 함)
+const CLOSE_OVERLOADED = 4429;
+const CLOSE_SERVICE_RESTART = 1012;
+// 서버 재시작으로 닫혔는데 대기 시간이 없을 때 재연결 시점을 흩는 범위 (back/config.py의 DRAIN_RECONNECT_JITTER)
+const RESTART_RECONNECT_JITTER_MS = 15000;
+
+// close 이벤트에서 서버가 지정한 재연결 대기 시간(ms)을 구함 (지정하지 않았으면 null)
+export function retryDelay(event) {
+  if (event.code !== CLOSE_OVERLOADED && event.code !== CLOSE_SERVICE_RESTART) return null;
+  const match = /retry_after=([\d.]+)/.exec(event.reason || '');
+  if (match) return parseFloat(match[1]) * 1000;
+  return event.code === CLOSE_SERVICE_RESTART ? Math.random() * RESTART_RECONNECT_JITTER_MS : null;
+}
+
+const textDecoder = new TextDecoder();
+
+// 서버가 보내는 형식(맵, 배열, 문자열, 숫자, 불리언, null)만 다루는 MessagePack 디코더
+function unpack(bytes) {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let offset = 0;
+
+  const str = (length) => {
+    const value = textDecoder.decode(bytes.subarray(offset, offset + length));
+    offset += length;
+    return value;
+  };
+  const array = (length) => {
+    const value = new Array(length);
+    for (let i = 0; i < length; i++) value[i] = read();
+    return value;
+  };
+  const map = (length) => {
+    const value = {};
+    for (let i = 0; i < length; i++) {
+      const key = read();
+      value[key] = read();
+    }
+    return value;
+  };
+  const next = (size, getter) => {
+    const value = getter(offset);
+    offset += size;
+    return value;
+  };
+
+  function read() {
+    const byte = bytes[offset++];
+    if (byte <= 0x7f) return byte;
+    if (byte <= 0x8f) return map(byte & 0x0f);
+    if (byte <= 0x9f) return array(byte & 0x0f);
+    if (byte <= 0xbf) return str(byte & 0x1f);
+    if (byte >= 0xe0) return byte - 0x100;
+    switch (byte) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: { const n = next(1, (o) => view.getUint8(o)); offset += n; return bytes.slice(offset - n, offset); }
+      case 0xc5: { const n = next(2, (o) => view.getUint16(o)); offset += n; return bytes.slice(offset - n, offset); }
+      case 0xc6: { const n = next(4, (o) => view.getUint32(o)); offset += n; return bytes.slice(offset - n, offset); }
+      case 0xca: return next(4, (o) => view.getFloat32(o));
+      case 0xcb: return next(8, (o) => view.getFloat64(o));
+      case 0xcc: return next(1, (o) => view.getUint8(o));
+      case 0xcd: return next(2, (o) => view.getUint16(o));
+      case 0xce: return next(4, (o) => view.getUint32(o));
+      case 0xcf: return Number(next(8, (o) => view.getBigUint64(o)));
+      case 0xd0: return next(1, (o) => view.getInt8(o));
+      case 0xd1: return next(2, (o) => view.getInt16(o));
+      case 0xd2: return next(4, (o) => view.getInt32(o));
+      case 0xd3: return Number(next(8, (o) => view.getBigInt64(o)));
+      case 0xd9: return str(next(1, (o) => view.getUint8(o)));
+      case 0xda: return str(next(2, (o) => view.getUint16(o)));
+      case 0xdb: return str(next(4, (o) => view.getUint32(o)));
+      case 0xdc: return array(next(2, (o) => view.getUint16(o)));
+      case 0xdd: return array(next(4, (o) => view.getUint32(o)));
+      case 0xde: return map(next(2, (o) => view.getUint16(o)));
+      case 0xdf: return map(next(4, (o) => view.getUint32(o)));
+      default: throw new Error(`Unsupported MessagePack type: 0x${byte.toString(16)}`);
+    }
+  }
+
+  return read();
+}
+
+// 정수 태그를 필드 이름으로 되돌림 (태그가 없는 필드는 그대로 유지)
+function untag(tagged) {
+  const data = {};
+  for (const [key, value] of Object.entries(tagged)) {
+    data[FIELD_NAMES[key] ?? key] = value;
+  }
+  return data;
+}
+
+// 수신한 웹소켓 메시지를 개별 프레임 배열로 디코딩 (JSON 텍스트와 MessagePack 바이너리 모두 처리)
+// 바이너리 프레임을 받으려면 소켓의 binaryType을 'arraybuffer'로 설정해야 함
+export function decodeFrames(event) {
+  if (typeof event.data === 'string') {
+    const data = JSON.parse(event.data);
+    return data.type === 'batch' ? data.frames : [data];
+  }
+  const data = untag(unpack(new Uint8Array(event.data)));
+  return data.type === 'batch' ? data.frames.map(untag) : [data];
+}
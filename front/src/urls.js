@@ -8,6 +8,7 @@ export const URLS = {
   LOGIN: `${BASE_URL}/login`,
   REGISTER: `${BASE_URL}/register`,
   CHECK_DUPLICATE: `${BASE_URL}/check_duplicate`,
+  RECENT_MESSAGES: `${BASE_URL}/recent_messages`,
 };
 
 export default URLS;
\ No newline at end of file